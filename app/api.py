@@ -0,0 +1,367 @@
+"""
+Headless HTTP API (ASGI) for recommendations, stock snapshots, sentiment and email summaries.
+
+Run with ``python -m app.api --workers 4`` (or any ASGI server pointed at
+``app.api:app``). Each worker process keeps its own in-memory ticker cache
+and model singletons; the LLM response, sentiment and price-history caches
+are on disk and shared by every worker on the host. Streaming endpoints
+answer with newline-delimited JSON.
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import sys
+import threading
+import time
+
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(CURRENT_DIR)
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from starlette.applications import Starlette
+from starlette.concurrency import iterate_in_threadpool, run_in_threadpool
+from starlette.middleware import Middleware
+from starlette.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from starlette.routing import Route
+
+from config.settings import get_settings
+from core import agent_handler
+from core import tracing
+from core.batch import run_batch
+from core.gmail_agent import (
+    answer_financial_question, extract_transactions, get_gmail_data, stream_transactions,
+)
+from core.llm_client import llm_cache_stats, stream_text
+from core.sentiment_analysis import analyze_sentiment_batch, sentiment_cache_stats
+from core.transactions import SPEND, TransactionTable, render_summary_text, to_record
+from core.utils import detect_recommendation_tag, extract_recommendation
+from services.data_fetcher import cache_stats
+from services.data_fetcher_async import AsyncDataFetcher
+from services.http_client import http_stats
+from services.prefetch import prefetch_stats, start_watchlist_prefetch, stop_watchlist_prefetch
+
+# Largest ticker list accepted by one request
+MAX_BATCH_TICKERS = get_settings().app.api_max_batch_tickers
+# Daily bars included in a stock snapshot
+SNAPSHOT_BARS = 30
+SNAPSHOT_FIELDS = (
+    "longName", "sector", "currency", "currentPrice", "previousClose", "dayLow", "dayHigh",
+    "fiftyTwoWeekLow", "fiftyTwoWeekHigh", "marketCap", "trailingPE", "dividendYield",
+)
+NDJSON = "application/x-ndjson"
+
+
+class BadRequest(Exception):
+    pass
+
+
+class _RouteMetrics:
+    """Request counts and latency per route and status, for /metrics."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = {}
+        self.seconds = {}
+
+    def record(self, route, status, seconds):
+        with self._lock:
+            self.requests[(route, status)] = self.requests.get((route, status), 0) + 1
+            self.seconds[route] = self.seconds.get(route, 0.0) + seconds
+
+
+route_metrics = _RouteMetrics()
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware timing each request up to its response headers."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        start = time.perf_counter()
+        # Root span of the request; work run in the threadpool inherits it
+        request_span = tracing.span("api.request", method=scope["method"])
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                route = scope.get("route")
+                path = getattr(route, "path", None) or "unmatched"
+                route_metrics.record(path, message["status"], time.perf_counter() - start)
+                request_span.set(route=path, status=message["status"])
+            await send(message)
+
+        with request_span:
+            await self.app(scope, receive, send_wrapper)
+
+
+async def _json_body(request):
+    try:
+        body = await request.json()
+    except (json.JSONDecodeError, UnicodeDecodeError):
+        raise BadRequest("request body must be JSON")
+    if not isinstance(body, dict):
+        raise BadRequest("request body must be a JSON object")
+    return body
+
+
+def _tickers(body):
+    tickers = body.get("tickers") or ([body["ticker"]] if body.get("ticker") else [])
+    if not isinstance(tickers, list) or not all(isinstance(t, str) and t.strip() for t in tickers):
+        raise BadRequest("'tickers' must be a list of ticker symbols")
+    tickers = list(dict.fromkeys(t.strip().upper() for t in tickers))
+    if not tickers:
+        raise BadRequest("no tickers given")
+    if len(tickers) > MAX_BATCH_TICKERS:
+        raise BadRequest(f"at most {MAX_BATCH_TICKERS} tickers per request")
+    return tickers
+
+
+def _ndjson(records):
+    for record in records:
+        yield json.dumps(record, default=str) + "\n"
+
+
+def _stream_one_recommendation(ticker):
+    """NDJSON events for one ticker: text chunks as Gemini writes them, then the tag."""
+    prompt = agent_handler.build_recommendation_prompt(ticker)
+    if isinstance(prompt, tuple):
+        yield {"ticker": ticker, "error": prompt[0], "done": True}
+        return
+    text = ""
+    for chunk in stream_text(agent_handler.RECOMMENDATION_MODEL, prompt):
+        text += chunk
+        yield {"ticker": ticker, "chunk": chunk}
+    yield {"ticker": ticker, "tag": detect_recommendation_tag(text) or "NA", "done": True}
+
+
+def _recommend_one(ticker):
+    result = agent_handler.generate_recommendation(ticker)
+    if isinstance(result, tuple):
+        return {"ticker": ticker, "tag": None, "recommendation": None, "error": result[0]}
+    tag, recommendation = extract_recommendation(result)
+    return {"ticker": ticker, "tag": tag, "recommendation": recommendation, "error": None}
+
+
+async def recommendation(request):
+    """
+    GET /recommendation/{ticker} or POST /recommendation {"tickers": [...], "stream": false}.
+
+    Several tickers run through ``core.batch.run_batch``; with ``stream`` their
+    results are sent as NDJSON lines in completion order. A single streamed
+    ticker sends the recommendation text chunk by chunk.
+    """
+    if request.method == "GET":
+        tickers = _tickers({"ticker": request.path_params["ticker"]})
+        stream = request.query_params.get("stream", "").lower() in ("1", "true", "yes")
+    else:
+        body = await _json_body(request)
+        tickers = _tickers(body)
+        stream = bool(body.get("stream"))
+
+    if len(tickers) == 1:
+        if stream:
+            events = iterate_in_threadpool(_ndjson(_stream_one_recommendation(tickers[0])))
+            return StreamingResponse(events, media_type=NDJSON)
+        return JSONResponse(await run_in_threadpool(_recommend_one, tickers[0]))
+
+    if stream:
+        events = iterate_in_threadpool(_ndjson(run_batch(tickers, resume=False)))
+        return StreamingResponse(events, media_type=NDJSON)
+    results = await run_in_threadpool(lambda: list(run_batch(tickers, resume=False)))
+    order = {ticker: i for i, ticker in enumerate(tickers)}
+    return JSONResponse({"results": sorted(results, key=lambda r: order[r["ticker"]])})
+
+
+def _history_records(history, bars=SNAPSHOT_BARS):
+    if history is None or getattr(history, "empty", True):
+        return []
+    tail = history.tail(bars).copy()
+    tail.index = tail.index.map(str)
+    rows = json.loads(tail.to_json(orient="index"))
+    return [{"date": day, **values} for day, values in rows.items()]
+
+
+async def stock(request):
+    """GET /stock/{ticker}: quote fields and the last ``SNAPSHOT_BARS`` daily bars."""
+    ticker = _tickers({"ticker": request.path_params["ticker"]})[0]
+    history, info = await request.app.state.fetcher.fetch_stock_data(ticker)
+    info = info or {}
+    return JSONResponse({
+        "ticker": ticker,
+        "info": {field: info.get(field) for field in SNAPSHOT_FIELDS if field in info},
+        "history": _history_records(history),
+    })
+
+
+async def sentiment(request):
+    """
+    POST /sentiment {"tickers": [...]} or {"articles": [...]}.
+
+    News for all tickers is fetched concurrently and scored in one batched pass.
+    """
+    body = await _json_body(request)
+    if "articles" in body:
+        if not isinstance(body["articles"], list):
+            raise BadRequest("'articles' must be a list")
+        articles_by_ticker = {"articles": body["articles"]}
+    else:
+        tickers = _tickers(body)
+        fetcher = request.app.state.fetcher
+        news = await asyncio.gather(*(fetcher.fetch_stock_news(t) for t in tickers))
+        articles_by_ticker = dict(zip(tickers, news))
+    results = await run_in_threadpool(analyze_sentiment_batch, articles_by_ticker)
+    return JSONResponse({"results": results})
+
+
+def _summary_payload(table, answer=None):
+    payload = {
+        "summary": render_summary_text(table),
+        "total_spends": table.total(SPEND),
+        "transactions": [to_record(t) for t in table.transactions],
+    }
+    if answer is not None:
+        payload["answer"] = answer["text"]
+        payload["unparsed"] = answer["unparsed"]
+    return payload
+
+
+def _stream_summary(query, snippets):
+    transactions = []
+    for batch in stream_transactions(query, snippets):
+        transactions.extend(batch)
+        yield {"transactions": [to_record(t) for t in batch]}
+    yield {"done": True, **_summary_payload(TransactionTable(transactions))}
+
+
+async def email_summary(request):
+    """
+    POST /email-summary {"query": "...", "snippets": [...], "stream": false}.
+
+    Without ``snippets`` the configured mailbox is synced and used. Questions
+    the local planner understands are answered from the transaction index,
+    with unparsed emails in the planned range extracted first; "unparsed"
+    counts those that could not be read and are missing from the total.
+    """
+    body = await _json_body(request)
+    query = body.get("query")
+    if not isinstance(query, str) or not query.strip():
+        raise BadRequest("'query' is required")
+    snippets = body.get("snippets")
+    if snippets is not None and not (isinstance(snippets, list) and all(isinstance(s, str) for s in snippets)):
+        raise BadRequest("'snippets' must be a list of strings")
+
+    if snippets is None:
+        # Syncs the mailbox before planning; unplanned questions sync in get_gmail_data
+        answer = await run_in_threadpool(answer_financial_question, query)
+        if answer is not None:
+            return JSONResponse(_summary_payload(answer["matches"], answer))
+        snippets = await run_in_threadpool(get_gmail_data)
+    if body.get("stream"):
+        return StreamingResponse(iterate_in_threadpool(_ndjson(_stream_summary(query, snippets))),
+                                 media_type=NDJSON)
+    table = await run_in_threadpool(extract_transactions, query, snippets)
+    return JSONResponse(_summary_payload(table))
+
+
+def _metric_lines(name, help_text, kind, samples):
+    lines = [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+    for labels, value in samples:
+        label_text = ",".join(f'{k}="{v}"' for k, v in labels.items())
+        lines.append(f"{name}{{{label_text}}} {value}" if label_text else f"{name} {value}")
+    return lines
+
+
+def render_metrics():
+    """Return cache, upstream HTTP, LLM and API counters in the Prometheus text format."""
+    caches = {"data": cache_stats(), "llm": llm_cache_stats(), "sentiment": sentiment_cache_stats()}
+    lines = []
+    for stat, kind in (("hits", "counter"), ("misses", "counter"), ("size", "gauge")):
+        lines += _metric_lines(f"financegpt_cache_{stat}", f"Cache {stat}.", kind,
+                               [({"cache": name}, stats.get(stat, 0)) for name, stats in caches.items()])
+
+    providers = http_stats()
+    for stat, help_text in (("requests", "Upstream HTTP requests."), ("failures", "Failed upstream HTTP requests."),
+                            ("retries", "Retried upstream HTTP requests.")):
+        lines += _metric_lines(f"financegpt_upstream_{stat}_total", help_text, "counter",
+                               [({"provider": p}, s[stat]) for p, s in providers.items()])
+    lines += _metric_lines("financegpt_upstream_latency_seconds_sum", "Total upstream latency.", "counter",
+                           [({"provider": p}, round(s["latency_total"], 6)) for p, s in providers.items()])
+
+    lines += _metric_lines("financegpt_api_requests_total", "API requests by route and status.", "counter",
+                           [({"route": route, "status": status}, count)
+                            for (route, status), count in sorted(route_metrics.requests.items())])
+    lines += _metric_lines("financegpt_api_request_seconds_sum", "Time to response headers by route.", "counter",
+                           [({"route": route}, round(seconds, 6))
+                            for route, seconds in sorted(route_metrics.seconds.items())])
+
+    prefetch = prefetch_stats()
+    if prefetch:
+        lines += _metric_lines("financegpt_prefetch_refreshes_total", "Background cache refreshes.", "counter",
+                               [({}, prefetch["refreshes"])])
+        lines += _metric_lines("financegpt_prefetch_failures_total", "Failed background refreshes.", "counter",
+                               [({}, prefetch["failures"])])
+        lines += _metric_lines("financegpt_prefetch_tickers", "Watched tickers.", "gauge",
+                               [({}, prefetch["tickers"])])
+    return "\n".join(lines) + "\n" + tracing.render_prometheus()
+
+
+async def metrics(_request):
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+
+async def health(_request):
+    return JSONResponse({"status": "ok"})
+
+
+async def bad_request(_request, exc):
+    return JSONResponse({"error": str(exc)}, status_code=400)
+
+
+@contextlib.asynccontextmanager
+async def lifespan(app):
+    # One aiohttp session per worker, shared by every request
+    async with AsyncDataFetcher() as fetcher:
+        app.state.fetcher = fetcher
+        # Keeps FINANCEGPT_WATCHLIST tickers warm in this worker's cache
+        app.state.prefetch = start_watchlist_prefetch()
+        try:
+            yield
+        finally:
+            await run_in_threadpool(stop_watchlist_prefetch)
+
+
+app = Starlette(
+    routes=[
+        Route("/health", health),
+        Route("/recommendation", recommendation, methods=["POST"]),
+        Route("/recommendation/{ticker}", recommendation, methods=["GET"]),
+        Route("/stock/{ticker}", stock),
+        Route("/sentiment", sentiment, methods=["POST"]),
+        Route("/email-summary", email_summary, methods=["POST"]),
+        Route("/metrics", metrics),
+    ],
+    middleware=[Middleware(MetricsMiddleware)],
+    exception_handlers={BadRequest: bad_request},
+    lifespan=lifespan,
+)
+
+
+def main(argv=None):
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Serve the FinanceGPT HTTP API.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=1, help="Worker processes")
+    args = parser.parse_args(argv)
+    uvicorn.run("app.api:app", host=args.host, port=args.port, workers=args.workers)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""
+Closed-loop load generator for the HTTP API.
+
+Example::
+
+    python -m app.loadgen --url http://127.0.0.1:8000 --endpoint stock --tickers INFY.NS TCS.NS \
+        --concurrency 32 --requests 2000
+
+Each of ``--concurrency`` virtual users sends its next request as soon as the
+previous one completes. Prints throughput, latency percentiles and the status
+code histogram.
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import time
+
+import aiohttp
+
+ENDPOINTS = ("stock", "recommendation", "sentiment", "email-summary", "health")
+DEFAULT_EMAIL_QUERY = "how much did I spend this month?"
+
+
+def _request_for(endpoint, ticker):
+    """Return (method, path, JSON body) for one request against ``endpoint``."""
+    if endpoint == "stock":
+        return "GET", f"/stock/{ticker}", None
+    if endpoint == "recommendation":
+        return "GET", f"/recommendation/{ticker}", None
+    if endpoint == "sentiment":
+        return "POST", "/sentiment", {"tickers": [ticker]}
+    if endpoint == "email-summary":
+        return "POST", "/email-summary", {"query": DEFAULT_EMAIL_QUERY}
+    return "GET", "/health", None
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+async def run_load(url, endpoint, tickers, concurrency=16, requests=500, duration=None, timeout=60):
+    """
+    Drive the API and collect per-request latencies.
+
+    Args:
+        url (str): Base URL of the API.
+        endpoint (str): One of ``ENDPOINTS``.
+        tickers (list[str]): Tickers cycled through by the requests.
+        concurrency (int): Virtual users.
+        requests (int): Total requests to send (ignored with ``duration``).
+        duration (float, optional): Run for this many seconds instead.
+        timeout (float): Per-request timeout in seconds.
+
+    Returns:
+        dict: "requests", "elapsed", "throughput", "latency" percentiles (seconds)
+        and "statuses" (status code or error name -> count).
+    """
+    plan = itertools.cycle(_request_for(endpoint, ticker) for ticker in tickers or ["INFY.NS"])
+    latencies, statuses = [], {}
+    remaining = [requests]
+    deadline = time.perf_counter() + duration if duration else None
+
+    def next_request():
+        if deadline is not None:
+            return next(plan) if time.perf_counter() < deadline else None
+        if remaining[0] <= 0:
+            return None
+        remaining[0] -= 1
+        return next(plan)
+
+    async def user(session):
+        while True:
+            request = next_request()
+            if request is None:
+                return
+            method, path, body = request
+            start = time.perf_counter()
+            try:
+                async with session.request(method, url.rstrip("/") + path, json=body) as response:
+                    await response.read()
+                    status = str(response.status)
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                status = type(e).__name__
+            latencies.append(time.perf_counter() - start)
+            statuses[status] = statuses.get(status, 0) + 1
+
+    connector = aiohttp.TCPConnector(limit=concurrency)
+    async with aiohttp.ClientSession(connector=connector, timeout=aiohttp.ClientTimeout(total=timeout)) as session:
+        start = time.perf_counter()
+        await asyncio.gather(*(user(session) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "elapsed": elapsed,
+        "throughput": len(latencies) / elapsed if elapsed else 0.0,
+        "latency": {name: percentile(latencies, fraction)
+                    for name, fraction in (("p50", 0.5), ("p90", 0.9), ("p99", 0.99), ("max", 1.0))},
+        "statuses": statuses,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load test the FinanceGPT HTTP API.")
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--endpoint", choices=ENDPOINTS, default="stock")
+    parser.add_argument("--tickers", nargs="*", default=["INFY.NS", "TCS.NS", "RELIANCE.NS"])
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--duration", type=float, help="Seconds to run (overrides --requests)")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    args = parser.parse_args(argv)
+
+    report = asyncio.run(run_load(args.url, args.endpoint, args.tickers, concurrency=args.concurrency,
+                                  requests=args.requests, duration=args.duration))
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+    latency = report["latency"]
+    print(f"{report['requests']} requests in {report['elapsed']:.2f}s -> {report['throughput']:.1f} req/s")
+    print("latency: " + ", ".join(f"{name} {value * 1000:.1f}ms" for name, value in latency.items()))
+    print("statuses: " + ", ".join(f"{status}: {count}" for status, count in sorted(report["statuses"].items())))
+
+
+if __name__ == "__main__":
+    main()
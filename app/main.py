@@ -8,6 +8,8 @@ if PROJECT_ROOT not in sys.path:
     sys.path.insert(0, PROJECT_ROOT)
 
 import streamlit as st
+from app import page_cache
+from services.prefetch import start_watchlist_prefetch
 from stock_analysis import render_stock_analysis_page
 from personal_finance import render_personal_finance_page
 
@@ -95,6 +97,9 @@ def display_landing_page():
 
 def app():
     """Main application function with clean navigation between different pages"""
+    page_cache.begin_run()
+    # Started once per server process; sessions share the warmed data cache
+    start_watchlist_prefetch()
     
     # Initialize session state
     if 'current_page' not in st.session_state:
@@ -116,5 +121,8 @@ def app():
     elif st.session_state.current_page == "personal_finance":
         render_personal_finance_page()
 
+    if st.sidebar.checkbox("🐞 Show rerun timing", key="debug_timing"):
+        page_cache.render_debug_panel()
+
 if __name__ == "__main__":
     app()
@@ -0,0 +1,135 @@
+"""
+Per-session memoization for the Streamlit pages, with rerun timing.
+
+Streamlit reruns the whole script on every widget interaction. Values stored
+here live in ``st.session_state`` and are keyed by namespace ("data",
+"table", "llm") and a key such as the ticker, so toggling a tab or expander
+re-renders from memory instead of refetching, rebuilding tables or calling
+the LLM again. Entries can be invalidated per ticker or per namespace.
+"""
+import contextlib
+import time
+
+import streamlit as st
+
+from config.settings import get_settings
+from core import tracing
+
+_ENTRIES = "_page_cache"
+_STATS = "_page_cache_stats"
+_TIMINGS = "_page_timings"
+_RUN_START = "_page_run_start"
+
+# Seconds session entries stay valid per namespace (None: until invalidated)
+NAMESPACE_TTLS = dict(get_settings().app.page_ttls)
+
+
+def _state(name, factory):
+    if name not in st.session_state:
+        st.session_state[name] = factory()
+    return st.session_state[name]
+
+
+def _normalise(key):
+    return key.strip().upper() if isinstance(key, str) else key
+
+
+def get(namespace, key, default=None):
+    """Return the session's cached value, or ``default`` when missing or expired."""
+    entries = _state(_ENTRIES, dict)
+    stats = _state(_STATS, lambda: {"hits": 0, "misses": 0})
+    entry = entries.get((namespace, _normalise(key)))
+    if entry is not None and (entry[1] is None or entry[1] > time.time()):
+        stats["hits"] += 1
+        return entry[0]
+    if entry is not None:
+        del entries[(namespace, _normalise(key))]
+    stats["misses"] += 1
+    return default
+
+
+def put(namespace, key, value, ttl=None):
+    """Store a value for this session; ``ttl`` defaults to the namespace's."""
+    ttl = NAMESPACE_TTLS.get(namespace) if ttl is None else ttl
+    expires_at = time.time() + ttl if ttl else None
+    _state(_ENTRIES, dict)[(namespace, _normalise(key))] = (value, expires_at)
+    return value
+
+
+def memo(namespace, key, loader, ttl=None):
+    """
+    Return the cached value for ``(namespace, key)``, calling ``loader()`` on a miss.
+
+    ``None`` results are not stored, so failed loads are retried on the next rerun.
+    """
+    missing = object()
+    value = get(namespace, key, missing)
+    if value is not missing:
+        return value
+    with timed(f"{namespace}:{key} (load)"):
+        value = loader()
+    if value is not None:
+        put(namespace, key, value, ttl)
+    return value
+
+
+def invalidate(namespace=None, key=None):
+    """
+    Drop cached entries matching a namespace and/or key (all entries when both are None).
+
+    Returns:
+        int: Number of entries dropped.
+    """
+    entries = _state(_ENTRIES, dict)
+    key = _normalise(key)
+    matches = [
+        entry_key for entry_key in entries
+        if (namespace is None or entry_key[0] == namespace) and (key is None or entry_key[1] == key)
+    ]
+    for entry_key in matches:
+        del entries[entry_key]
+    return len(matches)
+
+
+def begin_run():
+    """Start timing a rerun; call once at the top of the script."""
+    st.session_state[_TIMINGS] = []
+    st.session_state[_RUN_START] = time.perf_counter()
+
+
+@contextlib.contextmanager
+def timed(label):
+    """Record how long the enclosed block took in this rerun's timings (and as a trace span)."""
+    start = time.perf_counter()
+    try:
+        with tracing.span("page.step", label=label):
+            yield
+    finally:
+        _state(_TIMINGS, list).append((label, time.perf_counter() - start))
+
+
+def run_report():
+    """Return this rerun's elapsed seconds, per-step timings and cache counters."""
+    start = st.session_state[_RUN_START] if _RUN_START in st.session_state else time.perf_counter()
+    stats = _state(_STATS, lambda: {"hits": 0, "misses": 0})
+    return {
+        "elapsed": time.perf_counter() - start,
+        "timings": list(_state(_TIMINGS, list)),
+        "hits": stats["hits"],
+        "misses": stats["misses"],
+        "entries": len(_state(_ENTRIES, dict)),
+    }
+
+
+def render_debug_panel():
+    """Show rerun timing and session cache counters in a sidebar expander."""
+    report = run_report()
+    with st.sidebar.expander("🐞 Debug: rerun timing", expanded=True):
+        st.markdown(f"**Rerun:** {report['elapsed'] * 1000:.0f} ms")
+        for label, seconds in report["timings"]:
+            st.markdown(f"- {label}: {seconds * 1000:.0f} ms")
+        st.markdown(
+            f"**Session cache:** {report['entries']} entries, {report['hits']} hits, {report['misses']} misses"
+        )
+        if st.button("Clear session cache", key="debug_clear_page_cache"):
+            invalidate()
@@ -1,177 +1,81 @@
 import streamlit as st
-import google.generativeai as genai
-from dotenv import load_dotenv 
-import os
-from core.gmail_agent import build_gmail_search_query,summarize_financial_data, get_gmail_data
-import re
-from datetime import datetime
+from config.settings import get_settings
+from core.gmail_agent import (
+    answer_financial_question, build_gmail_search_query, get_gmail_data, get_local_transactions, stream_transactions,
+)
+from core.portfolio import analyse_portfolio
+from core.transactions import (
+    BSE_TRADE, INVESTMENT, SPEND, TransactionTable, dedupe, describe, format_amount, grouped_for_display,
+)
+import hashlib
+import html
+from app import page_cache
 
-# Load environment variables
-load_dotenv()
-api_key = os.getenv("GEMINI_API_KEY")
-if api_key:
-    genai.configure(api_key=api_key)
+# Seconds the synced mailbox is reused across reruns
+MAILBOX_TTL = get_settings().app.mailbox_ttl
 
-def format_financial_summary(summary_text):
-    """Format the financial summary in a structured, readable way"""
-    
-    # Split the summary into lines and process each section
-    lines = summary_text.split('\n')
-    formatted_html = ""
-    
-    # Track if we're inside a section
-    in_bse_trades = False
-    in_investments = False
-    in_spends = False
-    
-    # Track if sections have been created to prevent duplicates
-    bse_section_created = False
-    investments_section_created = False
-    spends_section_created = False
-    
-    # Collect all transactions for better categorization
-    bse_transactions = []
-    investment_transactions = []
-    spend_transactions = []
-    
-    # Track total spends for calculation
-    total_spends = 0
-    
-    for line in lines:
-        line = line.strip()
-        if not line:
-            continue
-        
-        # Check for section headers and start sections
-        if 'BSE Trades' in line or '📊 BSE Trades' in line or 'bse trade' in line.lower():
-            if not bse_section_created:
-                formatted_html += '<div style="margin: 1.5rem 0;"><h4 style="color: #3182ce; margin: 0 0 1rem 0; font-size: 1.2rem; font-weight: 600;">📊 BSE Trades</h4>'
-                bse_section_created = True
-            in_bse_trades = True
-            in_investments = False
-            in_spends = False
-        elif 'Investments' in line or '🏦 Investments' in line or 'investment' in line.lower():
-            if not investments_section_created:
-                formatted_html += '<div style="margin: 1.5rem 0;"><h4 style="color: #38a169; margin: 0 0 1rem 0; font-size: 1.2rem; font-weight: 600;">🏦 Investments</h4>'
-                investments_section_created = True
-            in_bse_trades = False
-            in_investments = True
-            in_spends = False
-        elif 'Spends' in line or '💳 Spends' in line or 'Spending' in line or 'spend' in line.lower():
-            if not spends_section_created:
-                formatted_html += '<div style="margin: 1.5rem 0;"><h4 style="color: #d69e2e; margin: 0 0 1rem 0; font-size: 1.2rem; font-weight: 600;">💳 Spends</h4>'
-                spends_section_created = True
-            in_bse_trades = False
-            in_investments = False
-            in_spends = True
-        elif 'Total Spends' in line or '💰 Total Spends' in line or 'total spend' in line.lower():
-            # Extract the amount from the total spends line
-            amount_match = re.search(r'₹?([\d,]+\.?\d*)', line)
-            if amount_match:
-                total_amount = amount_match.group(1).replace(',', '')
-                try:
-                    total_spends = float(total_amount)
-                except:
-                    pass
-            
-            in_bse_trades = False
-            in_investments = False
-            in_spends = False
-        elif line.startswith('•') or line.startswith('-') or 'Date:' in line or 'date:' in line:
-            # Format transaction lines with standardized date format
-            formatted_line = standardize_date_format(line)
-            formatted_html += f'<div style="margin: 0.5rem 0; color: #374151; font-size: 0.95rem;">{formatted_line}</div>'
-        elif 'No' in line and 'found' in line:
+SECTION_STYLES = {
+    BSE_TRADE: ("#3182ce", "📊"),
+    INVESTMENT: ("#38a169", "🏦"),
+    SPEND: ("#d69e2e", "💳"),
+}
+
+def format_financial_summary(transactions):
+    """
+    Format extracted transactions in a structured, readable way.
+
+    Sections and totals come straight from the typed records, so the HTML is
+    built in a single pass without re-parsing any text.
+    """
+    table = transactions if isinstance(transactions, TransactionTable) else TransactionTable(transactions)
+    parts = []
+    for category, title, items in grouped_for_display(table.transactions):
+        color, icon = SECTION_STYLES.get(category, ("#4a5568", "•"))
+        parts.append(f'<div style="margin: 1.5rem 0;"><h4 style="color: {color}; margin: 0 0 1rem 0; font-size: 1.2rem; font-weight: 600;">{icon} {title}</h4>')
+        if not items:
             # Format "No [Category] found" messages
-            formatted_html += f'<div style="padding: 0.75rem; margin: 0.5rem 0; background: #fef5e7; border-radius: 6px; border-left: 3px solid #f59e0b; color: #92400e; font-style: italic;">{line}</div>'
-        elif any(keyword in line.lower() for keyword in ['swiggy', 'flipkart', 'payment', 'debit', 'order', 'bill', 'purchase', 'taxi', 'meal', 'food', 'electricity', 'google pay', 'zomato', 'uber', 'ola', 'amazon', 'myntra', 'hotel', 'restaurant']):
-            # This looks like a spend transaction - add it to spends section if not already in one
-            if not spends_section_created:
-                formatted_html += '<div style="margin: 1.5rem 0;"><h4 style="color: #d69e2e; margin: 0 0 1rem 0; font-size: 1.2rem; font-weight: 600;">💳 Spends</h4>'
-                spends_section_created = True
-                in_spends = True
-            
-            # Extract amount for total calculation
-            amount_match = re.search(r'₹?([\d,]+\.?\d*)', line)
-            if amount_match:
-                try:
-                    amount = float(amount_match.group(1).replace(',', ''))
-                    total_spends += amount
-                    spend_transactions.append((line, amount))
-                except:
-                    pass
-            
-            formatted_line = standardize_date_format(line)
-            formatted_html += f'<div style="margin: 0.5rem 0; color: #374151; font-size: 0.95rem;">{formatted_line}</div>'
-        elif '₹' in line and any(keyword in line.lower() for keyword in ['swiggy', 'flipkart', 'payment', 'debit', 'order', 'bill', 'purchase', 'taxi', 'meal', 'food', 'electricity', 'google pay', 'zomato', 'uber', 'ola', 'amazon', 'myntra', 'hotel', 'restaurant']):
-            # Additional check for spend transactions with rupee symbol
-            if not spends_section_created:
-                formatted_html += '<div style="margin: 1.5rem 0;"><h4 style="color: #d69e2e; margin: 0 0 1rem 0; font-size: 1.2rem; font-weight: 600;">💳 Spends</h4>'
-                spends_section_created = True
-                in_spends = True
-            
-            # Extract amount for total calculation
-            amount_match = re.search(r'₹?([\d,]+\.?\d*)', line)
-            if amount_match:
-                try:
-                    amount = float(amount_match.group(1).replace(',', ''))
-                    total_spends += amount
-                    spend_transactions.append((line, amount))
-                except:
-                    pass
-            
-            formatted_line = standardize_date_format(line)
-            formatted_html += f'<div style="margin: 0.5rem 0; color: #374151; font-size: 0.95rem;">{formatted_line}</div>'
-        else:
-            # Regular text lines
-            formatted_html += f'<div style="margin: 0.5rem 0; color: #4a5568; font-size: 0.9rem;">{line}</div>'
-    
-    return formatted_html
+            parts.append(f'<div style="padding: 0.75rem; margin: 0.5rem 0; background: #fef5e7; border-radius: 6px; border-left: 3px solid #f59e0b; color: #92400e; font-style: italic;">No {title} found.</div>')
+        for t in items:
+            line = f"• {t.date:%B %d, %Y}: {html.escape(describe(t))} - {format_amount(t.amount)}"
+            parts.append(f'<div style="margin: 0.5rem 0; color: #374151; font-size: 0.95rem;">{line}</div>')
+        parts.append('</div>')
 
-def standardize_date_format(line):
-    """Standardize date format in transaction lines to 'May 28, 2025' format"""
-    
-    # Look for various date patterns and standardize them to "Month DD, YYYY" format
-    
-    # Pattern 1: YYYY-MM-DD (e.g., 2025-05-28)
-    def convert_iso_date(match):
-        try:
-            date_obj = datetime.strptime(match.group(0), '%Y-%m-%d')
-            return date_obj.strftime('%B %d, %Y')
-        except:
-            return match.group(0)
-    
-    line = re.sub(r'\d{4}-\d{2}-\d{2}', convert_iso_date, line)
-    
-    # Pattern 2: DD/MM/YYYY (e.g., 28/05/2025)
-    def convert_slash_date(match):
-        try:
-            day, month, year = match.groups()
-            date_obj = datetime(int(year), int(month), int(day))
-            return date_obj.strftime('%B %d, %Y')
-        except:
-            return match.group(0)
-    
-    line = re.sub(r'(\d{1,2})/(\d{1,2})/(\d{4})', convert_slash_date, line)
-    
-    # Pattern 3: DD-MM-YYYY (e.g., 28-05-2025)
-    def convert_dash_date(match):
-        try:
-            day, month, year = match.groups()
-            date_obj = datetime(int(year), int(month), int(day))
-            return date_obj.strftime('%B %d, %Y')
-        except:
-            return match.group(0)
-    
-    line = re.sub(r'(\d{1,2})-(\d{1,2})-(\d{4})', convert_dash_date, line)
-    
-    # Pattern 4: DD Month YYYY (e.g., 28 May 2025) - already in correct format, just add comma
-    line = re.sub(r'(\d{1,2})\s+(\w+)\s+(\d{4})', r'\2 \1, \3', line)
-    
-    # Pattern 5: Month DD YYYY (e.g., May 28 2025) - add comma
-    line = re.sub(r'(\w+)\s+(\d{1,2})\s+(\d{4})', r'\1 \2, \3', line)
-    
-    return line
+    # Totals are computed from the amounts, never from model text
+    parts.append(f'<div style="margin: 1rem 0 0 0; color: #1a202c; font-weight: 600;">💰 Total Spends: {format_amount(table.total(SPEND))}</div>')
+    by_spend_category = table.totals_by("spend_category", category=SPEND)
+    if by_spend_category:
+        breakdown = ", ".join(f"{html.escape(name)} {format_amount(amount)}" for name, amount in by_spend_category.items())
+        parts.append(f'<div style="margin: 0.5rem 0; color: #4a5568; font-size: 0.9rem;">By category: {breakdown}</div>')
+    by_month = table.totals_by("month", category=SPEND)
+    if len(by_month) > 1:
+        breakdown = ", ".join(f"{month} {format_amount(amount)}" for month, amount in sorted(by_month.items()))
+        parts.append(f'<div style="margin: 0.5rem 0; color: #4a5568; font-size: 0.9rem;">By month: {breakdown}</div>')
+    return "".join(parts)
+
+def render_portfolio(transactions):
+    """Show holdings, P&L, XIRR and the equity curve of the BSE trades among ``transactions``."""
+    trades = [t for t in transactions if t.category == BSE_TRADE]
+    if not trades:
+        return
+    # Keyed by the trade set, so another question's trades never get this report
+    trade_set = sorted((t.date.isoformat(), t.security_code or "", t.side or "", t.quantity or 0, t.amount,
+                        t.reference or "") for t in trades)
+    key = "portfolio:" + hashlib.sha1(repr(trade_set).encode("utf-8")).hexdigest()[:16]
+    report = page_cache.memo("table", key, lambda: analyse_portfolio(trades))
+    if report is None:
+        return
+    totals = report["totals"]
+    st.markdown("### 📈 Portfolio")
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("Market Value", format_amount(totals["market_value"]))
+    col2.metric("Unrealised P&L", format_amount(totals["unrealised"]),
+                f"{totals['unrealised'] / totals['invested'] * 100:+.1f}%" if totals["invested"] else None)
+    col3.metric("Realised P&L", format_amount(totals["realised"]))
+    col4.metric("XIRR", f"{totals['xirr'] * 100:.1f}%" if totals["xirr"] is not None else "N/A")
+    st.dataframe(report["holdings"][["name", "quantity", "avg_cost", "last_price", "market_value",
+                                     "unrealised", "unrealised_pct", "realised"]].round(2))
+    if not report["equity_curve"].empty:
+        st.line_chart(report["equity_curve"][["market_value", "cost_basis", "total_pnl"]])
 
 def render_personal_finance_page():
     """Display the personal finance management interface with simple styling"""
@@ -231,9 +135,6 @@ def render_personal_finance_page():
         <span style='font-size: 0.9rem; color: #718096;'>(Ask questions about your financial data and get AI-powered insights)</span>
     </div> """, unsafe_allow_html=True)
     
-    # Sample email snippets for demonstration
-    sample_email_snippets = get_gmail_data()
-    
     user_query = st.text_area(
         "What would you like to analyze?",
         value="financial data for BSE Trades, Investments and spends for this month",
@@ -241,14 +142,41 @@ def render_personal_finance_page():
         placeholder="e.g., Show me all my expenses this month, Analyze my investment portfolio, etc."
     )
     
+    if st.button("🔄 Refresh mailbox", key="refresh_mailbox"):
+        page_cache.invalidate("data", "gmail")
+        page_cache.invalidate("llm")
+        page_cache.invalidate("table")
+
     if st.button("🔍 Analyze Financial Data", key="analyze_finance", use_container_width=True):
         if user_query.strip():
             with st.spinner("🤖 AI is analyzing your financial data..."):
                 # Generate Gmail search query
                 gmail_search_query = build_gmail_search_query(user_query)
                 
-                # Analyze financial data
-                financial_summary = summarize_financial_data(user_query, sample_email_snippets)
+                # Sync the mailbox (once per MAILBOX_TTL) so planned answers see new mail
+                email_snippets = page_cache.memo("data", "gmail", get_gmail_data, ttl=MAILBOX_TTL)
+
+                # Questions the local planner understands are answered from the transaction index
+                answer = answer_financial_question(user_query, sync=False)
+                if answer is not None:
+                    financial_summary = answer["matches"]
+                    if answer["unparsed"]:
+                        st.warning(f"⚠️ {answer['text']}")
+                    else:
+                        st.success(f"⚡ {answer['text']}")
+                else:
+                    transactions = page_cache.get("llm", ("finance", user_query.strip()))
+                    if transactions is None:
+                        # Analyze financial data, rendering each stage of transactions as it arrives
+                        stream_placeholder = st.empty()
+                        transactions = []
+                        with page_cache.timed("llm:finance (stream)"):
+                            for batch in stream_transactions(user_query, email_snippets):
+                                transactions.extend(batch)
+                                stream_placeholder.markdown(format_financial_summary(transactions), unsafe_allow_html=True)
+                        stream_placeholder.empty()
+                        page_cache.put("llm", ("finance", user_query.strip()), transactions)
+                    financial_summary = TransactionTable(transactions)
                 
                 # Display results with compact styling
                 st.markdown("""
@@ -269,5 +197,8 @@ def render_personal_finance_page():
                     </div>
                 </div>
                 """.format(formatted_summary=format_financial_summary(financial_summary)), unsafe_allow_html=True)
+
+                # Holdings need every known trade, not only those matching this question
+                render_portfolio(dedupe(get_local_transactions().transactions + financial_summary.transactions))
         else:
             st.error("Please enter a query to analyze.")
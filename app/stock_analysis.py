@@ -1,11 +1,42 @@
+import pandas as pd
 import streamlit as st
-from core.utils import extract_recommendation
-from core.agent_handler import generate_recommendation
-from services.data_fetcher import fetch_stock_data
+from app import page_cache
+from core.utils import detect_recommendation_tag, extract_recommendation
+from core.agent_handler import INDICATOR_PERIOD, fetch_technicals, stream_recommendation
+from core.indicators import describe_latest
+from services.data_fetcher import fetch_stock_data, fetch_stock_history, invalidate_ticker
+
+def format_indicator(latest, column, spec):
+    """Format one indicator of the latest row, or "N/A" while it is still warming up or not computed."""
+    value = latest.get(column)
+    return format(value, spec) if pd.notna(value) else "N/A"
+
+def recent_history_tables(stock_history, days=15):
+    """Return the closing price frame and the styled table for the last ``days`` sessions."""
+    recent = stock_history.tail(days)
+    styled = (
+        recent.style
+            .highlight_max(axis=0, color='lightgreen')
+            .highlight_min(axis=0, color='salmon')
+            .set_properties(**{'text-align': 'center'})
+    )
+    return recent[["Close"]], styled
+
+def technical_frame(ticker):
+    """Return the closes of the indicator window joined with their technical indicators."""
+    indicators = fetch_technicals(ticker)
+    if indicators.empty:
+        return indicators
+    return fetch_stock_history(ticker, period=INDICATOR_PERIOD)[["Close"]].join(indicators)
+
+def refresh_ticker(ticker):
+    """Forget everything cached for a ticker: this session, the shared data cache and the stored history tail."""
+    page_cache.invalidate(key=ticker)
+    invalidate_ticker(ticker)
 
 def display_stock_data(ticker):
     """Display stock data in the Streamlit app for a given ticker."""
-    stock_history, stock_info = fetch_stock_data(ticker)
+    stock_history, stock_info = page_cache.memo("data", ticker, lambda: fetch_stock_data(ticker))
 
     st.subheader( f"Stock Data : {stock_info.get('shortName', '')} ({ticker}) ")
     
@@ -34,13 +65,14 @@ def display_stock_data(ticker):
 
 
     # Create tabs
-    tab1, tab2, tab3, tab4, tab5, tab6 = st.tabs([
+    tab1, tab2, tab3, tab4, tab5, tab6, tab7 = st.tabs([
         "📊 Market Data", 
         "📈 Valuation Metrics", 
         "📅 52-Week Stats", 
         "💰 Dividend Info", 
         "🧾 Financials", 
-        "📅 Earnings & Growth"
+        "📅 Earnings & Growth",
+        "📐 Technicals"
     ])
 
     # 📊 Market Data
@@ -100,30 +132,65 @@ def display_stock_data(ticker):
         st.markdown(f"**Operating Margins:** {stock_info.get('operatingMargins', 'N/A')}")
         st.markdown(f"**Profit Margins:** {stock_info.get('profitMargins', 'N/A')}")
 
+    # 📐 Technicals
+    with tab7:
+        technicals = page_cache.memo("technicals", ticker, lambda: technical_frame(ticker))
+        if technicals.empty:
+            st.info("No price history available for technical indicators.")
+        else:
+            latest = technicals.iloc[-1]
+            col1, col2, col3, col4 = st.columns(4)
+            col1.metric("RSI (14)", format_indicator(latest, "rsi", ".1f"))
+            col2.metric("MACD hist", format_indicator(latest, "macd_hist", "+.2f"))
+            col3.metric("ATR (14)", format_indicator(latest, "atr", ".2f"))
+            col4.metric("Beta (60d)", format_indicator(latest, "beta", ".2f"))
+            st.markdown(describe_latest(technicals, last_close=stock_info.get('currentPrice')))
+            st.line_chart(technicals[["Close", "bb_upper", "bb_mid", "bb_lower"]])
+            st.line_chart(technicals[["rsi"]])
+            st.line_chart(technicals[["macd", "macd_signal"]])
+
 
     # Show historical stock data (e.g., last 15 days)
     st.subheader("📊 Recent Stock History")
     with st.expander("📈 Click to view the last 15 days of stock data", expanded=False):
         st.markdown("Here's a quick look at how the stock has moved over the last 15 trading days:")
 
+        # Built once per ticker and session, not on every tab or expander toggle
+        closes, styled = page_cache.memo("table", ticker, lambda: recent_history_tables(stock_history))
+
         # Line chart for closing prices
-        st.line_chart(stock_history.tail(15)[["Close"]])
+        st.line_chart(closes)
 
         # Styled DataFrame with highlights
-        st.dataframe(
-            stock_history.tail(15).style
-                .highlight_max(axis=0, color='lightgreen')
-                .highlight_min(axis=0, color='salmon')
-                .set_properties(**{'text-align': 'center'})
-        )
+        st.dataframe(styled)
 
 def display_recommendation(ticker):
     """Display AI recommendation with simple styling"""
     
-    # Show loading message while AI is analyzing
-    with st.spinner("🤖 AI is analyzing your stock data..."):
-        raw_recommendation = generate_recommendation(ticker)
-        tag_recommendation, recommendation = extract_recommendation(raw_recommendation)
+    # Reruns reuse this session's answer until the ticker is refreshed
+    raw_recommendation = page_cache.get("llm", ticker)
+    if raw_recommendation is None:
+        # Stream the answer as it is generated; the tag shows up with the first chunk(s)
+        tag_placeholder = st.empty()
+        stream_placeholder = st.empty()
+        tag_placeholder.info("🤖 AI is analyzing your stock data...")
+        raw_recommendation = ""
+        streamed_tag = None
+        with page_cache.timed(f"llm:{ticker} (stream)"):
+            for chunk in stream_recommendation(ticker):
+                raw_recommendation += chunk
+                if streamed_tag is None:
+                    streamed_tag = detect_recommendation_tag(raw_recommendation)
+                    if streamed_tag:
+                        tag_placeholder.markdown(f"#### 🧠 AI Recommendation: {streamed_tag}")
+                stream_placeholder.markdown(raw_recommendation + " ▌")
+        tag_placeholder.empty()
+        stream_placeholder.empty()
+        # Errors (e.g. missing stock data) are not kept, so the next rerun retries
+        if detect_recommendation_tag(raw_recommendation):
+            page_cache.put("llm", ticker, raw_recommendation)
+    with page_cache.timed(f"parse:{ticker}"):
+        tag_recommendation, recommendation = extract_recommendation(raw_recommendation.strip())
 
     with st.expander("🧠 AI Recommendation: " + str(tag_recommendation), expanded=False):
         st.markdown("""
@@ -169,6 +236,9 @@ def render_stock_analysis_page():
         placeholder="Enter ticker symbol..."
     )
 
+    if ticker and st.sidebar.button("🔄 Refresh data", key="refresh_ticker", use_container_width=True):
+        refresh_ticker(ticker)
+
     if ticker:
         display_stock_data(ticker)
         display_recommendation(ticker)
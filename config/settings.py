@@ -0,0 +1,439 @@
+"""
+Typed application settings, layered from defaults, YAML, .env and the environment.
+
+Every credential and performance knob (timeouts, cache TTLs, concurrency,
+rate limits, model names) has its default in ``DEFAULTS`` below. Sources
+are applied lowest to highest precedence:
+
+1. ``DEFAULTS``
+2. ``config/config.yaml`` (or the file named by ``FINANCEGPT_CONFIG``), same nesting as ``DEFAULTS``
+3. ``.env`` in the project root (or ``FINANCEGPT_ENV_FILE``)
+4. The process environment
+
+In .env and the environment, the historical names in ``ENV_ALIASES`` (e.g.
+``GEMINI_API_KEY``, ``FINANCEGPT_CACHE_DIR``) are honoured, and any setting
+can be reached as ``FINANCEGPT__<SECTION>__<KEY>``, e.g.
+``FINANCEGPT__PROVIDERS__NEWSAPI__RATE=0.5`` or ``FINANCEGPT__CACHE__TTLS__INFO=30``.
+String values are converted to the type of the default.
+
+``get_settings()`` reads the files once and memoises the result; it only
+rebuilds when a relevant environment variable changes, so switches like
+``FINANCEGPT_LLM_CACHE=0`` still apply at runtime.
+"""
+import copy
+import os
+import threading
+from dataclasses import dataclass, field, fields
+from typing import Optional
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_CONFIG_PATH = os.path.join(PROJECT_ROOT, "config", "config.yaml")
+DEFAULT_ENV_PATH = os.path.join(PROJECT_ROOT, ".env")
+
+ENV_PREFIX = "FINANCEGPT__"
+
+# Environment variable names used before this module existed -> setting path
+ENV_ALIASES = {
+    "GEMINI_API_KEY": "providers.gemini.api_key",
+    "NEWS_API_KEY": "providers.newsapi.api_key",
+    "ALPHAVANTAGE_API_KEY": "providers.alphavantage.api_key",
+    "GMAIL_ACCESS_TOKEN": "providers.gmail.api_key",
+    "GMAIL_API_URL": "providers.gmail.base_url",
+    "FINANCEGPT_CACHE_DIR": "cache.dir",
+    "FINANCEGPT_HISTORY_STORE": "history.store_enabled",
+    "FINANCEGPT_LLM_CACHE": "llm.cache_enabled",
+    "FINANCEGPT_TRACING": "tracing.enabled",
+    "FINANCEGPT_TRACE_FILE": "tracing.file",
+    "FINANCEGPT_WATCHLIST": "prefetch.watchlist",
+}
+# Variables that choose the files themselves
+ENV_FILE_VARIABLES = ("FINANCEGPT_CONFIG", "FINANCEGPT_ENV_FILE")
+
+_TRUE = ("1", "true", "yes", "on")
+_FALSE = ("0", "false", "no", "off", "")
+
+DEFAULTS = {
+    # Every provider inherits "default" and overrides what differs
+    "providers": {
+        "default": {
+            "api_key": None,
+            "base_url": None,
+            "connect_timeout": 3.05,
+            "read_timeout": 10.0,
+            "max_retries": 3,
+            "backoff": 0.5,
+            "max_backoff": 8.0,
+            # Token bucket: sustained requests per second and burst capacity
+            "rate": 5.0,
+            "burst": 10,
+            "pool_size": 20,
+            # Requests in flight at once from the async fetchers
+            "concurrency": 4,
+        },
+        "yfinance": {"concurrency": 8},
+        "newsapi": {"base_url": "https://newsapi.org/v2/everything", "rate": 1.0, "burst": 5},
+        "alphavantage": {"base_url": "https://www.alphavantage.co/query", "concurrency": 2},
+        # Gmail allows 250 quota units per second per user; messages.get costs 5
+        "gmail": {"base_url": "https://gmail.googleapis.com/gmail/v1/users/me", "rate": 40.0, "burst": 40},
+        "gemini": {},
+    },
+    "cache": {
+        "dir": None,
+        "memory_maxsize": 512,
+        # Seconds each kind of upstream data stays fresh in the shared cache
+        "ttls": {"info": 60, "history": 15 * 60, "fundamentals": 24 * 3600, "news": 10 * 60},
+    },
+    "history": {
+        "store_enabled": True,
+        "tail_refresh_seconds": 15 * 60,
+    },
+    "llm": {
+        "recommendation_model": "gemini-2.0-flash",
+        "summary_model": "gemini-1.5-flash",
+        "cache_enabled": True,
+        "cache_ttl": 6 * 3600,
+        "cache_max_entries": 10_000,
+        "extraction_batch_tokens": 4000,
+        "extraction_concurrency": 4,
+    },
+    "sentiment": {
+        "model": "yiyanghkust/finbert-tone",
+        "batch_size": 32,
+        "max_length": 512,
+        "cache_max_age": 30 * 24 * 3600,
+        "cache_max_entries": 200_000,
+    },
+    "recommendation": {
+        "source_timeouts": {"stock": 15.0, "financial": 10.0, "news": 8.0, "technicals": 10.0},
+        "fetch_workers": 12,
+        "indicator_period": "6mo",
+    },
+    "batch": {
+        "workers": 16,
+        "llm_concurrency": 4,
+        "ticker_concurrency": 50,
+        "screener_fetch_workers": 16,
+    },
+    "prefetch": {
+        "watchlist": [],
+        "intervals": {"info": 45, "history": 15 * 60, "fundamentals": 24 * 3600, "news": 5 * 60},
+        "off_hours_info_interval": 30 * 60,
+        "jitter": 0.1,
+        "max_concurrent": 4,
+        "startup_spread": 10,
+    },
+    "tracing": {
+        "enabled": False,
+        "file": None,
+    },
+    "app": {
+        "page_ttls": {"data": 60, "table": 60, "technicals": 60, "llm": None},
+        "mailbox_ttl": 5 * 60,
+        "api_max_batch_tickers": 100,
+    },
+}
+
+
+@dataclass(slots=True, frozen=True)
+class ProviderSettings:
+    """Credentials, timeouts and limits of one upstream service."""
+
+    api_key: Optional[str]
+    base_url: Optional[str]
+    connect_timeout: float
+    read_timeout: float
+    max_retries: int
+    backoff: float
+    max_backoff: float
+    rate: float
+    burst: int
+    pool_size: int
+    concurrency: int
+
+    def http_options(self):
+        """The keyword arguments ``services.http_client.HttpClient`` takes."""
+        return {name: getattr(self, name) for name in
+                ("connect_timeout", "read_timeout", "max_retries", "backoff", "max_backoff", "rate", "burst",
+                 "pool_size")}
+
+
+@dataclass(slots=True, frozen=True)
+class CacheSettings:
+    dir: Optional[str]
+    memory_maxsize: int
+    ttls: dict
+
+    @property
+    def path(self):
+        """The on-disk cache directory (default ``<project>/.cache``)."""
+        return self.dir or os.path.join(PROJECT_ROOT, ".cache")
+
+
+@dataclass(slots=True, frozen=True)
+class HistorySettings:
+    store_enabled: bool
+    tail_refresh_seconds: float
+
+
+@dataclass(slots=True, frozen=True)
+class LLMSettings:
+    recommendation_model: str
+    summary_model: str
+    cache_enabled: bool
+    cache_ttl: float
+    cache_max_entries: int
+    extraction_batch_tokens: int
+    extraction_concurrency: int
+
+
+@dataclass(slots=True, frozen=True)
+class SentimentSettings:
+    model: str
+    batch_size: int
+    max_length: int
+    cache_max_age: float
+    cache_max_entries: int
+
+
+@dataclass(slots=True, frozen=True)
+class RecommendationSettings:
+    source_timeouts: dict
+    fetch_workers: int
+    indicator_period: str
+
+
+@dataclass(slots=True, frozen=True)
+class BatchSettings:
+    workers: int
+    llm_concurrency: int
+    ticker_concurrency: int
+    screener_fetch_workers: int
+
+
+@dataclass(slots=True, frozen=True)
+class PrefetchSettings:
+    watchlist: list
+    intervals: dict
+    off_hours_info_interval: float
+    jitter: float
+    max_concurrent: int
+    startup_spread: float
+
+
+@dataclass(slots=True, frozen=True)
+class TracingSettings:
+    enabled: bool
+    file: Optional[str]
+
+
+@dataclass(slots=True, frozen=True)
+class AppSettings:
+    page_ttls: dict
+    mailbox_ttl: float
+    api_max_batch_tickers: int
+
+
+@dataclass(slots=True, frozen=True)
+class Settings:
+    """All settings; obtain the shared instance with ``get_settings()``."""
+
+    providers: dict
+    cache: CacheSettings
+    history: HistorySettings
+    llm: LLMSettings
+    sentiment: SentimentSettings
+    recommendation: RecommendationSettings
+    batch: BatchSettings
+    prefetch: PrefetchSettings
+    tracing: TracingSettings
+    app: AppSettings
+    sources: tuple = field(default=())
+
+    def provider(self, name):
+        """Settings of one provider; unknown names get the defaults."""
+        return self.providers.get(name) or self.providers["default"]
+
+
+_SECTIONS = {f.name: f.type for f in fields(Settings) if f.name not in ("providers", "sources")}
+
+
+def _coerce(value, default):
+    """Convert a string from .env or the environment to the type of ``default``."""
+    if not isinstance(value, str) or isinstance(default, str) or default is None:
+        return value
+    text = value.strip()
+    if isinstance(default, bool):
+        if text.lower() in _TRUE:
+            return True
+        if text.lower() in _FALSE:
+            return False
+        raise ValueError(f"Expected a boolean, got {value!r}")
+    if isinstance(default, int):
+        return int(float(text))
+    if isinstance(default, float):
+        return float(text)
+    if isinstance(default, list):
+        return [item for item in text.replace(" ", ",").split(",") if item]
+    return value
+
+
+def _merge(base, override):
+    """Recursively merge ``override`` into a copy of ``base``."""
+    merged = dict(base)
+    for key, value in override.items():
+        if isinstance(value, dict) and isinstance(merged.get(key), dict):
+            merged[key] = _merge(merged[key], value)
+        else:
+            merged[key] = value
+    return merged
+
+
+def _assign(tree, path, value):
+    node = tree
+    *parents, leaf = path.lower().split(".")
+    for part in parents:
+        node = node.setdefault(part, {})
+    node[leaf] = value
+
+
+def _variables_layer(variables):
+    """Turn environment-style variables into a nested override dict."""
+    layer = {}
+    for name, value in variables.items():
+        if value is None:
+            continue
+        if name in ENV_ALIASES:
+            _assign(layer, ENV_ALIASES[name], value)
+        elif name.startswith(ENV_PREFIX) and len(name) > len(ENV_PREFIX):
+            _assign(layer, name[len(ENV_PREFIX):].replace("__", "."), value)
+    return layer
+
+
+def _relevant_environment():
+    return tuple(sorted((name, value) for name, value in os.environ.items()
+                        if name in ENV_ALIASES or name.startswith(ENV_PREFIX) or name in ENV_FILE_VARIABLES))
+
+
+def _read_yaml(path):
+    if not os.path.exists(path):
+        return {}
+    import yaml
+    with open(path, "r", encoding="utf-8") as file:
+        data = yaml.safe_load(file) or {}
+    if not isinstance(data, dict):
+        raise ValueError(f"{path} must contain a mapping at the top level")
+    return data
+
+
+def _read_env_file(path):
+    if not os.path.exists(path):
+        return {}
+    from dotenv import dotenv_values
+    return dict(dotenv_values(path))
+
+
+def _build_section(cls, data, defaults, where):
+    values = {}
+    for spec in fields(cls):
+        default = defaults.get(spec.name)
+        value = data.get(spec.name, default)
+        try:
+            if isinstance(default, dict) and isinstance(value, dict):
+                # Entries without a typed default (new keys, None) take the type of their siblings
+                hint = next((item for item in default.values() if item is not None), None)
+                value = {key: _coerce(item, hint if default.get(key) is None else default[key])
+                         for key, item in value.items()}
+            else:
+                value = _coerce(value, default)
+        except ValueError as e:
+            raise ValueError(f"Invalid setting {where}.{spec.name}: {e}") from None
+        values[spec.name] = value
+    unknown = set(data) - {spec.name for spec in fields(cls)}
+    if unknown:
+        print(f"Warning: Ignoring unknown settings under {where}: {', '.join(sorted(unknown))}")
+    return cls(**values)
+
+
+def build_settings(*layers, sources=()):
+    """
+    Build ``Settings`` from ``DEFAULTS`` and override dicts, lowest precedence first.
+
+    Args:
+        *layers (dict): Nested overrides shaped like ``DEFAULTS``; string values are coerced.
+        sources (tuple): Descriptions of where the layers came from, kept on the result.
+
+    Raises:
+        ValueError: When a value cannot be converted to the type of its default.
+    """
+    merged = copy.deepcopy(DEFAULTS)
+    for layer in layers:
+        merged = _merge(merged, {key.lower(): value for key, value in layer.items()})
+
+    provider_defaults = merged["providers"].get("default", {})
+    base_defaults = DEFAULTS["providers"]["default"]
+    providers = {}
+    for name, overrides in merged["providers"].items():
+        data = _merge(provider_defaults, overrides or {})
+        providers[name] = _build_section(ProviderSettings, data, base_defaults, f"providers.{name}")
+
+    sections = {name: _build_section(cls, merged.get(name) or {}, DEFAULTS[name], name)
+                for name, cls in _SECTIONS.items()}
+    unknown = set(merged) - set(DEFAULTS)
+    if unknown:
+        print(f"Warning: Ignoring unknown settings sections: {', '.join(sorted(unknown))}")
+    return Settings(providers=providers, sources=tuple(sources), **sections)
+
+
+_lock = threading.Lock()
+_file_layers = {}
+_current = None
+
+
+def _load_files(config_path, env_path):
+    key = (config_path, env_path)
+    layers = _file_layers.get(key)
+    if layers is None:
+        layers = (_read_yaml(config_path), _variables_layer(_read_env_file(env_path)))
+        _file_layers[key] = layers
+    return layers
+
+
+def get_settings():
+    """
+    Return the shared ``Settings``.
+
+    The YAML and .env files are parsed once per process (see ``reload_settings``);
+    the result is rebuilt only when a relevant environment variable changed.
+    """
+    global _current
+    environment = _relevant_environment()
+    current = _current
+    if current is not None and current[0] == environment:
+        return current[1]
+    with _lock:
+        if _current is not None and _current[0] == environment:
+            return _current[1]
+        variables = dict(environment)
+        config_path = variables.get("FINANCEGPT_CONFIG") or DEFAULT_CONFIG_PATH
+        env_path = variables.get("FINANCEGPT_ENV_FILE") or DEFAULT_ENV_PATH
+        yaml_layer, env_file_layer = _load_files(config_path, env_path)
+        settings = build_settings(yaml_layer, env_file_layer, _variables_layer(variables),
+                                  sources=(config_path, env_path, "environment"))
+        _current = (environment, settings)
+        return settings
+
+
+def reload_settings():
+    """Forget the parsed files and memoised settings so the next ``get_settings`` re-reads them."""
+    global _current
+    with _lock:
+        _file_layers.clear()
+        _current = None
+
+
+def load_yaml():
+    """Return a copy of the parsed YAML config (empty when the file does not exist)."""
+    config_path = os.getenv("FINANCEGPT_CONFIG") or DEFAULT_CONFIG_PATH
+    env_path = os.getenv("FINANCEGPT_ENV_FILE") or DEFAULT_ENV_PATH
+    with _lock:
+        return copy.deepcopy(_load_files(config_path, env_path)[0])
@@ -1,7 +1,8 @@
 import sys
 import os
-import google.generativeai as genai
-from dotenv import load_dotenv
+import time
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
 
 CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
 PROJECT_ROOT = os.path.dirname(CURRENT_DIR)
@@ -9,16 +10,157 @@ if PROJECT_ROOT not in sys.path:
     sys.path.insert(0, PROJECT_ROOT)
 
 # Fix imports for package structure
-from services.data_fetcher import fetch_stock_data, fetch_financial_data, fetch_stock_news
+from config.settings import get_settings
+from services.data_fetcher import (
+    fetch_bulk_history, fetch_financial_data, fetch_stock_data, fetch_stock_news, stored_history,
+)
 from core.sentiment_analysis import analyze_sentiment
+from core.llm_client import genai, generate_text, stream_text
+from core.prompt_builder import DEFAULT_HISTORY_TOKEN_BUDGET, encode_history, estimate_tokens
+from core import tracing
+from core.indicators import benchmark_for, describe_latest, ticker_indicators
 
-# Load environment variables from .env file
-load_dotenv()
-GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
-genai.configure(api_key=GEMINI_API_KEY)
+# Credentials and tunables come from config.settings; core.llm_client configures Gemini on first use
+_settings = get_settings()
+RECOMMENDATION_MODEL = _settings.llm.recommendation_model
 
-def generate_recommendation(ticker):
-    stock_history, stock_info = fetch_stock_data(ticker)
+# Daily bars the technical indicators are computed over (MACD needs 35+)
+INDICATOR_PERIOD = _settings.recommendation.indicator_period
+
+# Seconds to wait for each upstream source (stock, financial, news, technicals)
+# before treating it as unavailable
+SOURCE_TIMEOUTS = dict(_settings.recommendation.source_timeouts)
+
+# Shared pool for the upstream fetches; timed-out fetches finish in the
+# background here instead of blocking the caller
+_fetch_pool = ThreadPoolExecutor(max_workers=_settings.recommendation.fetch_workers,
+                                 thread_name_prefix="recommendation-fetch")
+
+
+def _anchored(ticker, window):
+    """Return the full stored history of a ticker when it extends ``window``, else ``window``."""
+    if window is None or window.empty:
+        return window
+    stored = stored_history(ticker)
+    if stored is None or stored.empty or stored.index[-1] < window.index[-1] or stored.index[0] > window.index[0]:
+        return window
+    return stored
+
+
+def fetch_technicals(ticker, period=INDICATOR_PERIOD):
+    """
+    Return the technical indicators of a ticker over ``period`` of daily bars.
+
+    The ticker and its benchmark index are fetched in one bulk history call;
+    the benchmark enables the rolling beta column. Indicators are computed
+    over the whole locally stored history, whose first bar stays put as the
+    window slides, so each new day only extends the cached engine.
+
+    Returns:
+        pd.DataFrame: ``core.indicators.ticker_indicators`` output for the
+        window (empty without history).
+    """
+    benchmark = benchmark_for(ticker)
+    histories = fetch_bulk_history([ticker, benchmark], period=period)
+    window = histories.get(ticker)
+    if window is None or window.empty:
+        return ticker_indicators(ticker, window)
+    with tracing.span("indicators.compute", ticker=ticker):
+        return ticker_indicators(ticker, _anchored(ticker, window),
+                                 _anchored(benchmark, histories.get(benchmark)), since=window.index[0])
+
+
+def _run_source(func, ticker):
+    start = time.perf_counter()
+    result = func(ticker)
+    return result, time.perf_counter() - start
+
+
+def _has_price(stock_data):
+    return stock_data is not None and stock_data[1] is not None and 'currentPrice' in stock_data[1]
+
+
+def _gather_sources(ticker, concurrent=True, timeouts=None):
+    """
+    Fetch stock, financial, news and technical indicator data for a ticker.
+
+    With ``concurrent=True`` the fetches are issued at once on a shared
+    thread pool and each is bounded by its own timeout. A source that times
+    out or raises yields ``None`` instead of failing the whole recommendation.
+    If the stock data comes back without a price the other sources are not
+    waited for, since no prompt can be built anyway.
+
+    Returns:
+        tuple: (results, durations) dicts keyed by source name. Durations are
+        in seconds; a timed-out source reports the time waited for it.
+    """
+    timeouts = {**SOURCE_TIMEOUTS, **(timeouts or {})}
+    sources = {
+        "stock": fetch_stock_data,
+        "financial": fetch_financial_data,
+        "news": fetch_stock_news,
+        "technicals": fetch_technicals,
+    }
+    results, durations = {}, {}
+
+    if not concurrent:
+        for name, func in sources.items():
+            start = time.perf_counter()
+            try:
+                results[name] = func(ticker)
+            except Exception as e:
+                print(f"Error fetching {name} data for {ticker}: {e}")
+                results[name] = None
+            durations[name] = time.perf_counter() - start
+        return results, durations
+
+    start = time.perf_counter()
+    futures = {name: _fetch_pool.submit(tracing.bind(_run_source), func, ticker) for name, func in sources.items()}
+    for name, future in futures.items():
+        if name != "stock" and not _has_price(results["stock"]):
+            # Without a price there is no prompt to build, so don't wait for the rest
+            results[name] = None
+            continue
+        # Every timeout is measured from the moment the fetches were issued
+        remaining = max(0.0, timeouts[name] - (time.perf_counter() - start))
+        try:
+            results[name], durations[name] = future.result(timeout=remaining)
+        except FutureTimeoutError:
+            print(f"Timed out fetching {name} data for {ticker} after {timeouts[name]}s")
+            results[name] = None
+            durations[name] = time.perf_counter() - start
+        except Exception as e:
+            print(f"Error fetching {name} data for {ticker}: {e}")
+            results[name] = None
+            durations[name] = time.perf_counter() - start
+    return results, durations
+
+
+def build_recommendation_prompt(ticker, concurrent=True, timeouts=None, metrics=None,
+                                history_token_budget=DEFAULT_HISTORY_TOKEN_BUDGET):
+    """
+    Fetch the data for a ticker and build the Gemini recommendation prompt.
+
+    Args:
+        ticker (str): Stock ticker symbol.
+        concurrent (bool): Fetch stock, financial and news data in parallel.
+        timeouts (dict, optional): Per-source timeout overrides in seconds,
+            keyed by "stock", "financial", "news" and "technicals".
+        metrics (dict, optional): Filled with the seconds each source took
+            under "fetch_seconds" and estimated token counts under
+            "prompt_tokens" (raw vs compact history, and the whole prompt).
+        history_token_budget (int): Token budget for the price history section.
+
+    Returns:
+        str: The prompt, or an (error, detail) tuple when the stock data
+        needed for the prompt is unavailable.
+    """
+    with tracing.span("recommendation.fetch", ticker=ticker, concurrent=concurrent):
+        sources, durations = _gather_sources(ticker, concurrent=concurrent, timeouts=timeouts)
+    if metrics is not None:
+        metrics["fetch_seconds"] = durations
+
+    stock_history, stock_info = sources["stock"] or (None, None)
     if stock_info is None:
         return "Error: No stock info available", "Could not fetch data for the given ticker."
     if 'currentPrice' in stock_info:
@@ -29,22 +171,24 @@ def generate_recommendation(ticker):
     pe_ratio = stock_info.get('trailingPE', 'N/A')
     market_cap = stock_info.get('marketCap', 'N/A')
 
-    financial_data = fetch_financial_data(ticker)
+    financial_data = sources["financial"]
     if financial_data is None:
         financial_data = "No financial data available."
     
-    news_data = fetch_stock_news(ticker)
+    news_data = sources["news"]
     # Fix typo: 'contect' -> 'content'
     combined_news_data = "\n".join(
         news_data[i]['title'] + " " + news_data[i].get('content', '') 
         for i in range(len(news_data))
     ) if isinstance(news_data, list) and news_data else "No news data available."
-    combined_stock_history = stock_history.astype(str).to_string()
     
     # Optionally, extract sentiment from news
     # sentiment = analyze_sentiment(news_data) if isinstance(news_data, list) and news_data else "No Sentiment Data"
 
-    prompt = f"""
+    with tracing.span("recommendation.prompt", ticker=ticker) as prompt_span:
+        combined_stock_history = encode_history(stock_history, token_budget=history_token_budget)
+        technical_summary = describe_latest(sources["technicals"], last_close=price)
+        prompt = f"""
     You are a stock recommendation expert. Use the following data to provide a recommendation on whether the stock should be a "Buy", "Sell", or "Hold":
     Provide Explanation for your recommendation based on Stock data, Financial data and Stock News. Also do sentiment analysis on the Stock News data provided. 
 
@@ -52,7 +196,9 @@ def generate_recommendation(ticker):
     - Price: ${price}
     - P/E Ratio: {pe_ratio}
     - Market Cap: {market_cap}
-    - Stock History: {combined_stock_history}
+    - Stock History (summary features and recent closes):
+{combined_stock_history}
+    - Technical Indicators: {technical_summary}
 
     Financial Data: {financial_data}
     
@@ -62,12 +208,68 @@ def generate_recommendation(ticker):
     - Start with a clear heading  Recommendation:  "Buy", "Sell", or "Hold"
     - Provide short Explanation for your recommendation.
     """
-    
-    #print("Prompt to model:", prompt)
-    model = genai.GenerativeModel("gemini-2.0-flash")
-    recommendation = model.generate_content(prompt).text.strip()
-    #print("Prompt recommendation:", recommendation)
-    return recommendation
+        if prompt_span:
+            prompt_span.set(prompt_tokens=estimate_tokens(prompt), news_articles=tracing.payload_size(news_data))
+    if metrics is not None:
+        # The raw table is only rendered to measure what the compact encoding saves
+        raw_history = stock_history.astype(str).to_string() if stock_history is not None else ""
+        metrics["prompt_tokens"] = {
+            "history_raw": estimate_tokens(raw_history),
+            "history_compact": estimate_tokens(combined_stock_history),
+            "prompt": estimate_tokens(prompt),
+        }
+    return prompt
+
+
+def generate_from_prompt(prompt, use_cache=True):
+    """Run a recommendation prompt through Gemini and return the response text."""
+    return generate_text(RECOMMENDATION_MODEL, prompt, use_cache=use_cache).strip()
+
+
+def generate_recommendation(ticker, concurrent=True, timeouts=None, metrics=None,
+                            history_token_budget=DEFAULT_HISTORY_TOKEN_BUDGET, use_cache=True):
+    """
+    Generate a Buy/Sell/Hold recommendation for a ticker with Gemini.
+
+    Takes the same arguments as ``build_recommendation_prompt``, plus
+    ``use_cache`` to bypass the LLM response cache.
+
+    Returns:
+        str: The model's recommendation text, or an (error, detail) tuple when
+        the stock data needed for the prompt is unavailable.
+    """
+    with tracing.span("recommendation", ticker=ticker) as span:
+        prompt = build_recommendation_prompt(ticker, concurrent=concurrent, timeouts=timeouts, metrics=metrics,
+                                             history_token_budget=history_token_budget)
+        if isinstance(prompt, tuple):
+            span.set(error=prompt[0])
+            return prompt
+        return generate_from_prompt(prompt, use_cache=use_cache)
+
+
+def stream_recommendation(ticker, concurrent=True, timeouts=None, metrics=None,
+                          history_token_budget=DEFAULT_HISTORY_TOKEN_BUDGET, use_cache=True):
+    """
+    Streaming variant of ``generate_recommendation``.
+
+    Yields:
+        str: Recommendation text chunks as Gemini produces them. When the stock
+        data is unavailable a single "error: detail" chunk is yielded instead.
+    """
+    # Not made current: the consumer may resume this generator from other contexts
+    root = tracing.start_span("recommendation", ticker=ticker, stream=True)
+    try:
+        with tracing.activate(root):
+            prompt = build_recommendation_prompt(ticker, concurrent=concurrent, timeouts=timeouts, metrics=metrics,
+                                                 history_token_budget=history_token_budget)
+        if isinstance(prompt, tuple):
+            root.set(error=prompt[0])
+            yield f"{prompt[0]}: {prompt[1]}"
+            return
+        yield from tracing.iterate_in(root, stream_text(RECOMMENDATION_MODEL, prompt, use_cache=use_cache))
+    finally:
+        root.end()
+
 
 if __name__ == "__main__":
     ticker = "INFY"
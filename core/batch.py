@@ -0,0 +1,241 @@
+"""
+Batch recommendation engine for a watchlist of tickers.
+
+Usage:
+    python -m core.batch INFY.NS TCS.NS RELIANCE.BO --out results.jsonl
+    python -m core.batch --file watchlist.txt --out results.jsonl --workers 32
+    python -m core.batch --file nifty500.txt --screen "PE < 20 and ROE > 15%, top 20 by revenueGrowth"
+"""
+import argparse
+import contextlib
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(CURRENT_DIR)
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from config.settings import get_settings
+from core import agent_handler
+from core.agent_handler import INDICATOR_PERIOD
+from core.indicators import benchmark_for
+from core.screener import Screener, parse_query
+from core.utils import extract_recommendation
+from services.data_fetcher import fetch_bulk_history, reserve_cache
+
+DEFAULT_WORKERS = get_settings().batch.workers
+DEFAULT_LLM_CONCURRENCY = get_settings().batch.llm_concurrency
+
+# Shared by every run in the process (CLI, API requests), so concurrent runs
+# together never exceed DEFAULT_LLM_CONCURRENCY model calls or DEFAULT_WORKERS threads
+_llm_slots = threading.BoundedSemaphore(DEFAULT_LLM_CONCURRENCY)
+_pool = None
+_pool_lock = threading.Lock()
+# Shared cache entries one ticker occupies during a run: the 1mo and indicator
+# histories plus info, news and fundamentals, with headroom for benchmarks
+CACHE_ENTRIES_PER_TICKER = 6
+
+
+def load_completed(output_path):
+    """
+    Read a previous JSONL run and return the tickers that finished without error.
+
+    Truncated trailing lines from an interrupted run are ignored.
+    """
+    completed = set()
+    if not output_path or not os.path.exists(output_path):
+        return completed
+    with open(output_path, "r", encoding="utf-8") as file:
+        for line in file:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if record.get("ticker") and not record.get("error"):
+                completed.add(record["ticker"])
+    return completed
+
+
+def repair_partial_line(output_path):
+    """
+    Make a JSONL file from an interrupted run safe to append to.
+
+    A trailing line without a newline is dropped if it does not decode
+    (the process died mid-write) and terminated otherwise, so the next
+    record starts on a line of its own.
+    """
+    if not output_path or not os.path.exists(output_path):
+        return
+    with open(output_path, "r+b") as file:
+        data = file.read()
+        if not data or data.endswith(b"\n"):
+            return
+        start = data.rfind(b"\n") + 1
+        try:
+            json.loads(data[start:])
+        except ValueError:
+            file.seek(start)
+            file.truncate()
+        else:
+            file.write(b"\n")
+
+
+def _shared_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(max_workers=DEFAULT_WORKERS, thread_name_prefix="batch")
+        return _pool
+
+
+@contextlib.contextmanager
+def _llm_slot(run_slots):
+    # Take the run's own slot first so waiting runs do not hold process-wide ones
+    with run_slots or contextlib.nullcontext():
+        with _llm_slots:
+            yield
+
+
+def _recommend(ticker, run_slots):
+    start = time.perf_counter()
+    metrics = {}
+    result = {"ticker": ticker, "tag": None, "recommendation": None, "error": None}
+    try:
+        prompt = agent_handler.build_recommendation_prompt(ticker, metrics=metrics)
+        if isinstance(prompt, tuple):
+            result["error"] = prompt[0]
+        else:
+            # Data fetches run fully parallel; only the model calls are throttled
+            with _llm_slot(run_slots):
+                raw_recommendation = agent_handler.generate_from_prompt(prompt)
+            result["tag"], result["recommendation"] = extract_recommendation(raw_recommendation)
+    except Exception as e:
+        result["error"] = f"{type(e).__name__}: {e}"
+    result["fetch_seconds"] = metrics.get("fetch_seconds")
+    result["elapsed_seconds"] = round(time.perf_counter() - start, 3)
+    return result
+
+
+def run_batch(tickers, output_path=None, workers=None, llm_concurrency=None, resume=True):
+    """
+    Generate recommendations for many tickers in parallel.
+
+    Price history for the whole list is pre-loaded with one bulk download, so
+    the per-ticker workers only fetch quotes, fundamentals and news; the shared
+    cache is grown to hold every seeded window until it is read. Results
+    are yielded (and appended to ``output_path`` as JSON lines) in completion
+    order. With ``resume=True`` tickers already recorded without an error in
+    ``output_path`` are skipped, so an interrupted run can simply be restarted.
+
+    Args:
+        tickers (list[str]): Ticker symbols; duplicates are ignored.
+        output_path (str, optional): JSONL file to append results to.
+        workers (int, optional): Tickers processed concurrently in a pool of
+            this run's own; by default the process-wide pool of ``DEFAULT_WORKERS``.
+        llm_concurrency (int, optional): Maximum simultaneous Gemini calls of
+            this run. All runs together are limited to ``DEFAULT_LLM_CONCURRENCY``.
+        resume (bool): Skip tickers already completed in ``output_path``.
+
+    Yields:
+        dict: One result per ticker with "ticker", "tag", "recommendation",
+        "error", "fetch_seconds" and "elapsed_seconds".
+    """
+    tickers = list(dict.fromkeys(t.strip().upper() for t in tickers if t.strip()))
+    if resume:
+        done = load_completed(output_path)
+        tickers = [t for t in tickers if t not in done]
+    if not tickers:
+        return
+
+    # Room for every seeded window until the workers read it; released afterwards
+    with reserve_cache(CACHE_ENTRIES_PER_TICKER * len(tickers)):
+        try:
+            fetch_bulk_history(tickers)
+            # Indicator windows and benchmarks, so each worker's fetch_technicals is a cache hit
+            benchmarks = sorted({benchmark_for(t) for t in tickers})
+            fetch_bulk_history(tickers + benchmarks, period=INDICATOR_PERIOD)
+        except Exception as e:
+            # Workers fall back to per-ticker history requests
+            print(f"Bulk history download failed: {e}")
+
+        run_slots = threading.BoundedSemaphore(llm_concurrency) if llm_concurrency else None
+        repair_partial_line(output_path)
+        out = open(output_path, "a", encoding="utf-8") if output_path else None
+        own_pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="batch") if workers else None
+        executor = own_pool or _shared_pool()
+        futures = []
+        try:
+            futures = [executor.submit(_recommend, ticker, run_slots) for ticker in tickers]
+            for future in as_completed(futures):
+                result = future.result()
+                if out:
+                    out.write(json.dumps(result, default=str) + "\n")
+                    out.flush()
+                yield result
+        finally:
+            # On interrupt, drop queued tickers; they are picked up on resume
+            for future in futures:
+                future.cancel()
+            if own_pool:
+                own_pool.shutdown(wait=False, cancel_futures=True)
+            if out:
+                out.close()
+
+
+def _read_tickers(args):
+    tickers = list(args.tickers)
+    if args.file:
+        with open(args.file, "r", encoding="utf-8") as file:
+            for line in file:
+                line = line.split("#", 1)[0].strip()
+                if line:
+                    tickers.extend(t for t in line.replace(",", " ").split())
+    return tickers
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate Buy/Sell/Hold recommendations for a watchlist.")
+    parser.add_argument("tickers", nargs="*", help="Ticker symbols, e.g. INFY.NS TCS.NS")
+    parser.add_argument("--file", help="Text file with tickers (one per line or comma separated)")
+    parser.add_argument("--out", default="recommendations.jsonl", help="JSONL output file")
+    parser.add_argument("--workers", type=int, help=f"Tickers in flight (default {DEFAULT_WORKERS})")
+    parser.add_argument("--llm-concurrency", type=int,
+                        help=f"Simultaneous Gemini calls (at most {DEFAULT_LLM_CONCURRENCY})")
+    parser.add_argument("--no-resume", action="store_true", help="Re-run tickers already in the output file")
+    parser.add_argument("--screen", metavar="QUERY",
+                        help='Only recommend tickers passing a screener query, e.g. "PE < 20, top 20 by ROE"')
+    args = parser.parse_args(argv)
+
+    tickers = _read_tickers(args)
+    if not tickers:
+        parser.error("no tickers given")
+    if args.screen:
+        try:
+            parse_query(args.screen)
+        except ValueError as e:
+            parser.error(str(e))
+        screener = Screener(tickers)
+        screener.refresh(fetch_missing=True, workers=args.workers or DEFAULT_WORKERS)
+        shortlist = screener.query(args.screen)
+        print(shortlist.to_string())
+        print(f"Screened {len(tickers)} tickers down to {len(shortlist)}")
+        tickers = list(shortlist.index)
+
+    start = time.perf_counter()
+    count = failed = 0
+    for result in run_batch(tickers, args.out, workers=args.workers,
+                            llm_concurrency=args.llm_concurrency, resume=not args.no_resume):
+        count += 1
+        failed += bool(result["error"])
+        status = result["error"] or result["tag"]
+        print(f"[{count}] {result['ticker']}: {status} ({result['elapsed_seconds']}s)")
+    print(f"Processed {count} tickers ({failed} failed) in {time.perf_counter() - start:.1f}s -> {args.out}")
+
+
+if __name__ == "__main__":
+    main()
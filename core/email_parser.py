@@ -0,0 +1,188 @@
+"""
+Rule-based extraction of transactions from regular bank and broker email templates.
+
+Snippets that match a known template are turned into ``Transaction`` records
+without an LLM call; everything else is left for Gemini.
+"""
+import re
+from datetime import date
+
+from core.transactions import BSE_TRADE, INVESTMENT, SPEND, Transaction, snippet_id
+
+# Known merchants: lowercase keyword -> (display name, spend category)
+MERCHANTS = {
+    "swiggy": ("Swiggy", "Food"),
+    "zomato": ("Zomato", "Food"),
+    "dominos": ("Domino's", "Food"),
+    "flipkart": ("Flipkart", "Shopping"),
+    "amazon": ("Amazon", "Shopping"),
+    "myntra": ("Myntra", "Shopping"),
+    "uber": ("Uber", "Travel"),
+    "ola": ("Ola", "Travel"),
+    "irctc": ("IRCTC", "Travel"),
+    "makemytrip": ("MakeMyTrip", "Travel"),
+    "netflix": ("Netflix", "Entertainment"),
+    "google pay": ("Google Pay", None),
+    "phonepe": ("PhonePe", None),
+    "paytm": ("Paytm", None),
+}
+
+# Spend category keywords, used when the merchant does not imply one
+SPEND_CATEGORY_KEYWORDS = {
+    "Food": ("meal", "food", "restaurant", "order"),
+    "Travel": ("taxi", "cab", "flight", "train", "hotel"),
+    "Bills": ("electricity", "water bill", "gas bill", "broadband", "mobile bill", "recharge", "bill"),
+    "Shopping": ("purchase",),
+}
+
+_MERCHANT_PATTERN = re.compile(
+    r"\b(" + "|".join(re.escape(keyword) for keyword in sorted(MERCHANTS, key=len, reverse=True)) + r")\b",
+    re.IGNORECASE,
+)
+_SPEND_CATEGORY_PATTERNS = [
+    (category, re.compile(r"\b(" + "|".join(map(re.escape, keywords)) + r")\b", re.IGNORECASE))
+    for category, keywords in SPEND_CATEGORY_KEYWORDS.items()
+]
+
+_AMOUNT = re.compile(r"(?:₹|\bRs\.?|\bINR)\s?([\d,]+(?:\.\d{1,2})?)", re.IGNORECASE)
+_REFERENCE = re.compile(
+    r"\b(?:Transaction ID|Confirmation ID|Order#|Order|Ref(?:erence)?|ID)\s*[:#]?\s*([A-Z]{2,}[A-Z0-9-]*\d[A-Z0-9-]*)"
+)
+
+_MONTHS = {name: number for number, name in enumerate(
+    ("jan", "feb", "mar", "apr", "may", "jun", "jul", "aug", "sep", "oct", "nov", "dec"), start=1)}
+_DATE_ISO = re.compile(r"\b(\d{4})-(\d{2})-(\d{2})\b")
+_DATE_MONTH_FIRST = re.compile(r"\b([A-Za-z]{3,9})\.?\s+(\d{1,2}),?\s+(\d{4})\b")
+_DATE_DAY_FIRST = re.compile(r"\b(\d{1,2})(?:st|nd|rd|th)?\s+([A-Za-z]{3,9}),?\s+(\d{4})\b")
+# Indian bank alerts write numeric dates day first
+_DATE_NUMERIC = re.compile(r"\b(\d{1,2})[/-](\d{1,2})[/-](\d{4})\b")
+
+# Templates, tried in order
+_TRADE = re.compile(
+    r"(?P<quantity>\d+)\s+shares?\s+of\s+(?P<name>.+?)\s*\((?:BSE|NSE)\s*:\s*(?P<code>[A-Z0-9]+)\)",
+    re.IGNORECASE,
+)
+_SELL = re.compile(r"\b(?:sold|sell|sale)\b", re.IGNORECASE)
+_BUY = re.compile(r"\b(?:bought|buy|purchased)\b", re.IGNORECASE)
+_INVESTMENT = re.compile(r"\b(?:SIP|mutual fund|invest(?:ed|ment)?)\b", re.IGNORECASE)
+_FUND_NAME = re.compile(
+    r"\b(?:into|for|in)\s+(?:an?\s+|the\s+)?(?:new\s+)?(?P<fund>[A-Za-z][\w&.\- ]*?\bfund)\b", re.IGNORECASE
+)
+_SPEND = re.compile(r"\b(?:debit(?:ed)?|payment|purchase|paid|spent|order|bill)\b", re.IGNORECASE)
+
+
+def _month(name):
+    return _MONTHS.get(name[:3].lower())
+
+
+def parse_date(text):
+    """Return the first date found in ``text``, or None."""
+    candidates = []
+    for match in _DATE_ISO.finditer(text):
+        candidates.append((match.start(), int(match.group(1)), int(match.group(2)), int(match.group(3))))
+    for match in _DATE_MONTH_FIRST.finditer(text):
+        month = _month(match.group(1))
+        if month:
+            candidates.append((match.start(), int(match.group(3)), month, int(match.group(2))))
+    for match in _DATE_DAY_FIRST.finditer(text):
+        month = _month(match.group(2))
+        if month:
+            candidates.append((match.start(), int(match.group(3)), month, int(match.group(1))))
+    for match in _DATE_NUMERIC.finditer(text):
+        candidates.append((match.start(), int(match.group(3)), int(match.group(2)), int(match.group(1))))
+    for _, year, month, day in sorted(candidates):
+        try:
+            return date(year, month, day)
+        except ValueError:
+            continue
+    return None
+
+
+def parse_amount(text):
+    """Return the first rupee amount found in ``text``, or None."""
+    match = _AMOUNT.search(text)
+    if not match:
+        return None
+    try:
+        return float(match.group(1).replace(",", ""))
+    except ValueError:
+        return None
+
+
+def _reference(text):
+    match = _REFERENCE.search(text)
+    return match.group(1).rstrip(".") if match else None
+
+
+def _spend_details(text):
+    merchant_match = _MERCHANT_PATTERN.search(text)
+    merchant, spend_category = (None, None)
+    if merchant_match:
+        merchant, spend_category = MERCHANTS[merchant_match.group(1).lower()]
+    if spend_category is None:
+        for category, pattern in _SPEND_CATEGORY_PATTERNS:
+            match = pattern.search(text)
+            if match:
+                spend_category = category
+                if merchant is None and category == "Bills":
+                    merchant = f"{match.group(1).title()} Bill" if match.group(1).lower() != "bill" else "Bill"
+                break
+    return merchant, spend_category
+
+
+def parse_snippet(snippet):
+    """
+    Extract a transaction from a snippet that matches a known template.
+
+    Returns:
+        Transaction or None: None when the snippet does not match a template
+        or lacks an amount or a date. The record's ``source_id`` is the
+        snippet's ``snippet_id``.
+    """
+    amount = parse_amount(snippet)
+    when = parse_date(snippet)
+    if amount is None or when is None:
+        return None
+    reference = _reference(snippet)
+
+    trade = _TRADE.search(snippet)
+    if trade:
+        side = "sell" if _SELL.search(snippet) else "buy" if _BUY.search(snippet) else None
+        return Transaction(
+            date=when, category=BSE_TRADE, amount=amount, merchant=trade.group("name").strip(),
+            reference=reference, quantity=int(trade.group("quantity")),
+            security_code=trade.group("code").upper(), side=side, source_id=snippet_id(snippet),
+        )
+
+    if _INVESTMENT.search(snippet):
+        fund = _FUND_NAME.search(snippet)
+        if fund:
+            name = fund.group("fund").strip()
+            merchant = name if any(c.isupper() for c in name) else name.title()
+            return Transaction(date=when, category=INVESTMENT, amount=amount, merchant=merchant,
+                               reference=reference, source_id=snippet_id(snippet))
+
+    if _SPEND.search(snippet):
+        merchant, spend_category = _spend_details(snippet)
+        if merchant:
+            return Transaction(date=when, category=SPEND, amount=amount, merchant=merchant,
+                               spend_category=spend_category, reference=reference,
+                               source_id=snippet_id(snippet))
+    return None
+
+
+def partition_snippets(snippets):
+    """
+    Split snippets into rule-parsed transactions and leftovers that need the LLM.
+
+    Returns:
+        tuple[list[Transaction], list[str]]
+    """
+    parsed, leftovers = [], []
+    for snippet in snippets:
+        transaction = parse_snippet(snippet)
+        if transaction is None:
+            leftovers.append(snippet)
+        else:
+            parsed.append(transaction)
+    return parsed, leftovers
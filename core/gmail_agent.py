@@ -1,134 +1,494 @@
 import os
-import google.generativeai as genai
-from dotenv import load_dotenv
+import sys
 import re
+import json
+import requests
+from datetime import date, datetime, time, timedelta
+
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(CURRENT_DIR)
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from config.settings import get_settings
+from core.email_parser import parse_amount, parse_snippet, partition_snippets
+from core.llm_client import genai, generate_text
+from core import tracing
+from core.prompt_builder import estimate_tokens
+from core.query_planner import answer_query, plan_query, to_gmail_query
+from services.gmail_client import GMAIL_API_URL, GmailSync, MailIndex, RestGmailTransport
+from core.transactions import (
+    BSE_TRADE, INVESTMENT, SPEND, Transaction, TransactionTable, format_amount, from_record, render_summary_text,
+    snippet_id, to_record,
+)
+
+SUMMARY_MODEL = get_settings().llm.summary_model
+
+# Estimated snippet tokens per extraction call, well inside the model context
+EXTRACTION_BATCH_TOKENS = get_settings().llm.extraction_batch_tokens
+# Extraction calls in flight at once
+EXTRACTION_CONCURRENCY = get_settings().llm.extraction_concurrency
+SNIPPET_SEPARATOR = "\n\n---EMAIL_SEPARATOR---\n\n"
+
+# Transaction types as the model may spell them
+TYPE_ALIASES = {
+    "bse trade": BSE_TRADE,
+    "bse trades": BSE_TRADE,
+    "trade": BSE_TRADE,
+    "investment": INVESTMENT,
+    "investments": INVESTMENT,
+    "spend": SPEND,
+    "spends": SPEND,
+}
+
+
+# Used when neither the planner nor Gemini can produce a query
+FALLBACK_GMAIL_QUERY = 'from:zerodha.com OR from:groww.in OR from:icicidirect.com OR subject:"BSE Trade" OR subject:"Investment Update" OR subject:"Payment Confirmation" after:2025/05/01 before:2025/05/31'
+
+# The sample mailbox covers May 2025; relative dates ("this month") are resolved against this day
+SAMPLE_MAILBOX_DATE = date(2025, 5, 31)
+
+def reference_date() -> date:
+    """Return the day relative dates in questions are resolved against."""
+    return date.today() if get_gmail_sync() is not None else SAMPLE_MAILBOX_DATE
+
+@tracing.traced("gmail.build_query")
+def build_gmail_search_query(natural_question: str, today: date = None) -> str:
+    """
+    Generates a Gmail search query based on a natural language question.
 
+    The local query planner handles questions it can parse (dates, categories,
+    merchants) without a model call. Other questions are converted by Gemini,
+    and if that fails a broad illustrative query is returned.
 
-def build_gmail_search_query(natural_question: str) -> str:
+    Args:
+        natural_question (str): The user's query in natural language.
+        today (date, optional): Reference date for relative ranges.
+
+    Returns:
+        str: A Gmail search query string.
     """
-    Generates a simulated Gmail search query based on a natural language question.
+    today = today or reference_date()
+    plan = plan_query(natural_question, today=today)
+    if plan is not None:
+        tracing.current_span().set(query_source="planner")
+        return to_gmail_query(plan)
+
+    system_prompt = f"""
+    You are an AI expert at writing Gmail search queries.
+    Convert the following user question into a Gmail search query syntax.
+    Only output the Gmail query string. Do not explain anything.
+
+    IMPORTANT RULES:
+    1. Today is {today:%Y/%m/%d}. Resolve relative dates ("this month", "last week") against it.
+    2. Include the ENTIRE day in date ranges; "before:" is exclusive
+    3. Never skip any days in the range
+
+    Examples:
+    "Flight orders this month" -> "flight after:{today:%Y/%m}/01 before:{today + timedelta(days=1):%Y/%m/%d}"
+    "OTP from Axis bank yesterday" -> "OTP Axis after:{today - timedelta(days=1):%Y/%m/%d} before:{today:%Y/%m/%d}"
+
+    User Query:
+    {natural_question}
+    """
+    tracing.current_span().set(query_source="llm")
+    try:
+        query = generate_text(SUMMARY_MODEL, system_prompt).strip().strip('"')
+    except Exception as e:
+        print(f"Warning: Could not generate a Gmail query: {e}")
+        query = ""
+    return query or FALLBACK_GMAIL_QUERY
+
+def get_local_transactions() -> TransactionTable:
+    """
+    Return the transactions already known locally, without any model call.
 
-    In a real-world application, this function would leverage the Gemini API to
-    intelligently craft a precise Gmail API search query based on the user's
-    natural language input, considering dates, senders, and keywords.
-    For this example, it returns a hardcoded, illustrative query.
+    With Gmail configured these are the rule-parsed transactions of the mail
+    index; otherwise those of the sample mailbox.
+    """
+    gmail = get_gmail_sync()
+    if gmail is None:
+        return TransactionTable(partition_snippets(SAMPLE_EMAIL_SNIPPETS)[0])
+    return TransactionTable(indexed_transactions(gmail.index))
+
+def _unparsed_snippets_for(plan) -> list[str]:
+    """Return the known snippets no template parsed that may fall in the plan's date range."""
+    gmail = get_gmail_sync()
+    if gmail is None:
+        return partition_snippets(SAMPLE_EMAIL_SNIPPETS)[1]
+    # internalDate is when the message arrived; allow a day either side for time zones
+    since = until = None
+    if plan.start:
+        since = int(datetime.combine(plan.start - timedelta(days=1), time()).timestamp() * 1000)
+    if plan.end:
+        until = int(datetime.combine(plan.end + timedelta(days=2), time()).timestamp() * 1000)
+    return gmail.index.unparsed_snippets(since, until)
+
+def answer_financial_question(user_query: str, today: date = None, sync: bool = True, use_cache: bool = True):
+    """
+    Answer a question from the local transaction index when the planner understands it.
+
+    The mailbox is synced first (unless ``sync`` is False because the caller
+    just did), and indexed emails in the planned date range that no template
+    parsed are extracted with Gemini before aggregating. If that extraction
+    fails the answer reports how many emails were left out instead of
+    presenting the partial total.
 
     Args:
-        natural_question (str): The user's query in natural language.
+        user_query (str): The user's question, e.g. "how much on food in May?".
+        today (date, optional): Reference date for relative ranges.
+        sync (bool): Bring the mail index up to date before answering.
+        use_cache (bool): Reuse a cached model response for an identical prompt.
 
     Returns:
-        str: A simulated Gmail search query string.
+        dict or None: The ``core.query_planner.answer_query`` result plus
+        "unparsed" (emails left out of the total), or None when the question
+        needs the LLM path.
     """
-    # This part would typically use a Gemini model to convert natural language
-    # into a precise Gmail search query syntax.
-    # For this example, we'll return a hardcoded, relevant query.
+    with tracing.span("gmail.answer_local") as span:
+        plan = plan_query(user_query, today=today or reference_date())
+        if plan is None:
+            span.set(planned=False)
+            return None
+        if sync:
+            sync_mailbox()
+        transactions = get_local_transactions().transactions
+        pending = _unparsed_snippets_for(plan)
+        failed = []
+        if pending:
+            transactions = transactions + extract_transactions(
+                user_query, pending, use_cache=use_cache, failed=failed).transactions
+        answer = answer_query(plan, TransactionTable(transactions))
+        answer["unparsed"] = len(failed)
+        if failed:
+            noun = "email" if len(failed) == 1 else "emails"
+            answer["text"] = (f"{answer['description']}: incomplete, {len(failed)} {noun} in this range "
+                              f"could not be read. The {answer['count']} transactions found add up to "
+                              f"{format_amount(answer['total'])}.")
+        span.set(planned=True, matches=answer["count"], extracted=len(pending), unparsed=len(failed))
+        return answer
+
+def build_extraction_prompt(user_query: str, email_snippets: list[str]) -> str:
+    """Build the Gemini prompt that extracts transactions from email snippets as JSON."""
+    # Combine all email snippets into a single string for the prompt, numbered so
+    # every transaction can be traced back to its email
+    combined_emails = SNIPPET_SEPARATOR.join(
+        f"EMAIL {number}: {snippet}" for number, snippet in enumerate(email_snippets, start=1)
+    )
+
+    # Craft a detailed prompt for the Gemini model to ensure accurate extraction and formatting
+    prompt = f"""
+    You are a highly analytical financial assistant designed to process email snippets and extract specific financial details.
+    Your task is to identify all **BSE Trades**, **Investments**, and **Spends** in the provided email content.
 
-    # model = genai.GenerativeModel("gemini-1.5-flash")
-    # system_prompt = f"""
-    # You are an AI expert at writing Gmail search queries.
-    # Convert the following user question into a Gmail search query syntax.
-    # Only output the Gmail query string. Do not explain anything.
+    EMAIL SNIPPETS:
+    {combined_emails}
 
-    # IMPORTANT RULES:
-    # 1. For "this month" queries in May 2025, ALWAYS use exactly:
-    #    after:2025/05/01 before:2025/05/31
-    # 2. Include the ENTIRE day in date ranges
-    # 3. Never skip any days in the range
+    USER QUESTION:
+    {user_query}
 
-    # Examples:
-    # "Zomato orders this month" -> "Zomato after:2025/05/01 before:2025/05/31"
-    # "Flight orders this month" -> "flight after:2025/05/01 before:2025/05/31"
-    # "IRCTC last week" -> "IRCTC after:2025/05/10 before:2025/05/17"
-    # "OTP from Axis bank yesterday" -> "OTP Axis after:2025/05/17 before:2025/05/18"
-    # "Job updates" -> "job updates after:2025/05/17 before:2025/05/18"
+    Instructions for your output:
+    - Output ONLY a JSON array, with one object per transaction and no other text.
+    - Each object has the keys: "date" (YYYY-MM-DD), "type" ("BSE Trade", "Investment" or "Spend"),
+      "amount" (number, in INR, without currency symbols or commas), "merchant" (company, fund or merchant name),
+      "spend_category" (e.g. "Food", "Travel", "Shopping", "Bills", or null),
+      "reference" (transaction/order ID or null), "quantity" (shares, or null),
+      "security_code" (BSE scrip code, or null), "side" ("buy", "sell" or null)
+      and "email" (the number of the EMAIL it was found in).
+    - Do not calculate totals.
+    - Be precise and only use information explicitly stated in the snippets.
+    - If there are no transactions, output [].
+    """
+    return prompt
 
+_JSON_ARRAY = re.compile(r'\[.*\]', re.DOTALL)
 
-    # User Query:
-    # {natural_question}
-    # """
-    # response = model.generate_content(system_prompt)
-    # return response.text.strip().strip('"')
+def parse_llm_transactions(response_text: str, email_snippets: list[str] = None) -> list[Transaction]:
+    """
+    Parse the JSON array returned for ``build_extraction_prompt`` into transactions.
 
-    # Simulated output for "financial data for BSE Trades, Investments and spends for this month"
-    # This query would target emails from brokerage firms, investment platforms, and transaction alerts.
-    return 'from:zerodha.com OR from:groww.in OR from:icicidirect.com OR subject:"BSE Trade" OR subject:"Investment Update" OR subject:"Payment Confirmation" after:2025/05/01 before:2025/05/31'
+    Items with an unknown type, a missing amount or an unparseable date are
+    skipped. With the prompt's ``email_snippets`` given, each item's "email"
+    number sets the record's ``source_id``.
+    """
+    match = _JSON_ARRAY.search(response_text)
+    if not match:
+        print("Warning: No JSON transactions found in the model response.")
+        return []
+    try:
+        items = json.loads(match.group(0))
+    except json.JSONDecodeError as e:
+        print(f"Warning: Could not parse model transactions: {e}")
+        return []
+
+    transactions = []
+    for item in items:
+        if not isinstance(item, dict):
+            continue
+        category = TYPE_ALIASES.get(str(item.get("type", "")).strip().lower())
+        try:
+            when = date.fromisoformat(str(item.get("date", ""))[:10])
+            amount = float(str(item.get("amount")).replace(",", "").replace("₹", ""))
+        except (TypeError, ValueError):
+            continue
+        if category is None:
+            continue
+        quantity = item.get("quantity")
+        email = item.get("email")
+        source_id = None
+        if email_snippets and isinstance(email, int) and 1 <= email <= len(email_snippets):
+            source_id = snippet_id(email_snippets[email - 1])
+        transactions.append(Transaction(
+            date=when,
+            category=category,
+            amount=amount,
+            merchant=str(item.get("merchant") or "Unknown").strip(),
+            spend_category=item.get("spend_category") or None,
+            reference=item.get("reference") or None,
+            quantity=int(quantity) if isinstance(quantity, (int, float)) else None,
+            security_code=str(item["security_code"]) if item.get("security_code") else None,
+            side=(item.get("side") or None),
+            source="llm",
+            source_id=source_id,
+        ))
+    return transactions
+
+def batch_snippets(email_snippets: list[str], token_budget: int = EXTRACTION_BATCH_TOKENS) -> list[list[str]]:
+    """
+    Split snippets into consecutive batches of at most ``token_budget`` estimated tokens.
 
-def summarize_financial_data(user_query: str, email_snippets: list[str]) -> str:
+    A single snippet larger than the budget gets a batch of its own.
+    """
+    separator_tokens = estimate_tokens(SNIPPET_SEPARATOR)
+    batches, current, used = [], [], 0
+    for snippet in email_snippets:
+        tokens = estimate_tokens(snippet) + separator_tokens
+        if current and used + tokens > token_budget:
+            batches.append(current)
+            current, used = [], 0
+        current.append(snippet)
+        used += tokens
+    if current:
+        batches.append(current)
+    return batches
+
+def _extract_batch(user_query: str, email_snippets: list[str], use_cache: bool) -> list[Transaction]:
+    with tracing.span("gmail.extract_batch", snippets=len(email_snippets)) as span:
+        prompt = build_extraction_prompt(user_query, email_snippets)
+        # Generate content using the Gemini model (gemini-1.5-flash is good for speed)
+        response_text = generate_text(SUMMARY_MODEL, prompt, use_cache=use_cache)
+        with tracing.span("gmail.parse_llm"):
+            transactions = parse_llm_transactions(response_text, email_snippets)
+        span.set(transactions=len(transactions))
+        return transactions
+
+def stream_transactions(user_query: str, email_snippets: list[str], use_cache: bool = True,
+                        batch_tokens: int = EXTRACTION_BATCH_TOKENS, concurrency: int = EXTRACTION_CONCURRENCY,
+                        failed: list = None):
     """
-    Analyzes a list of email snippets using the Gemini API to extract and summarize
-    financial transactions (BSE trades, investments, and spends).
+    Extract transactions in stages so callers can render progressively.
+
+    Snippets matching known bank/broker templates are parsed locally by
+    ``core.email_parser`` and yielded first. The remaining snippets are split
+    into token-bounded batches that are sent to Gemini concurrently (map);
+    each batch's transactions are yielded as soon as it completes, and the
+    caller merges them locally (reduce). Batches partition the snippets and
+    every record carries the id of its email, so only a transaction reported
+    twice for the same email is dropped.
 
     Args:
         user_query (str): The original natural language question from the user.
         email_snippets (list[str]): A list of short text summaries (snippets) from emails.
+        use_cache (bool): Reuse a cached model response for an identical prompt.
+        batch_tokens (int): Estimated snippet tokens per model call.
+        concurrency (int): Maximum model calls in flight.
+        failed (list, optional): Receives the snippets whose extraction failed;
+            without it a failure of a single-batch extraction is raised.
+
+    Yields:
+        list[Transaction]: One batch per stage.
+    """
+    with tracing.span("gmail.parse_rules", snippets=len(email_snippets)) as span:
+        parsed, leftovers = partition_snippets(email_snippets)
+        span.set(transactions=len(parsed), leftovers=len(leftovers))
+    if parsed:
+        yield parsed
+    if not leftovers:
+        return
+
+    batches = batch_snippets(leftovers, batch_tokens)
+    if len(batches) == 1:
+        try:
+            transactions = _extract_batch(user_query, batches[0], use_cache)
+        except Exception:
+            if failed is None:
+                raise
+            failed.extend(batches[0])
+            return
+        yield transactions
+        return
+
+    with ThreadPoolExecutor(max_workers=max(1, min(concurrency, len(batches)))) as pool:
+        futures = {pool.submit(tracing.bind(_extract_batch), user_query, batch, use_cache): index
+                   for index, batch in enumerate(batches)}
+        for future in as_completed(futures):
+            try:
+                yield future.result()
+            except Exception as e:
+                # One failed batch should not lose the transactions of the others
+                print(f"Warning: Extraction failed for email batch {futures[future] + 1}/{len(batches)}: {e}")
+                if failed is not None:
+                    failed.extend(batches[futures[future]])
+
+def extract_transactions(user_query: str, email_snippets: list[str], use_cache: bool = True,
+                         batch_tokens: int = EXTRACTION_BATCH_TOKENS,
+                         concurrency: int = EXTRACTION_CONCURRENCY, failed: list = None) -> TransactionTable:
+    """
+    Extract the BSE trades, investments and spends in a list of email snippets.
+
+    Args:
+        user_query (str): The original natural language question from the user.
+        email_snippets (list[str]): A list of short text summaries (snippets) from emails.
+        use_cache (bool): Reuse a cached model response for an identical prompt.
+        batch_tokens (int): Estimated snippet tokens per model call.
+        concurrency (int): Maximum model calls in flight.
+        failed (list, optional): Receives the snippets whose extraction failed.
 
     Returns:
-        str: A structured summary of the financial data extracted by the Gemini model.
+        TransactionTable: De-duplicated transactions ready for aggregation.
     """
-    # Initialize the GenerativeModel with the desired model (gemini-1.5-flash is good for speed)
-    model = genai.GenerativeModel("gemini-1.5-flash")
+    transactions = []
+    for batch in stream_transactions(user_query, email_snippets, use_cache=use_cache,
+                                     batch_tokens=batch_tokens, concurrency=concurrency, failed=failed):
+        transactions.extend(batch)
+    return TransactionTable(transactions)
+
+def summarize_financial_data(user_query: str, email_snippets: list[str], use_cache: bool = True,
+                             batch_tokens: int = EXTRACTION_BATCH_TOKENS,
+                             concurrency: int = EXTRACTION_CONCURRENCY) -> str:
+    """
+    Analyzes a list of email snippets to extract and summarize financial
+    transactions (BSE trades, investments, and spends).
 
-    # Combine all email snippets into a single string for the prompt
-    combined_emails = "\n\n---EMAIL_SEPARATOR---\n\n".join(email_snippets)
+    Args:
+        user_query (str): The original natural language question from the user.
+        email_snippets (list[str]): A list of short text summaries (snippets) from emails.
+        use_cache (bool): Reuse a cached model response for an identical prompt.
+        batch_tokens (int): Estimated snippet tokens per model call.
+        concurrency (int): Maximum model calls in flight.
 
-    # Craft a detailed prompt for the Gemini model to ensure accurate extraction and formatting
-    prompt = f"""
-    You are a highly analytical financial assistant designed to process email snippets and extract specific financial details.
-    Your task is to identify and summarize all **BSE Trades**, **Investments**, and **Spends** from the provided email content.
-    For each identified item, clearly state the **date**, **type** (BSE Trade, Investment, or Spend), and the **amount**.
-    After listing all relevant items by category, provide a **total amount for 'Spends'**.
+    Returns:
+        str: A sectioned text summary with the total spends computed locally.
+    """
+    table = extract_transactions(user_query, email_snippets, use_cache=use_cache,
+                                 batch_tokens=batch_tokens, concurrency=concurrency)
+    return render_summary_text(table)
 
-    Pay close attention to dates to ensure all transactions within the specified period are included.
-    If an amount is in INR (Indian Rupees), specify it as '₹'.
+def stream_financial_data(user_query: str, email_snippets: list[str], use_cache: bool = True,
+                          batch_tokens: int = EXTRACTION_BATCH_TOKENS,
+                          concurrency: int = EXTRACTION_CONCURRENCY):
+    """
+    Streaming variant of ``summarize_financial_data``.
 
-    EMAIL SNIPPETS:
-    {combined_emails}
+    Built on ``stream_transactions``: locally parsed transactions are summarised
+    first and the summary is re-rendered as each model batch completes.
 
-    USER QUESTION:
-    {user_query}
+    Yields:
+        str: The summary of every transaction extracted so far; the last one
+        equals the ``summarize_financial_data`` result.
+    """
+    transactions = []
+    for batch in stream_transactions(user_query, email_snippets, use_cache=use_cache,
+                                     batch_tokens=batch_tokens, concurrency=concurrency):
+        transactions.extend(batch)
+        yield render_summary_text(TransactionTable(transactions))
+
+# Demo mailbox used when no Gmail account is configured
+SAMPLE_EMAIL_SNIPPETS = [
+    "Dear Customer, your equity trade for 15 shares of Reliance Industries Ltd. (BSE: 500325) valued at ₹37,500.00 was executed on 2025-05-12. Transaction ID: RIL12345.",
+    "Your mutual fund investment of ₹7,000.00 into Axis Bluechip Fund was successfully processed on May 05, 2025. Ref: MF7890.",
+    "A debit of ₹550.00 for your Swiggy order (ID: SWG9876) was made on 2025-05-03. Enjoy your meal!",
+    "Your monthly SIP of ₹10,000.00 for ICICI Prudential Long Term Equity Fund was debited on 2025-05-07. Thank you for your continued investment.",
+    "Online purchase from Flipkart: Order FPKL6789. Amount: ₹3,200.00. Date: May 18, 2025.",
+    "Your payment of ₹250.00 to Google Pay for a taxi ride was confirmed on 2025-05-22. Ref: TXI456.",
+    "BSE delivery trade confirmation: You bought 5 shares of Tata Motors Ltd. (BSE: 500570) for ₹3,000.00 on 2025-05-25. Order#: TTM001.",
+    "Electricity Bill Payment of ₹1,800.00 processed on May 28, 2025. Account: 123456789.",
+    "Invested ₹2,500.00 in a new bond fund via your brokerage account on May 30, 2025. Confirmation ID: BND876."
+]
+
+_gmail_sync = None
+
+def is_financial(message: dict) -> bool:
+    """Cheap relevance check applied to every synced message before it is indexed."""
+    return parse_amount(message.get("snippet", "")) is not None
+
+def parse_message(message: dict):
+    """Rule-parse a Gmail message for the mail index; returns a ``to_record`` dict or None."""
+    transaction = parse_snippet(message.get("snippet", ""))
+    return to_record(transaction) if transaction else None
+
+def indexed_transactions(index) -> list[Transaction]:
+    """Return the transactions ``parse_message`` stored in a mail index, oldest first."""
+    return [from_record(record) for record in index.records()]
+
+def get_gmail_sync():
+    """
+    Return the mailbox syncer for the configured Gmail account, or None.
 
-    Instructions for your output:
-    - Start with a clear heading for each category (BSE Trades, Investments, Spends).
-    - List each transaction with its date and amount in a clear format.
-    - Calculate and state the 'Total Spends' at the end.
-    - If a category has no items, state "No [Category] found."
-    - Be precise and only use information explicitly stated in the snippets.
-    - IMPORTANT: Format the output in a clean, readable structure with clear sections.
-    - Use consistent formatting with clear separation between categories.
-    - Make it easy to read with proper spacing and organization.
-    """
-
-    # Generate content using the Gemini model
-    response = model.generate_content(prompt)
-
-    # Clean up the response to remove blank lines and improve formatting
-    cleaned_response = response.text.strip()
-    
-    # Remove multiple consecutive blank lines and replace with single line breaks
-    cleaned_response = re.sub(r'\n\s*\n\s*\n+', '\n\n', cleaned_response)
-    
-    # Remove leading/trailing whitespace from each line
-    lines = [line.strip() for line in cleaned_response.split('\n')]
-    lines = [line for line in lines if line]  # Remove empty lines
-    
-    # Rejoin with proper spacing
-    cleaned_response = '\n'.join(lines)
-    
-    return cleaned_response
-
-def get_gmail_data():
-    sample_email_snippets = [
-        "Dear Customer, your equity trade for 15 shares of Reliance Industries Ltd. (BSE: 500325) valued at ₹37,500.00 was executed on 2025-05-12. Transaction ID: RIL12345.",
-        "Your mutual fund investment of ₹7,000.00 into Axis Bluechip Fund was successfully processed on May 05, 2025. Ref: MF7890.",
-        "A debit of ₹550.00 for your Swiggy order (ID: SWG9876) was made on 2025-05-03. Enjoy your meal!",
-        "Your monthly SIP of ₹10,000.00 for ICICI Prudential Long Term Equity Fund was debited on 2025-05-07. Thank you for your continued investment.",
-        "Online purchase from Flipkart: Order FPKL6789. Amount: ₹3,200.00. Date: May 18, 2025.",
-        "Your payment of ₹250.00 to Google Pay for a taxi ride was confirmed on 2025-05-22. Ref: TXI456.",
-        "BSE delivery trade confirmation: You bought 5 shares of Tata Motors Ltd. (BSE: 500570) for ₹3,000.00 on 2025-05-25. Order#: TTM001.",
-        "Electricity Bill Payment of ₹1,800.00 processed on May 28, 2025. Account: 123456789.",
-        "Invested ₹2,500.00 in a new bond fund via your brokerage account on May 30, 2025. Confirmation ID: BND876."
-    ]
-    return sample_email_snippets
+    Configured through ``GMAIL_ACCESS_TOKEN`` (an OAuth token with the
+    gmail.readonly scope) and optionally ``GMAIL_API_URL``.
+    """
+    global _gmail_sync
+    gmail = get_settings().provider("gmail")
+    if not gmail.api_key:
+        return None
+    if _gmail_sync is None:
+        transport = RestGmailTransport(gmail.api_key, base_url=gmail.base_url or GMAIL_API_URL)
+        _gmail_sync = GmailSync(transport, MailIndex(parse=parse_message), keep=is_financial)
+    return _gmail_sync
+
+def sync_mailbox() -> None:
+    """
+    Bring the local mail index up to date with Gmail, if an account is configured.
+
+    Only messages new since the last sync are downloaded. A failed sync is
+    reported and the index keeps its previous state.
+    """
+    gmail = get_gmail_sync()
+    if gmail is None:
+        return
+    with tracing.span("gmail.sync") as span:
+        try:
+            result = gmail.sync()
+            span.set(**result)
+            print(f"Gmail {result['mode']} sync: {result['added']} added, {result['removed']} removed.")
+        except (requests.RequestException, KeyError, ValueError) as e:
+            span.set(failed=repr(e))
+            print(f"Warning: Gmail sync failed, using the local mail index: {e}")
+
+def get_gmail_data(sync: bool = True) -> list[str]:
+    """
+    Return the financial email snippets to analyse.
+
+    With a Gmail account configured, the local mail index is brought up to
+    date (see ``sync_mailbox``) and its snippets are returned; if the sync
+    fails the last indexed snippets are used. Without an account the demo
+    snippets are returned.
+
+    Args:
+        sync (bool): Refresh the index from Gmail before reading it.
+
+    Returns:
+        list[str]: Email snippets, oldest first.
+    """
+    gmail = get_gmail_sync()
+    if gmail is None:
+        return list(SAMPLE_EMAIL_SNIPPETS)
+    if sync:
+        sync_mailbox()
+    return gmail.index.snippets()
 
 #---------------------------------------------------------------------------------------------------
 
@@ -140,9 +500,8 @@ def main():
     """
     print("🚀 Initializing financial data agent...\n")
 
-    # Load environment variables from .env file
-    load_dotenv()
-    api_key = os.getenv("GEMINI_API_KEY")
+    # GEMINI_API_KEY from the environment, .env or config/config.yaml
+    api_key = get_settings().provider("gemini").api_key
 
     # Check if the API key is loaded correctly
     if not api_key:
@@ -166,13 +525,12 @@ def main():
     gmail_search_query = build_gmail_search_query(user_question)
     print(f"Simulated Gmail Query: '{gmail_search_query}'\n")
 
-    # Step 2: Simulate fetching email snippets from Gmail
-    # In a live system, you would use the Google Gmail API to fetch emails
-    # matching the 'gmail_search_query'. For this example, we use predefined snippets
-    # that are typical of financial communications.
-    print("📧 Simulating retrieval of email snippets from Gmail...")
+    # Step 2: Fetch email snippets from Gmail
+    # With GMAIL_ACCESS_TOKEN set, the local mail index is synced incrementally;
+    # otherwise predefined snippets typical of financial communications are used.
+    print("📧 Retrieving email snippets from Gmail...")
     sample_email_snippets = get_gmail_data()
-    print(f"Retrieved {len(sample_email_snippets)} sample email snippets.\n")
+    print(f"Retrieved {len(sample_email_snippets)} email snippets.\n")
 
     # Step 3: Use Gemini to summarize the financial data from the snippets
     print("✨ Analyzing and summarizing financial data using Gemini...\n")
@@ -0,0 +1,383 @@
+"""
+Vectorised technical indicators over whole price histories.
+
+Every function works along the last axis, so the same call handles one
+ticker (shape ``(T,)``) or a ticker x time matrix (shape ``(N, T)``).
+Outputs have the input's shape, with ``nan`` during each indicator's warm-up.
+
+``IndicatorEngine`` keeps the running state of the recursive indicators
+(EMAs, Wilder averages, cumulative sums), so when bars are appended or the
+last bar is revised only the bars from the first changed one are
+recomputed. ``ticker_indicators`` wraps it in a per-ticker cache for
+yfinance-style history frames.
+"""
+import math
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+DEFAULT_PARAMS = {
+    "rsi": 14,
+    "macd": (12, 26, 9),
+    "bollinger": (20, 2.0),
+    "atr": 14,
+    "beta": 60,
+}
+
+# Columns returned to callers; the engine also keeps internal running state
+INDICATOR_COLUMNS = ("rsi", "macd", "macd_signal", "macd_hist", "bb_mid", "bb_upper", "bb_lower", "bb_pctb",
+                     "atr", "vwap", "beta")
+
+# Benchmark index used for rolling beta
+BENCHMARKS = {
+    "india": "^NSEI",
+    "us": "^GSPC",
+}
+INDICATOR_CACHE_SIZE = 256
+
+
+def benchmark_for(ticker):
+    """Return the benchmark index symbol for a ticker: NIFTY 50 for NSE/BSE listings, S&P 500 otherwise."""
+    return BENCHMARKS["india"] if ticker.upper().endswith((".NS", ".BO")) else BENCHMARKS["us"]
+
+
+def _ewm(x, alpha, prev=None):
+    """
+    Exponentially weighted mean along the last axis (pandas ``adjust=False``).
+
+    The recursion is seeded with the first non-NaN value, or continues from
+    ``prev`` (the value just before ``x[..., 0]``). The loop runs over time
+    only; all tickers advance together.
+    """
+    if x.ndim == 1:
+        # Plain floats are several times faster than 0-d arrays for a single series
+        out = []
+        acc = math.nan if prev is None else float(prev)
+        for value in x.tolist():
+            if math.isnan(acc):
+                acc = value
+            elif not math.isnan(value):
+                acc += alpha * (value - acc)
+            out.append(acc)
+        return np.array(out, dtype=float)
+    out = np.empty(x.shape, dtype=float)
+    acc = np.full(x.shape[:-1], np.nan) if prev is None else np.array(prev, dtype=float)
+    for t in range(x.shape[-1]):
+        value = x[..., t]
+        acc = np.where(np.isnan(acc), value, np.where(np.isnan(value), acc, acc + alpha * (value - acc)))
+        out[..., t] = acc
+    return out
+
+
+def _windowed(x, window, start, func):
+    """Apply ``func`` to trailing windows of ``x`` for the bars from ``start`` onwards."""
+    out = np.full(x.shape[:-1] + (x.shape[-1] - start,), np.nan)
+    lo = max(0, start - window + 1)
+    if x.shape[-1] - lo >= window:
+        views = sliding_window_view(x[..., lo:], window, axis=-1)
+        out[..., lo + window - 1 - start:] = func(views)
+    return out
+
+
+def _lagged(x, start):
+    """``x`` shifted one bar later, for the bars from ``start`` onwards (nan before the first bar)."""
+    if start > 0:
+        return x[..., start - 1:-1]
+    lead = np.full(x.shape[:-1] + (1,), np.nan)
+    return np.concatenate([lead, x[..., :-1]], axis=-1)
+
+
+def _returns(close):
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return close / _lagged(close, 0) - 1
+
+
+def _run(inputs, params, start=0, prev=None):
+    """
+    Compute every indicator for bars ``start..T-1``.
+
+    Args:
+        inputs (dict): "close" and optional "high", "low", "volume", "benchmark" arrays.
+        params (dict): Indicator parameters (see ``DEFAULT_PARAMS``).
+        start (int): First bar to compute.
+        prev (dict, optional): Previously computed columns covering at least
+            bars ``0..start-1``; required when ``start > 0``.
+
+    Returns:
+        dict: Column name -> array of the bars from ``start``.
+    """
+    close = inputs["close"]
+    high = inputs.get("high", close)
+    low = inputs.get("low", close)
+    bars = np.arange(start, close.shape[-1])
+
+    def state(name, default=None):
+        return default if start == 0 else prev[name][..., start - 1]
+
+    columns = {}
+    segment = close[..., start:]
+
+    # MACD
+    fast, slow, signal = params["macd"]
+    columns["ema_fast"] = _ewm(segment, 2 / (fast + 1), state("ema_fast"))
+    columns["ema_slow"] = _ewm(segment, 2 / (slow + 1), state("ema_slow"))
+    line = columns["ema_fast"] - columns["ema_slow"]
+    columns["macd_signal_raw"] = _ewm(line, 2 / (signal + 1), state("macd_signal_raw"))
+    columns["macd"] = np.where(bars >= slow - 1, line, np.nan)
+    columns["macd_signal"] = np.where(bars >= slow + signal - 2, columns["macd_signal_raw"], np.nan)
+    columns["macd_hist"] = columns["macd"] - columns["macd_signal"]
+
+    # RSI with Wilder smoothing
+    period = params["rsi"]
+    delta = segment - _lagged(close, start)
+    columns["avg_gain"] = _ewm(np.where(delta > 0, delta, np.where(np.isnan(delta), np.nan, 0.0)),
+                               1 / period, state("avg_gain"))
+    columns["avg_loss"] = _ewm(np.where(delta < 0, -delta, np.where(np.isnan(delta), np.nan, 0.0)),
+                               1 / period, state("avg_loss"))
+    gain, loss = columns["avg_gain"], columns["avg_loss"]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rsi = np.where(loss > 0, 100 - 100 / (1 + gain / loss), np.where(gain > 0, 100.0, 50.0))
+    columns["rsi"] = np.where((bars >= period) & ~np.isnan(gain), rsi, np.nan)
+
+    # Bollinger bands (population standard deviation)
+    window, width = params["bollinger"]
+    columns["bb_mid"] = _windowed(close, window, start, lambda v: v.mean(axis=-1))
+    deviation = _windowed(close, window, start, lambda v: v.std(axis=-1))
+    columns["bb_upper"] = columns["bb_mid"] + width * deviation
+    columns["bb_lower"] = columns["bb_mid"] - width * deviation
+    with np.errstate(divide="ignore", invalid="ignore"):
+        columns["bb_pctb"] = (segment - columns["bb_lower"]) / (columns["bb_upper"] - columns["bb_lower"])
+
+    # ATR with Wilder smoothing; the first bar's true range is its high-low span
+    period = params["atr"]
+    previous_close = _lagged(close, start)
+    high_segment, low_segment = high[..., start:], low[..., start:]
+    true_range = np.fmax(high_segment - low_segment,
+                         np.fmax(np.abs(high_segment - previous_close), np.abs(low_segment - previous_close)))
+    columns["atr_raw"] = _ewm(true_range, 1 / period, state("atr_raw"))
+    columns["atr"] = np.where(bars >= period - 1, columns["atr_raw"], np.nan)
+
+    # VWAP anchored at the first bar
+    if "volume" in inputs:
+        volume = np.nan_to_num(inputs["volume"][..., start:])
+        typical = np.nan_to_num((high_segment + low_segment + segment) / 3)
+        columns["cum_pv"] = state("cum_pv", 0.0) + np.cumsum(typical * volume, axis=-1)
+        columns["cum_v"] = state("cum_v", 0.0) + np.cumsum(volume, axis=-1)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            columns["vwap"] = np.where(columns["cum_v"] > 0, columns["cum_pv"] / columns["cum_v"], np.nan)
+
+    # Rolling beta of daily returns against the benchmark
+    if "benchmark" in inputs:
+        asset, market = _returns(close), _returns(inputs["benchmark"])
+        asset, market = np.broadcast_arrays(asset, market)
+        window = params["beta"]
+        covariance = _windowed(asset * market, window, start, lambda v: v.mean(axis=-1)) - (
+            _windowed(asset, window, start, lambda v: v.mean(axis=-1))
+            * _windowed(market, window, start, lambda v: v.mean(axis=-1))
+        )
+        variance = _windowed(market, window, start, lambda v: v.var(axis=-1))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            columns["beta"] = np.where(variance > 0, covariance / variance, np.nan)
+    return columns
+
+
+def _inputs(close, high=None, low=None, volume=None, benchmark=None):
+    inputs = {"close": np.asarray(close, dtype=float)}
+    for name, values in (("high", high), ("low", low), ("volume", volume), ("benchmark", benchmark)):
+        if values is not None:
+            inputs[name] = np.asarray(values, dtype=float)
+    return inputs
+
+
+def compute_indicators(close, high=None, low=None, volume=None, benchmark=None, params=None):
+    """
+    Compute RSI, MACD, Bollinger bands, ATR, VWAP and rolling beta in one pass.
+
+    Args:
+        close (array-like): Closes, shape ``(T,)`` or ``(N, T)``.
+        high, low (array-like, optional): Same shape as ``close``; ATR and VWAP
+            fall back to the closes without them.
+        volume (array-like, optional): Enables VWAP.
+        benchmark (array-like, optional): Benchmark closes of shape ``(T,)``
+            (or matching ``close``); enables rolling beta.
+        params (dict, optional): Overrides of ``DEFAULT_PARAMS``.
+
+    Returns:
+        dict: Indicator name (see ``INDICATOR_COLUMNS``) -> array shaped like ``close``.
+    """
+    columns = _run(_inputs(close, high, low, volume, benchmark), {**DEFAULT_PARAMS, **(params or {})})
+    return {name: columns[name] for name in INDICATOR_COLUMNS if name in columns}
+
+
+def _changed_from(old, new):
+    """First bar where ``new`` differs from ``old`` (both dicts of arrays), or None if incompatible."""
+    if old.keys() != new.keys():
+        return None
+    old_bars = old["close"].shape[-1]
+    if new["close"].shape[-1] < old_bars or new["close"].shape[:-1] != old["close"].shape[:-1]:
+        return None
+    changed = np.zeros(old_bars, dtype=bool)
+    for name, values in old.items():
+        head = new[name][..., :old_bars]
+        differs = ~((head == values) | (np.isnan(head) & np.isnan(values)))
+        changed |= differs.reshape(-1, old_bars).any(axis=0) if differs.ndim > 1 else differs
+    positions = np.flatnonzero(changed)
+    return int(positions[0]) if positions.size else old_bars
+
+
+class IndicatorEngine:
+    """
+    Indicators for one series (or ticker x time matrix) that are extended incrementally.
+
+    ``update`` compares the new inputs with the ones last seen and recomputes
+    only from the first bar that differs, continuing the recursive indicators
+    from their stored state; window-based ones only look back one window.
+
+    Args:
+        params (dict, optional): Overrides of ``DEFAULT_PARAMS``.
+    """
+
+    def __init__(self, params=None):
+        self.params = {**DEFAULT_PARAMS, **(params or {})}
+        self._inputs = None
+        self._columns = None
+        self.last_recomputed = 0
+
+    @property
+    def bars(self):
+        return 0 if self._inputs is None else self._inputs["close"].shape[-1]
+
+    def update(self, close, high=None, low=None, volume=None, benchmark=None):
+        """
+        Bring the indicators up to date with the given inputs (same arguments
+        as ``compute_indicators``) and return them.
+
+        Appending bars or revising the last few costs work proportional to the
+        changed bars; a shorter or reshaped input is recomputed from scratch.
+        """
+        inputs = _inputs(close, high, low, volume, benchmark)
+        start = 0 if self._inputs is None else _changed_from(self._inputs, inputs)
+        if start is None:
+            start = 0
+        bars = inputs["close"].shape[-1]
+        if start < bars:
+            fresh = _run(inputs, self.params, start, self._columns)
+            if start == 0:
+                self._columns = fresh
+            else:
+                self._columns = {name: np.concatenate([self._columns[name][..., :start], values], axis=-1)
+                                 for name, values in fresh.items()}
+        self._inputs = inputs
+        self.last_recomputed = bars - start
+        return self.results()
+
+    def results(self):
+        if self._columns is None:
+            return {}
+        return {name: self._columns[name] for name in INDICATOR_COLUMNS if name in self._columns}
+
+
+_engines = OrderedDict()
+_engines_lock = threading.Lock()
+
+
+def _column(history, name):
+    return history[name].to_numpy(dtype=float) if name in history else None
+
+
+def ticker_indicators(ticker, history, benchmark_history=None, params=None, since=None):
+    """
+    Return the indicators of a yfinance-style history frame, reusing earlier work for the ticker.
+
+    The result equals ``compute_indicators`` over exactly the given bars. The
+    ticker's engine remembers them, so a later call with the same first bar
+    plus new bars (or a revised last bar) only computes the changed bars; a
+    history that starts elsewhere is computed from scratch. Callers wanting a
+    sliding window (e.g. "6mo") should pass the full stored history, whose
+    start stays put, and select the window with ``since``.
+
+    Args:
+        ticker (str): Cache key, normally the ticker symbol.
+        history (pd.DataFrame): Daily bars with 'Close' and optionally 'High', 'Low', 'Volume'.
+        benchmark_history (pd.DataFrame, optional): Benchmark bars; enables rolling beta.
+        params (dict, optional): Overrides of ``DEFAULT_PARAMS``.
+        since (pd.Timestamp, optional): Only return bars from this one on; earlier
+            bars still feed the indicators.
+
+    Returns:
+        pd.DataFrame: ``INDICATOR_COLUMNS`` (those computable) on the history's index.
+    """
+    if history is None or "Close" not in history or history.empty:
+        return pd.DataFrame()
+    benchmark = None
+    if benchmark_history is not None and "Close" in benchmark_history and not benchmark_history.empty:
+        benchmark = benchmark_history["Close"].reindex(history.index, method="ffill").to_numpy(dtype=float)
+    key = (ticker.strip().upper(), tuple(sorted((params or {}).items())))
+    arrays = {"close": _column(history, "Close"), "high": _column(history, "High"),
+              "low": _column(history, "Low"), "volume": _column(history, "Volume"), "benchmark": benchmark}
+    arrays = {name: values for name, values in arrays.items() if values is not None}
+
+    with _engines_lock:
+        engine, seen_start = _engines.pop(key, None) or (IndicatorEngine(params), None)
+        # VWAP and the EMA/Wilder seeds are anchored at the first bar, so state
+        # carries over only while the history starts where it did
+        if seen_start is not None and history.index[0] != seen_start:
+            engine = IndicatorEngine(params)
+        results = engine.update(**arrays)
+        _engines[key] = (engine, history.index[0])
+        while len(_engines) > INDICATOR_CACHE_SIZE:
+            _engines.popitem(last=False)
+    frame = pd.DataFrame(results, index=history.index)
+    return frame if since is None else frame[frame.index >= since]
+
+
+def clear_cache():
+    with _engines_lock:
+        _engines.clear()
+
+
+def _fmt(value, pattern="{:.2f}"):
+    return "n/a" if value is None or not np.isfinite(value) else pattern.format(value)
+
+
+def describe_latest(indicators, last_close=None):
+    """
+    Summarise the latest indicator values as compact prompt lines with their usual readings.
+
+    Args:
+        indicators (pd.DataFrame): Output of ``ticker_indicators``.
+        last_close (float, optional): Latest price, for ATR/VWAP relative to price.
+
+    Returns:
+        str: One line per indicator family, or a note that none are available.
+    """
+    if indicators is None or indicators.empty:
+        return "No technical indicators available."
+    latest = indicators.iloc[-1]
+    lines = []
+    rsi = latest.get("rsi", np.nan)
+    if np.isfinite(rsi):
+        reading = "overbought" if rsi >= 70 else "oversold" if rsi <= 30 else "neutral"
+        lines.append(f"RSI{DEFAULT_PARAMS['rsi']} {rsi:.1f} ({reading})")
+    macd, signal = latest.get("macd", np.nan), latest.get("macd_signal", np.nan)
+    if np.isfinite(macd) and np.isfinite(signal):
+        lines.append(f"MACD {macd:.2f} vs signal {signal:.2f} "
+                     f"({'bullish' if macd > signal else 'bearish'}, hist {macd - signal:+.2f})")
+    pctb = latest.get("bb_pctb", np.nan)
+    if np.isfinite(pctb):
+        lines.append(f"Bollinger {_fmt(latest['bb_lower'])}-{_fmt(latest['bb_upper'])}, %B {pctb:.2f}")
+    atr = latest.get("atr", np.nan)
+    if np.isfinite(atr):
+        relative = f" ({atr / last_close * 100:.1f}% of price)" if last_close else ""
+        lines.append(f"ATR{DEFAULT_PARAMS['atr']} {atr:.2f}{relative}")
+    vwap = latest.get("vwap", np.nan)
+    if np.isfinite(vwap):
+        relative = f", price {(last_close / vwap - 1) * 100:+.1f}% vs VWAP" if last_close else ""
+        lines.append(f"VWAP {vwap:.2f}{relative}")
+    beta = latest.get("beta", np.nan)
+    if np.isfinite(beta):
+        lines.append(f"Beta{DEFAULT_PARAMS['beta']} {beta:.2f}")
+    return "; ".join(lines) if lines else "No technical indicators available."
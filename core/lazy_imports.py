@@ -0,0 +1,83 @@
+"""
+Deferred imports for heavy optional dependencies.
+
+transformers, google.generativeai, yfinance and alpha_vantage each take from
+a few hundred milliseconds to seconds to import, and most entry points (the
+landing page, the screener, the API's health checks) never touch them. The
+helpers here bind a module-level name at import time but only import the
+real package on first attribute access or call.
+
+Attribute writes go through to the real module, so tests can keep patching
+``module.yf.Ticker`` and the patch is seen by every importer.
+"""
+import importlib
+import threading
+
+_lock = threading.Lock()
+
+
+class LazyModule:
+    """
+    Stand-in for a module that is imported on first attribute access.
+
+    A missing package raises ``ModuleNotFoundError`` at that first access
+    rather than when the importing module loads.
+    """
+
+    __slots__ = ("_name", "_module")
+
+    def __init__(self, name):
+        object.__setattr__(self, "_name", name)
+        object.__setattr__(self, "_module", None)
+
+    def _load(self):
+        module = self._module
+        if module is None:
+            with _lock:
+                module = self._module
+                if module is None:
+                    module = importlib.import_module(self._name)
+                    object.__setattr__(self, "_module", module)
+        return module
+
+    @property
+    def is_loaded(self):
+        return self._module is not None
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+    def __setattr__(self, attr, value):
+        setattr(self._load(), attr, value)
+
+    def __delattr__(self, attr):
+        delattr(self._load(), attr)
+
+    def __dir__(self):
+        return dir(self._load())
+
+    def __repr__(self):
+        state = "loaded" if self.is_loaded else "not loaded"
+        return f"<lazy module {self._name!r} ({state})>"
+
+
+def lazy_import(name):
+    """Return a ``LazyModule`` for ``name``, e.g. ``yf = lazy_import("yfinance")``."""
+    return LazyModule(name)
+
+
+def lazy_callable(module_name, attr):
+    """
+    Return a function that imports ``module_name`` on first call and forwards to ``attr``.
+
+    Stands in for ``from module_name import attr`` where ``attr`` is a class or
+    function that is only ever called.
+    """
+    module = LazyModule(module_name)
+
+    def call(*args, **kwargs):
+        return getattr(module, attr)(*args, **kwargs)
+
+    call.__name__ = call.__qualname__ = attr
+    call.__doc__ = f"Lazily imported ``{module_name}.{attr}``."
+    return call
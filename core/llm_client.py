@@ -0,0 +1,148 @@
+"""Gemini access shared by the agents, with an on-disk response cache."""
+import hashlib
+import os
+import threading
+import time
+from config.settings import get_settings
+from core import tracing
+from core.lazy_imports import lazy_import
+from core.prompt_builder import estimate_tokens
+from services.cache import DiskCache, cache_dir
+
+# Responses are reused for identical prompts within this many seconds
+LLM_CACHE_TTL = get_settings().llm.cache_ttl
+LLM_CACHE_MAX_ENTRIES = get_settings().llm.cache_max_entries
+
+genai = lazy_import("google.generativeai")
+
+_response_cache = None
+_cache_lock = threading.Lock()
+_configured = False
+
+
+def _model(model_name):
+    """Return a Gemini model, configuring the API key (``GEMINI_API_KEY``) on first use."""
+    global _configured
+    if not _configured:
+        with _cache_lock:
+            if not _configured:
+                api_key = get_settings().provider("gemini").api_key
+                if api_key:
+                    genai.configure(api_key=api_key)
+                _configured = True
+    return genai.GenerativeModel(model_name)
+
+
+def cache_enabled():
+    """The cache can be switched off globally with ``FINANCEGPT_LLM_CACHE=0``."""
+    return get_settings().llm.cache_enabled
+
+
+def get_response_cache():
+    """Return the shared on-disk cache of model responses."""
+    global _response_cache
+    if _response_cache is None:
+        with _cache_lock:
+            if _response_cache is None:
+                _response_cache = DiskCache(
+                    os.path.join(cache_dir(), "llm_responses.sqlite"),
+                    max_age=LLM_CACHE_TTL,
+                    max_entries=LLM_CACHE_MAX_ENTRIES,
+                )
+    return _response_cache
+
+
+def llm_cache_stats():
+    """Return hit/miss counters and the hit rate of the response cache."""
+    return get_response_cache().stats()
+
+
+def clear_cache():
+    get_response_cache().clear()
+
+
+def normalize_prompt(prompt):
+    """Collapse indentation and runs of whitespace so cosmetic prompt changes share a cache entry."""
+    lines = (" ".join(line.split()) for line in prompt.strip().splitlines())
+    return "\n".join(line for line in lines if line)
+
+
+def cache_key(model_name, prompt):
+    material = f"{model_name}\0{normalize_prompt(prompt)}"
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+def generate_text(model_name, prompt, use_cache=True):
+    """
+    Run a prompt through a Gemini model, reusing a cached response when possible.
+
+    Args:
+        model_name (str): Gemini model name, e.g. "gemini-2.0-flash".
+        prompt (str): The prompt text.
+        use_cache (bool): Set to False to bypass the cache and always call the model.
+
+    Returns:
+        str: The response text.
+    """
+    use_cache = use_cache and cache_enabled()
+    key = cache_key(model_name, prompt) if use_cache else None
+    with tracing.span("llm.generate", model=model_name) as span:
+        if span:
+            span.set(prompt_tokens=estimate_tokens(prompt))
+        if use_cache:
+            cached = get_response_cache().get(key)
+            if cached is not None:
+                span.set(cache="hit", response_chars=len(cached))
+                return cached
+
+        model = _model(model_name)
+        text = model.generate_content(prompt).text
+        span.set(cache="miss" if use_cache else "off", response_chars=len(text or ""))
+    if use_cache and text:
+        get_response_cache().set(key, text)
+    return text
+
+
+def stream_text(model_name, prompt, use_cache=True):
+    """
+    Stream a Gemini response chunk by chunk.
+
+    A cached response is yielded as a single chunk. A freshly generated one is
+    cached once the stream has been consumed to the end; abandoned streams are
+    not cached.
+
+    Yields:
+        str: Response text chunks in order.
+    """
+    use_cache = use_cache and cache_enabled()
+    key = cache_key(model_name, prompt) if use_cache else None
+    # Ended explicitly: the consumer resumes this generator between chunks
+    span = tracing.start_span("llm.stream", model=model_name)
+    if span:
+        span.set(prompt_tokens=estimate_tokens(prompt))
+    try:
+        if use_cache:
+            cached = get_response_cache().get(key)
+            if cached is not None:
+                span.set(cache="hit", chunks=1, response_chars=len(cached))
+                yield cached
+                return
+
+        model = _model(model_name)
+        parts = []
+        for chunk in model.generate_content(prompt, stream=True):
+            try:
+                text = chunk.text
+            except ValueError:
+                # Chunks without text parts (e.g. safety metadata) raise on .text
+                continue
+            if text:
+                if span and not parts:
+                    span.set(first_chunk_seconds=time.perf_counter() - span.start)
+                parts.append(text)
+                yield text
+        span.set(cache="miss" if use_cache else "off", chunks=len(parts), response_chars=sum(map(len, parts)))
+        if use_cache and parts:
+            get_response_cache().set(key, "".join(parts))
+    finally:
+        span.end()
@@ -0,0 +1,416 @@
+"""
+Portfolio analytics over the BSE trades extracted from email.
+
+``Portfolio`` replays the trades into FIFO lots once, recording per trade the
+change in position, cost basis, realised P&L and cash. yfinance closes are
+split-, bonus- and dividend-adjusted. The dividend adjustment is undone (using
+the history's "Dividends") so holdings are valued at the price actually
+quoted, and trade quantities and prices are restated on the split basis
+(using the history's "Stock Splits") before anything is valued. Valuation then only
+scatters those events onto a dates x securities grid and takes cumulative
+sums, so a few hundred lots over years of daily prices revalue with a handful
+of array operations.
+"""
+from collections import deque
+from dataclasses import dataclass
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+from core.transactions import BSE_TRADE
+from services.data_fetcher import fetch_bulk_history
+
+# yfinance history periods and the days each one covers
+HISTORY_PERIODS = (("1mo", 31), ("3mo", 92), ("6mo", 183), ("1y", 366), ("2y", 731), ("5y", 1827),
+                   ("10y", 3653), ("max", None))
+DAYS_PER_YEAR = 365.0
+
+
+def symbol_for(transaction):
+    """Yahoo symbol of a trade: numeric BSE scrip codes get ".BO", NSE symbols ".NS"; None without a code."""
+    code = transaction.security_code
+    if not code:
+        return None
+    return f"{code}.BO" if code.isdigit() else f"{code.upper()}.NS"
+
+
+@dataclass(slots=True)
+class Lot:
+    """Shares still held from one buy."""
+
+    symbol: str
+    name: str
+    opened: date
+    quantity: float
+    price: float
+
+
+@dataclass(slots=True)
+class Realisation:
+    """Shares of one lot closed by a sell."""
+
+    symbol: str
+    opened: date
+    closed: date
+    quantity: float
+    cost: float
+    proceeds: float
+
+    @property
+    def pnl(self):
+        return self.proceeds - self.cost
+
+
+def history_period(start, today=None):
+    """Return the shortest yfinance period covering ``start``..``today``, with a week of margin."""
+    days = ((today or date.today()) - start).days + 7
+    for period, covered in HISTORY_PERIODS:
+        if covered is None or days <= covered:
+            return period
+    return "max"
+
+
+def unadjusted_closes(history):
+    """
+    Undo Yahoo's dividend adjustment of a history's closes.
+
+    Yahoo scales every close before an ex-date by ``1 - D / C``, where ``C`` is
+    the close the day before. Walking back from the latest ex-date, the factor
+    of each dividend follows from the adjusted close the day before it and the
+    factors of the later ones. Split adjustments are kept.
+
+    Args:
+        history (pd.DataFrame): History with a 'Close' and optionally a 'Dividends' column.
+
+    Returns:
+        pd.Series: Split-adjusted closes.
+    """
+    closes = history["Close"].astype(float)
+    if "Dividends" not in history:
+        return closes
+    dividends = history["Dividends"].astype(float).fillna(0.0).to_numpy()
+    adjusted = closes.to_numpy()
+    factors = np.ones(len(adjusted))
+    later = 1.0
+    for row in range(len(adjusted) - 1, 0, -1):
+        factors[row] = later
+        previous = adjusted[row - 1]
+        if dividends[row] > 0 and previous > 0:
+            later *= previous / (previous + dividends[row] * later)
+    factors[0] = later
+    return pd.Series(adjusted / factors, index=closes.index)
+
+
+def price_matrix(histories, symbols):
+    """
+    Align daily closes of several securities on one date index.
+
+    Closes are taken before dividend adjustment (see ``unadjusted_closes``).
+
+    Args:
+        histories (dict): Symbol -> history frame with a 'Close' column.
+        symbols (list[str]): Column order of the result.
+
+    Returns:
+        pd.DataFrame: Dates (tz-naive, midnight) x symbols, forward-filled.
+    """
+    closes = {}
+    for symbol in symbols:
+        history = histories.get(symbol)
+        if history is None or history.empty or "Close" not in history:
+            continue
+        series = unadjusted_closes(history)
+        index = pd.DatetimeIndex(series.index)
+        if index.tz is not None:
+            index = index.tz_localize(None)
+        series.index = index.normalize()
+        closes[symbol] = series[~series.index.duplicated(keep="last")]
+    frame = pd.DataFrame(closes).sort_index().ffill()
+    return frame.reindex(columns=list(symbols))
+
+
+def split_events(histories, symbols):
+    """
+    Collect the stock splits and bonus issues in price histories.
+
+    Args:
+        histories (dict): Symbol -> history frame, optionally with a 'Stock Splits' column.
+        symbols (list[str]): Symbols to collect.
+
+    Returns:
+        dict: Symbol -> pd.Series of split ratios (new shares per old share, e.g.
+        2.0 for a 1:1 bonus) indexed by tz-naive ex-date; symbols without splits are left out.
+    """
+    splits = {}
+    for symbol in symbols:
+        history = histories.get(symbol)
+        if history is None or history.empty or "Stock Splits" not in history:
+            continue
+        ratios = history["Stock Splits"].astype(float)
+        ratios = ratios[ratios.fillna(0) > 0]
+        if ratios.empty:
+            continue
+        index = pd.DatetimeIndex(ratios.index)
+        if index.tz is not None:
+            index = index.tz_localize(None)
+        splits[symbol] = pd.Series(ratios.to_numpy(), index=index.normalize())
+    return splits
+
+
+def load_prices(symbols, start, today=None):
+    """
+    Fetch the daily closes of ``symbols`` since ``start`` in one bulk call.
+
+    Returns:
+        tuple[pd.DataFrame, dict]: The ``price_matrix`` and the ``split_events`` of the histories.
+    """
+    histories = fetch_bulk_history(list(symbols), period=history_period(start, today))
+    return price_matrix(histories, symbols), split_events(histories, symbols)
+
+
+def xirr(dates, amounts, guess=0.1):
+    """
+    Annualised internal rate of return of dated cash flows.
+
+    Args:
+        dates (list[date]): Flow dates.
+        amounts (list[float]): Flows; money paid in is negative, money received positive.
+
+    Returns:
+        float or None: The rate, or None when the flows do not change sign or no root is found.
+    """
+    amounts = np.asarray(amounts, dtype=float)
+    if not (amounts < 0).any() or not (amounts > 0).any():
+        return None
+    days = np.array([(d - min(dates)).days for d in dates], dtype=float)
+    years = days / DAYS_PER_YEAR
+
+    def npv(rate):
+        return float(np.sum(amounts / (1 + rate) ** years))
+
+    rate = guess
+    for _ in range(50):
+        growth = (1 + rate) ** years
+        value = np.sum(amounts / growth)
+        slope = np.sum(-years * amounts / (growth * (1 + rate)))
+        if slope == 0 or not np.isfinite(value):
+            break
+        step = value / slope
+        rate -= step
+        if rate <= -1:
+            break
+        if abs(step) < 1e-10:
+            return float(rate)
+
+    # Newton did not converge: bisect between a near-total loss and a 100x gain
+    low, high = -0.9999, 100.0
+    if npv(low) * npv(high) > 0:
+        return None
+    for _ in range(200):
+        middle = (low + high) / 2
+        if npv(low) * npv(middle) <= 0:
+            high = middle
+        else:
+            low = middle
+    return float((low + high) / 2)
+
+
+def split_factor(ratios, when):
+    """Return the shares one share traded on ``when`` became through the splits after that day."""
+    if ratios is None or ratios.empty:
+        return 1.0
+    return float(ratios[ratios.index > pd.Timestamp(when)].prod())
+
+
+class Portfolio:
+    """
+    Holdings built from BSE trade transactions with FIFO cost basis.
+
+    Trades are replayed in date order; a sell (``side == "sell"``) closes the
+    oldest open lots first. Any other side, including None, is a buy. Sells
+    beyond the shares held are capped with a warning. A trade before a split
+    counts as the post-split number of shares at the post-split price, the
+    basis of the adjusted closes it is valued at.
+
+    Args:
+        transactions (iterable[Transaction]): Any transactions; only BSE
+            trades with a quantity and security code are used.
+        splits (dict, optional): Symbol -> split ratios by ex-date (see ``split_events``).
+    """
+
+    def __init__(self, transactions, splits=None):
+        trades = [t for t in transactions
+                  if t.category == BSE_TRADE and t.quantity and symbol_for(t) and t.amount]
+        trades.sort(key=lambda t: t.date)
+        self.symbols = list(dict.fromkeys(symbol_for(t) for t in trades))
+        self.names = {}
+        self.lots = {symbol: deque() for symbol in self.symbols}
+        self.realisations = []
+        events = []
+        splits = splits or {}
+        for t in trades:
+            symbol = symbol_for(t)
+            self.names.setdefault(symbol, t.merchant)
+            quantity = t.quantity * split_factor(splits.get(symbol), t.date)
+            price = t.amount / quantity
+            if t.side == "sell":
+                held, cost, realised = self._close(symbol, t.date, quantity, price)
+                if held:
+                    events.append((t.date, symbol, -held, -cost, realised, held * price))
+            else:
+                self.lots[symbol].append(Lot(symbol, t.merchant, t.date, quantity, price))
+                events.append((t.date, symbol, quantity, t.amount, 0.0, -t.amount))
+        self.events = pd.DataFrame(events, columns=["date", "symbol", "quantity", "cost", "realised", "cash"])
+
+    def _close(self, symbol, when, quantity, price):
+        lots = self.lots[symbol]
+        remaining, cost, realised = float(quantity), 0.0, 0.0
+        while remaining > 0 and lots:
+            lot = lots[0]
+            take = min(lot.quantity, remaining)
+            self.realisations.append(Realisation(symbol, lot.opened, when, take, take * lot.price, take * price))
+            cost += take * lot.price
+            realised += take * (price - lot.price)
+            lot.quantity -= take
+            remaining -= take
+            if lot.quantity <= 0:
+                lots.popleft()
+        if remaining > 0:
+            print(f"Warning: Sell of {quantity} {symbol} on {when} exceeds the {quantity - remaining:g} shares held.")
+        return quantity - remaining, cost, realised
+
+    def __len__(self):
+        return len(self.events)
+
+    @property
+    def first_trade(self):
+        return self.events["date"].min() if len(self.events) else None
+
+    def open_lots(self):
+        """Return the open lots as a frame: symbol, name, opened, quantity, price, cost."""
+        rows = [(lot.symbol, lot.name, lot.opened, lot.quantity, lot.price, lot.quantity * lot.price)
+                for lots in self.lots.values() for lot in lots]
+        return pd.DataFrame(rows, columns=["symbol", "name", "opened", "quantity", "price", "cost"])
+
+    def realised_pnl(self):
+        """Return the realised P&L per symbol."""
+        return self.events.groupby("symbol")["realised"].sum().reindex(self.symbols, fill_value=0.0)
+
+    def holdings(self, last_prices):
+        """
+        Per-symbol position, FIFO cost and valuation at the given prices.
+
+        Args:
+            last_prices (pd.Series or dict): Symbol -> latest price (missing prices value at cost).
+
+        Returns:
+            pd.DataFrame: Indexed by symbol with name, quantity, avg_cost, cost_basis,
+            last_price, market_value, unrealised, unrealised_pct and realised.
+        """
+        lots = self.open_lots()
+        grouped = lots.groupby("symbol")[["quantity", "cost"]].sum().reindex(self.symbols, fill_value=0.0)
+        frame = pd.DataFrame({"name": pd.Series(self.names).reindex(self.symbols)}, index=self.symbols)
+        frame["quantity"] = grouped["quantity"]
+        frame["cost_basis"] = grouped["cost"]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            frame["avg_cost"] = np.where(frame["quantity"] > 0, frame["cost_basis"] / frame["quantity"], np.nan)
+        frame["last_price"] = pd.Series(last_prices, dtype=float).reindex(self.symbols).fillna(frame["avg_cost"])
+        frame["market_value"] = (frame["quantity"] * frame["last_price"]).fillna(0.0)
+        frame["unrealised"] = frame["market_value"] - frame["cost_basis"]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            frame["unrealised_pct"] = np.where(frame["cost_basis"] > 0,
+                                               frame["unrealised"] / frame["cost_basis"] * 100, np.nan)
+        frame["realised"] = self.realised_pnl()
+        return frame
+
+    def equity_curve(self, prices):
+        """
+        Revalue the portfolio on every date of ``prices``.
+
+        Trades on non-trading days take effect on the next price date. Prices
+        missing before a security's first close are back-filled.
+
+        Args:
+            prices (pd.DataFrame): Dates x symbols closes (see ``price_matrix``).
+
+        Returns:
+            pd.DataFrame: Per date: market_value, cost_basis, unrealised,
+            realised (cumulative), total_pnl and net_invested.
+        """
+        dates = pd.DatetimeIndex(prices.index)
+        closes = prices.reindex(columns=self.symbols).ffill().bfill().to_numpy(dtype=float)
+        shape = (len(dates), len(self.symbols))
+        rows = dates.searchsorted(pd.to_datetime(self.events["date"]))
+        keep = rows < len(dates)
+        rows = rows[keep]
+        columns = pd.Index(self.symbols).get_indexer(self.events["symbol"])[keep]
+        events = self.events[keep]
+
+        quantity, cost = np.zeros(shape), np.zeros(shape)
+        np.add.at(quantity, (rows, columns), events["quantity"].to_numpy())
+        np.add.at(cost, (rows, columns), events["cost"].to_numpy())
+        realised, cash = np.zeros(len(dates)), np.zeros(len(dates))
+        np.add.at(realised, rows, events["realised"].to_numpy())
+        np.add.at(cash, rows, events["cash"].to_numpy())
+
+        positions = quantity.cumsum(axis=0)
+        cost_basis = cost.cumsum(axis=0).sum(axis=1)
+        market_value = np.nansum(positions * closes, axis=1)
+        curve = pd.DataFrame({
+            "market_value": market_value,
+            "cost_basis": cost_basis,
+            "unrealised": market_value - cost_basis,
+            "realised": realised.cumsum(),
+            "net_invested": -cash.cumsum(),
+        }, index=dates)
+        curve["total_pnl"] = curve["unrealised"] + curve["realised"]
+        return curve
+
+    def xirr(self, market_value, as_of):
+        """XIRR of the trade cash flows with the current market value received on ``as_of``."""
+        dates = list(self.events["date"]) + [as_of]
+        amounts = list(self.events["cash"]) + [market_value]
+        return xirr(dates, amounts)
+
+    def report(self, prices, as_of=None):
+        """
+        Holdings, equity curve and headline totals at the prices given.
+
+        Returns:
+            dict: "holdings", "equity_curve", "lots", and "totals" with invested
+            (cost basis of open lots), market_value, unrealised, realised and xirr.
+        """
+        curve = self.equity_curve(prices) if len(prices) else pd.DataFrame()
+        last_prices = prices.ffill().iloc[-1] if len(prices) else pd.Series(dtype=float)
+        holdings = self.holdings(last_prices)
+        market_value = float(holdings["market_value"].sum())
+        as_of = as_of or (prices.index[-1].date() if len(prices) else date.today())
+        totals = {
+            "invested": float(holdings["cost_basis"].sum()),
+            "market_value": market_value,
+            "unrealised": float(holdings["unrealised"].sum()),
+            "realised": float(holdings["realised"].sum()),
+            "xirr": self.xirr(market_value, as_of),
+        }
+        return {"holdings": holdings, "equity_curve": curve, "lots": self.open_lots(), "totals": totals}
+
+
+def analyse_portfolio(transactions, today=None):
+    """
+    Build the portfolio of the BSE trades among ``transactions`` and value it at market prices.
+
+    Price histories for every security are fetched in one bulk call. When they
+    contain splits or bonus issues the trades are replayed on the adjusted basis.
+
+    Returns:
+        dict or None: ``Portfolio.report`` output, or None when there are no usable trades.
+    """
+    portfolio = Portfolio(transactions)
+    if not len(portfolio):
+        return None
+    today = today or date.today()
+    prices, splits = load_prices(portfolio.symbols, portfolio.first_trade, today)
+    if splits:
+        portfolio = Portfolio(transactions, splits=splits)
+    return portfolio.report(prices, as_of=today)
@@ -0,0 +1,168 @@
+"""Compact, token-budgeted encodings of market data for LLM prompts."""
+import numpy as np
+import pandas as pd
+
+# Prompt budget for the price history section, in estimated tokens
+DEFAULT_HISTORY_TOKEN_BUDGET = 250
+TRADING_DAYS_PER_YEAR = 252
+
+
+def estimate_tokens(text):
+    """
+    Estimate the number of LLM tokens in a piece of text.
+
+    Uses the common ~4 characters per token heuristic; good enough for
+    budgeting and for comparing prompt sizes, not for billing.
+    """
+    return (len(text) + 3) // 4
+
+
+def _pct(value):
+    return "n/a" if value is None or not np.isfinite(value) else f"{value * 100:+.1f}%"
+
+
+def _num(value):
+    if value is None or not np.isfinite(value):
+        return "n/a"
+    magnitude = abs(value)
+    if magnitude >= 1e9:
+        return f"{value / 1e9:.2f}B"
+    if magnitude >= 1e6:
+        return f"{value / 1e6:.2f}M"
+    if magnitude >= 1e3:
+        return f"{value / 1e3:.1f}K"
+    return f"{value:.2f}"
+
+
+def history_features(history):
+    """
+    Compute summary features of a daily OHLCV frame with vectorised operations.
+
+    Args:
+        history (pd.DataFrame): yfinance-style history with at least a 'Close'
+            column; 'High', 'Low' and 'Volume' are used when present.
+
+    Returns:
+        dict: Feature name -> value. Missing inputs yield ``nan``.
+    """
+    close = history["Close"].to_numpy(dtype=float)
+    close = close[np.isfinite(close)]
+    n = close.size
+    features = {"bars": n}
+    if n == 0:
+        return features
+
+    last = close[-1]
+    features["last_close"] = last
+    features["return_1d"] = last / close[-2] - 1 if n > 1 else np.nan
+    features["return_5d"] = last / close[-6] - 1 if n > 5 else np.nan
+    features["return_period"] = last / close[0] - 1 if n > 1 else np.nan
+
+    log_returns = np.diff(np.log(close))
+    features["volatility_annual"] = (
+        log_returns.std(ddof=1) * np.sqrt(TRADING_DAYS_PER_YEAR) if log_returns.size > 1 else np.nan
+    )
+
+    high = history["High"].to_numpy(dtype=float) if "High" in history else close
+    low = history["Low"].to_numpy(dtype=float) if "Low" in history else close
+    period_high, period_low = np.nanmax(high), np.nanmin(low)
+    features["period_high"] = period_high
+    features["period_low"] = period_low
+    span = period_high - period_low
+    features["range_position"] = (last - period_low) / span if span > 0 else np.nan
+
+    running_peak = np.maximum.accumulate(close)
+    features["max_drawdown"] = (close / running_peak - 1).min()
+
+    if "Volume" in history:
+        volume = history["Volume"].to_numpy(dtype=float)
+        volume = volume[np.isfinite(volume)]
+        if volume.size > 2:
+            baseline = volume[:-1]
+            std = baseline.std(ddof=1)
+            features["volume_last"] = volume[-1]
+            features["volume_avg"] = baseline.mean()
+            features["volume_z"] = (volume[-1] - baseline.mean()) / std if std > 0 else np.nan
+
+    fast_window, slow_window = 5, min(20, n)
+    if n >= fast_window + 1 and slow_window > fast_window:
+        cumsum = np.concatenate(([0.0], np.cumsum(close)))
+        fast = (cumsum[fast_window:] - cumsum[:-fast_window]) / fast_window
+        slow = (cumsum[slow_window:] - cumsum[:-slow_window]) / slow_window
+        # Align both moving averages on the bars where the slow one exists
+        fast = fast[-slow.size:]
+        above = fast > slow
+        features["sma_fast"] = fast[-1]
+        features["sma_slow"] = slow[-1]
+        features["sma_trend"] = "bullish" if above[-1] else "bearish"
+        crosses = np.flatnonzero(above[1:] != above[:-1])
+        features["sma_cross_bars_ago"] = int(above.size - 1 - (crosses[-1] + 1)) if crosses.size else None
+    return features
+
+
+def _feature_lines(features, history):
+    if features["bars"] == 0:
+        return ["No price history available."]
+    index = history.index
+    if isinstance(index, pd.DatetimeIndex) and len(index):
+        window = f"{index[0]:%Y-%m-%d}..{index[-1]:%Y-%m-%d}"
+    else:
+        window = "dates n/a"
+    lines = [
+        f"{features['bars']} daily bars {window}; last close {_num(features['last_close'])}",
+        "returns 1d {} 5d {} period {}; annualised vol {}; max drawdown {}".format(
+            _pct(features["return_1d"]), _pct(features["return_5d"]), _pct(features["return_period"]),
+            _pct(features["volatility_annual"]).lstrip("+"), _pct(features["max_drawdown"]),
+        ),
+        "period range {}-{}, last at {} of range".format(
+            _num(features["period_low"]), _num(features["period_high"]),
+            "n/a" if not np.isfinite(features["range_position"]) else f"{features['range_position'] * 100:.0f}%",
+        ),
+    ]
+    if "volume_z" in features:
+        lines.append("volume last {} vs avg {} (z {})".format(
+            _num(features["volume_last"]), _num(features["volume_avg"]),
+            "n/a" if not np.isfinite(features["volume_z"]) else f"{features['volume_z']:+.1f}",
+        ))
+    if "sma_trend" in features:
+        cross = features["sma_cross_bars_ago"]
+        cross_text = f"crossed {cross} bars ago" if cross is not None else "no cross in window"
+        lines.append(f"SMA5 {_num(features['sma_fast'])} vs SMA20 {_num(features['sma_slow'])}: "
+                     f"{features['sma_trend']}, {cross_text}")
+    return lines
+
+
+def encode_history(history, token_budget=DEFAULT_HISTORY_TOKEN_BUDGET):
+    """
+    Encode price history as summary features plus as many recent closes as fit the budget.
+
+    Args:
+        history (pd.DataFrame): yfinance-style daily history.
+        token_budget (int): Maximum estimated tokens for the returned text.
+
+    Returns:
+        str: Compact multi-line text for the prompt.
+    """
+    if history is None or "Close" not in history or history.empty:
+        return "No price history available."
+
+    features = history_features(history)
+    text = "\n".join(_feature_lines(features, history))
+    if estimate_tokens(text) >= token_budget:
+        return text[:token_budget * 4]
+
+    # Fill the remaining budget with the most recent closes, newest last
+    closes = history["Close"].to_numpy(dtype=float)
+    closes = closes[np.isfinite(closes)]
+    prefix = "\ncloses oldest->newest:"
+    remaining_chars = token_budget * 4 - len(text) - len(prefix)
+    recent = []
+    for value in closes[::-1]:
+        token = f" {value:.2f}"
+        if remaining_chars - len(token) < 0:
+            break
+        remaining_chars -= len(token)
+        recent.append(token)
+    if recent:
+        text += prefix + "".join(reversed(recent))
+    return text
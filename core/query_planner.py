@@ -0,0 +1,282 @@
+"""
+Local planner that compiles finance questions into transaction filters.
+
+Questions such as "Zomato orders last week", "SIPs this quarter" or "how much
+on food in May?" are parsed into a date range, categories and a merchant or
+spend category filter without an LLM call. The plan can be run against a
+``TransactionTable`` or compiled into a Gmail search query.
+"""
+import re
+from dataclasses import dataclass
+from datetime import date, timedelta
+from typing import Optional
+
+from core.email_parser import MERCHANTS
+from core.transactions import BSE_TRADE, CATEGORIES, INVESTMENT, SPEND, SECTION_TITLES, format_amount
+
+# Question keyword -> transaction category
+CATEGORY_KEYWORDS = {
+    BSE_TRADE: ("bse", "trade", "trades", "share", "shares", "stock", "stocks", "equity"),
+    INVESTMENT: ("investment", "investments", "invested", "invest", "sip", "sips", "mutual fund",
+                 "mutual funds", "fund", "funds"),
+    SPEND: ("spend", "spends", "spent", "spending", "expense", "expenses", "order", "orders", "paid",
+            "payment", "payments", "purchase", "purchases", "bill", "bills"),
+}
+
+# Question keyword -> spend category (as assigned by core.email_parser)
+SPEND_CATEGORY_KEYWORDS = {
+    "Food": ("food", "dining", "restaurant", "restaurants", "meal", "meals"),
+    "Travel": ("travel", "taxi", "cab", "cabs", "flight", "flights", "train", "trains", "hotel", "hotels"),
+    "Shopping": ("shopping",),
+    "Bills": ("bill", "bills", "utilities", "electricity", "recharge"),
+    "Entertainment": ("entertainment", "movies", "streaming"),
+}
+
+# Gmail search terms per category
+GMAIL_CATEGORY_TERMS = {
+    BSE_TRADE: ('subject:"trade confirmation"', '"contract note"', "BSE"),
+    INVESTMENT: ("SIP", '"mutual fund"', "investment"),
+    SPEND: ("debited", "payment", "order", "bill"),
+}
+
+_AGGREGATE = re.compile(r"\b(how much|total|sum|spent|altogether|in all)\b", re.IGNORECASE)
+_GROUP_BY = {
+    "merchant": re.compile(r"\b(?:by|per|each) (?:merchant|store|shop)\b", re.IGNORECASE),
+    "spend_category": re.compile(r"\b(?:by|per|each) (?:spend )?categor(?:y|ies)\b", re.IGNORECASE),
+    "month": re.compile(r"\b(?:by|per|each) month\b|\bmonthly\b", re.IGNORECASE),
+    "day": re.compile(r"\b(?:by|per|each) day\b|\bdaily\b", re.IGNORECASE),
+}
+
+_MONTH_NAMES = ("january", "february", "march", "april", "may", "june", "july", "august", "september",
+                "october", "november", "december")
+_MONTH_PATTERN = re.compile(
+    r"\b(?:(in|during|for|of)\s+)?(" + "|".join(name[:3] + r"(?:" + name[3:] + r")?" for name in _MONTH_NAMES)
+    + r")\b(?:,?\s+(\d{4}))?",
+    re.IGNORECASE,
+)
+_RELATIVE = re.compile(r"\b(today|yesterday|(this|last|past|previous) (week|month|quarter|year)|ytd|year to date)\b",
+                       re.IGNORECASE)
+_LAST_N = re.compile(r"\b(?:last|past|previous) (\d{1,3}) (day|week|month)s?\b", re.IGNORECASE)
+_ISO_RANGE = re.compile(r"\b(\d{4}-\d{2}-\d{2})\s*(?:to|and|-|until|till)\s*(\d{4}-\d{2}-\d{2})\b")
+
+
+@dataclass
+class QueryPlan:
+    """Structured form of a finance question."""
+
+    start: Optional[date] = None
+    end: Optional[date] = None
+    categories: tuple = ()
+    merchant: Optional[str] = None
+    spend_category: Optional[str] = None
+    aggregate: bool = False
+    group_by: Optional[str] = None
+
+
+def _keyword_pattern(keywords):
+    return re.compile(r"\b(" + "|".join(re.escape(k) for k in sorted(keywords, key=len, reverse=True)) + r")\b",
+                      re.IGNORECASE)
+
+
+_CATEGORY_PATTERNS = {category: _keyword_pattern(keywords) for category, keywords in CATEGORY_KEYWORDS.items()}
+_SPEND_CATEGORY_PATTERNS = {name: _keyword_pattern(keywords) for name, keywords in SPEND_CATEGORY_KEYWORDS.items()}
+_MERCHANT_PATTERN = _keyword_pattern(MERCHANTS)
+
+
+def _month_end(year, month):
+    first_of_next = date(year + month // 12, month % 12 + 1, 1)
+    return first_of_next - timedelta(days=1)
+
+
+def _shift_months(day, months):
+    index = day.year * 12 + day.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def parse_date_range(question, today):
+    """
+    Return the (start, end) dates, both inclusive, named in a question, or (None, None).
+
+    Understands "today", "yesterday", "this/last week|month|quarter|year",
+    "last N days|weeks|months", month names with an optional year ("in May",
+    "March 2025") and ISO ranges ("2025-05-01 to 2025-05-15").
+    """
+    match = _ISO_RANGE.search(question)
+    if match:
+        return date.fromisoformat(match.group(1)), date.fromisoformat(match.group(2))
+
+    match = _LAST_N.search(question)
+    if match:
+        count, unit = int(match.group(1)), match.group(2).lower()
+        days = {"day": 1, "week": 7}.get(unit)
+        start = today - timedelta(days=days * count - 1) if days else _shift_months(today, -count)
+        return start, today
+
+    match = _RELATIVE.search(question)
+    if match:
+        phrase = match.group(1).lower()
+        if phrase == "today":
+            return today, today
+        if phrase == "yesterday":
+            yesterday = today - timedelta(days=1)
+            return yesterday, yesterday
+        if phrase in ("ytd", "year to date"):
+            return date(today.year, 1, 1), today
+        which, unit = match.group(2).lower(), match.group(3).lower()
+        previous = which != "this"
+        if unit == "week":
+            monday = today - timedelta(days=today.weekday())
+            if previous:
+                return monday - timedelta(days=7), monday - timedelta(days=1)
+            return monday, today
+        if unit == "month":
+            if previous:
+                start = _shift_months(today, -1)
+                return start, _month_end(start.year, start.month)
+            return today.replace(day=1), today
+        if unit == "quarter":
+            quarter_start = date(today.year, (today.month - 1) // 3 * 3 + 1, 1)
+            if previous:
+                start = _shift_months(quarter_start, -3)
+                return start, quarter_start - timedelta(days=1)
+            return quarter_start, today
+        if previous:
+            return date(today.year - 1, 1, 1), date(today.year - 1, 12, 31)
+        return date(today.year, 1, 1), today
+
+    for match in _MONTH_PATTERN.finditer(question):
+        preposition, name, year = match.groups()
+        # "may" is also a verb; only accept it with a preposition or a year
+        if name.lower() == "may" and not preposition and not year:
+            continue
+        month = next(i for i, full in enumerate(_MONTH_NAMES, start=1) if full.startswith(name.lower()[:3]))
+        if year:
+            year = int(year)
+        else:
+            # The most recent such month, this year or last
+            year = today.year if month <= today.month else today.year - 1
+        return date(year, month, 1), _month_end(year, month)
+    return None, None
+
+
+def plan_query(question, today=None):
+    """
+    Compile a natural-language finance question into a ``QueryPlan``.
+
+    Args:
+        question (str): The user's question.
+        today (date, optional): Reference date for relative ranges; defaults to today.
+
+    Returns:
+        QueryPlan or None: None when the question names no date range, aggregate
+        (total, how much, by merchant, ...), merchant or spend category, in which
+        case callers should fall back to the LLM.
+    """
+    today = today or date.today()
+    start, end = parse_date_range(question, today)
+
+    merchant = spend_category = None
+    match = _MERCHANT_PATTERN.search(question)
+    if match:
+        # The merchant alone narrows the search; its spend category is implied
+        merchant = MERCHANTS[match.group(1).lower()][0]
+    else:
+        for name, pattern in _SPEND_CATEGORY_PATTERNS.items():
+            if pattern.search(question):
+                spend_category = name
+                break
+
+    categories = tuple(category for category in CATEGORIES if _CATEGORY_PATTERNS[category].search(question))
+    if (merchant or spend_category) and not categories:
+        categories = (SPEND,)
+    if spend_category and SPEND not in categories:
+        spend_category = None
+    if set(categories) == set(CATEGORIES):
+        categories = ()
+
+    group_by = next((group for group, pattern in _GROUP_BY.items() if pattern.search(question)), None)
+    aggregate = bool(_AGGREGATE.search(question)) or group_by is not None
+    # A category keyword alone ("Should I invest in Reliance?") is not a query over transactions
+    if start is None and not aggregate and merchant is None and spend_category is None:
+        return None
+
+    return QueryPlan(
+        start=start,
+        end=end,
+        categories=categories,
+        merchant=merchant,
+        spend_category=spend_category,
+        aggregate=aggregate,
+        group_by=group_by,
+    )
+
+
+def to_gmail_query(plan):
+    """Return the Gmail search query that finds the emails behind a plan."""
+    terms = []
+    if plan.merchant:
+        terms.append(f'"{plan.merchant}"' if " " in plan.merchant else plan.merchant)
+    else:
+        words = [term for category in (plan.categories or CATEGORIES) for term in GMAIL_CATEGORY_TERMS[category]]
+        if plan.spend_category:
+            words += [k for k in SPEND_CATEGORY_KEYWORDS[plan.spend_category] if " " not in k]
+        terms.append("(" + " OR ".join(words) + ")")
+    if plan.start:
+        terms.append(f"after:{plan.start:%Y/%m/%d}")
+    if plan.end:
+        # Gmail's "before" is exclusive
+        terms.append(f"before:{plan.end + timedelta(days=1):%Y/%m/%d}")
+    return " ".join(terms)
+
+
+def run_plan(plan, table):
+    """Return the rows of a ``TransactionTable`` a plan selects."""
+    return table.filter(
+        category=plan.categories or None,
+        start=plan.start,
+        end=plan.end,
+        merchant=plan.merchant,
+        spend_category=plan.spend_category,
+    )
+
+
+def describe_plan(plan):
+    """Return a short human readable description of a plan, e.g. "Spends on Food, May 01 – May 31, 2025"."""
+    what = ", ".join(SECTION_TITLES[c] for c in plan.categories) if plan.categories else "All transactions"
+    if plan.merchant:
+        what += f" at {plan.merchant}"
+    elif plan.spend_category:
+        what += f" on {plan.spend_category}"
+    if plan.start and plan.end:
+        if plan.start == plan.end:
+            what += f", {plan.start:%b %d, %Y}"
+        else:
+            what += f", {plan.start:%b %d} – {plan.end:%b %d, %Y}"
+    return what
+
+
+def answer_query(plan, table):
+    """
+    Answer a planned question from local transactions.
+
+    Returns:
+        dict: "plan", "description", "matches" (the selected ``TransactionTable``),
+        "count", "total", "breakdown" (group -> total, when grouped) and "text",
+        a one-paragraph answer.
+    """
+    matches = run_plan(plan, table)
+    total = matches.total()
+    breakdown = matches.totals_by(plan.group_by) if plan.group_by and len(matches) else {}
+    description = describe_plan(plan)
+    text = f"{description}: {format_amount(total)} across {len(matches)} transaction{'s' if len(matches) != 1 else ''}."
+    if breakdown:
+        text += " " + "; ".join(f"{key}: {format_amount(value)}" for key, value in breakdown.items()) + "."
+    return {
+        "plan": plan,
+        "description": description,
+        "matches": matches,
+        "count": len(matches),
+        "total": total,
+        "breakdown": breakdown,
+        "text": text,
+    }
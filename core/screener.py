@@ -0,0 +1,475 @@
+"""
+Cross-sectional stock screener over cached company fundamentals.
+
+``Screener`` keeps the ``stock_info`` fields shown on the stock page for a
+whole universe in one column array per field, and answers filter/sort/rank
+queries such as::
+
+    PE < 20 and ROE > 15%, top 20 by revenueGrowth
+    sector == "Technology" and (pb < 3 or yield > 2%), sort by mcap desc limit 10
+    mcap > 50000cr and debt between 0 and 5000cr, bottom 5 by peg
+
+from memory with vectorised masks. ``refresh`` pulls rows from the shared
+data-fetcher cache, rewriting only the tickers whose cache entry changed
+since the last refresh, and optionally fetches the ones nothing has cached.
+"""
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+from config.settings import get_settings
+from services.data_fetcher import fetch_stock_info, peek_cached
+
+# Numeric stock_info fields kept per ticker (the ones display_stock_data shows)
+NUMERIC_FIELDS = (
+    "currentPrice", "previousClose", "regularMarketChangePercent", "regularMarketVolume", "marketCap",
+    "trailingPE", "forwardPE", "pegRatio", "priceToBook", "beta", "fiftyTwoWeekHigh", "fiftyTwoWeekLow",
+    "dividendRate", "dividendYield", "payoutRatio", "totalCash", "totalDebt", "debtToEquity", "freeCashflow",
+    "returnOnAssets", "returnOnEquity", "earningsQuarterlyGrowth", "revenueGrowth", "grossMargins",
+    "operatingMargins", "profitMargins",
+)
+TEXT_FIELDS = ("shortName", "sectorDisp", "industryDisp", "country")
+
+# Short names accepted in queries (field names themselves match case-insensitively)
+ALIASES = {
+    "price": "currentPrice", "change": "regularMarketChangePercent", "volume": "regularMarketVolume",
+    "mcap": "marketCap", "pe": "trailingPE", "fpe": "forwardPE", "peg": "pegRatio", "pb": "priceToBook",
+    "high52": "fiftyTwoWeekHigh", "low52": "fiftyTwoWeekLow", "yield": "dividendYield",
+    "payout": "payoutRatio", "cash": "totalCash", "debt": "totalDebt", "de": "debtToEquity",
+    "fcf": "freeCashflow", "roa": "returnOnAssets", "roe": "returnOnEquity",
+    "earnings_growth": "earningsQuarterlyGrowth", "revenue_growth": "revenueGrowth",
+    "gross_margin": "grossMargins", "operating_margin": "operatingMargins", "net_margin": "profitMargins",
+    "name": "shortName", "sector": "sectorDisp", "industry": "industryDisp",
+}
+
+# Yahoo reports these in percentage points; every other ratio is a fraction (0.15 = 15%)
+PERCENT_POINT_FIELDS = frozenset({"regularMarketChangePercent", "dividendYield"})
+
+UNITS = {"%": 0.01, "k": 1e3, "l": 1e5, "lakh": 1e5, "m": 1e6, "mn": 1e6, "cr": 1e7, "crore": 1e7,
+         "b": 1e9, "bn": 1e9, "t": 1e12}
+
+DEFAULT_FETCH_WORKERS = get_settings().batch.screener_fetch_workers
+
+_FIELDS = {name.lower(): name for name in NUMERIC_FIELDS + TEXT_FIELDS}
+_FIELDS.update(ALIASES)
+_KEYWORDS = {"and", "or", "not", "between", "top", "bottom", "by", "sort", "order", "asc", "desc", "limit"}
+_TOKEN = re.compile(r"""\s*(?:
+    (?P<number>-?\d+(?:\.\d+)?)(?:\s*(?P<unit>%|(?:crore|cr|lakh|bn|mn|[klmbt])\b))?
+  | (?P<string>"[^"]*"|'[^']*')
+  | (?P<op><=|>=|==|!=|<|>|=)
+  | (?P<punct>[(),;])
+  | (?P<word>[A-Za-z_][A-Za-z0-9_]*)
+)""", re.VERBOSE | re.IGNORECASE)
+_COMPARE = {"<": np.less, "<=": np.less_equal, ">": np.greater, ">=": np.greater_equal,
+            "=": np.equal, "==": np.equal, "!=": np.not_equal}
+
+
+def resolve_field(name):
+    """Return the stock_info field for a query name or alias; raises ValueError when unknown."""
+    field = _FIELDS.get(name.lower())
+    if field is None:
+        raise ValueError(f"Unknown screener field: {name}")
+    return field
+
+
+def _numeric_field(name):
+    field = resolve_field(name)
+    if field in TEXT_FIELDS:
+        raise ValueError(f"{field} is a text field")
+    return field
+
+
+def _tokenize(text):
+    tokens, position = [], 0
+    text = text.rstrip()
+    while position < len(text):
+        match = _TOKEN.match(text, position)
+        if not match or match.end() == position:
+            raise ValueError(f"Cannot parse query near: {text[position:position + 20]!r}")
+        position = match.end()
+        kind = match.lastgroup if match.lastgroup != "unit" else "number"
+        if kind == "number":
+            unit = (match.group("unit") or "").lower() or None
+            tokens.append(("number", (float(match.group("number")), unit)))
+        elif kind == "string":
+            tokens.append(("string", match.group("string")[1:-1]))
+        elif kind == "word" and match.group("word").lower() in _KEYWORDS:
+            tokens.append(("keyword", match.group("word").lower()))
+        else:
+            tokens.append((kind, match.group(kind)))
+    return tokens
+
+
+class _Parser:
+    """Recursive-descent parser producing a filter tree and an ordering."""
+
+    def __init__(self, text):
+        self.tokens = _tokenize(text)
+        self.position = 0
+
+    def peek(self, kind=None, value=None):
+        if self.position >= len(self.tokens):
+            return None
+        token = self.tokens[self.position]
+        if (kind and token[0] != kind) or (value and token[1] != value):
+            return None
+        return token
+
+    def take(self, kind=None, value=None):
+        token = self.peek(kind, value)
+        if token is None:
+            found = self.tokens[self.position][1] if self.position < len(self.tokens) else "end of query"
+            raise ValueError(f"Expected {value or kind} but found {found!r}")
+        self.position += 1
+        return token[1]
+
+    def parse(self):
+        condition = None
+        if not self._at_order():
+            condition = self.expression()
+        while self.peek("punct", ",") or self.peek("punct", ";"):
+            self.position += 1
+        order = self.order() if self._at_order() else None
+        if self.position < len(self.tokens):
+            raise ValueError(f"Unexpected {self.tokens[self.position][1]!r} in query")
+        return condition, order
+
+    def _at_order(self):
+        token = self.peek("keyword")
+        return token is not None and token[1] in ("top", "bottom", "sort", "order", "limit")
+
+    def expression(self):
+        node = self.conjunction()
+        while self.peek("keyword", "or"):
+            self.position += 1
+            node = ("or", node, self.conjunction())
+        return node
+
+    def conjunction(self):
+        node = self.negation()
+        while self.peek("keyword", "and"):
+            self.position += 1
+            node = ("and", node, self.negation())
+        return node
+
+    def negation(self):
+        if self.peek("keyword", "not"):
+            self.position += 1
+            return ("not", self.negation())
+        if self.peek("punct", "("):
+            self.position += 1
+            node = self.expression()
+            self.take("punct", ")")
+            return node
+        return self.comparison()
+
+    def comparison(self):
+        field = resolve_field(self.take("word"))
+        if field in TEXT_FIELDS:
+            op = self.take("op")
+            if op not in ("=", "==", "!=") or not self.peek("string"):
+                raise ValueError(f"{field} is a text field; compare it with = or != to a quoted string")
+            return ("compare", field, op, ("text", self.take("string")))
+        if self.peek("keyword", "between"):
+            self.position += 1
+            low = self.take("number")
+            self.take("keyword", "and")
+            return ("between", field, _scale(field, low), _scale(field, self.take("number")))
+        op = self.take("op")
+        if self.peek("number"):
+            return ("compare", field, op, ("value", _scale(field, self.take("number"))))
+        if self.peek("string"):
+            raise ValueError(f"{field} is numeric; compare it with a number")
+        return ("compare", field, op, ("field", _numeric_field(self.take("word"))))
+
+    def order(self):
+        field, descending, limit = None, True, None
+        keyword = self.take("keyword")
+        if keyword in ("top", "bottom"):
+            limit = int(self.take("number")[0])
+            self.take("keyword", "by")
+            field = _numeric_field(self.take("word"))
+            descending = keyword == "top"
+        elif keyword in ("sort", "order"):
+            self.take("keyword", "by")
+            field = _numeric_field(self.take("word"))
+            descending = False
+            if self.peek("keyword", "asc") or self.peek("keyword", "desc"):
+                descending = self.take("keyword") == "desc"
+        else:
+            self.position -= 1
+        if self.peek("keyword", "limit"):
+            self.position += 1
+            limit = int(self.take("number")[0])
+        return field, descending, limit
+
+
+def _scale(field, number):
+    value, unit = number
+    if unit is None:
+        return value
+    if unit == "%" and field in PERCENT_POINT_FIELDS:
+        return value
+    return value * UNITS[unit]
+
+
+@lru_cache(maxsize=256)
+def parse_query(text):
+    """
+    Parse a screener query.
+
+    A query is an optional filter followed by an optional ordering, separated
+    by a comma. Filters combine ``field op value`` comparisons (``< <= > >= =
+    != ==``) and ``field between a and b`` with and/or/not and parentheses.
+    Numbers accept ``%`` (read as a fraction, or percentage points for
+    ``PERCENT_POINT_FIELDS``) and k/l/m/cr/b/t suffixes; text fields compare
+    to quoted strings case-insensitively. Orderings are ``top N by field``,
+    ``bottom N by field`` or ``sort by field [asc|desc]`` (ascending by
+    default), each optionally followed by ``limit N``.
+
+    Returns:
+        tuple: (filter tree or None, (field, descending, limit) or None).
+
+    Raises:
+        ValueError: On unknown fields or malformed queries.
+    """
+    return _Parser(text).parse()
+
+
+def _fields_in(node):
+    if node is None:
+        return []
+    if node[0] in ("and", "or"):
+        return _fields_in(node[1]) + _fields_in(node[2])
+    if node[0] == "not":
+        return _fields_in(node[1])
+    fields = [node[1]]
+    if node[0] == "compare" and node[3][0] == "field":
+        fields.append(node[3][1])
+    return fields
+
+
+def _number(value):
+    if value is None or isinstance(value, bool):
+        return np.nan
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return np.nan
+    return number if np.isfinite(number) else np.nan
+
+
+class Screener:
+    """
+    Columnar table of fundamentals for a universe of tickers.
+
+    Every numeric field is one float64 array (NaN when Yahoo has no value) and
+    every text field one object array, both indexed by row; rows are appended
+    the first time a ticker is seen and rewritten in place afterwards. Reads
+    and writes are serialised by a lock, so a background refresh can run
+    while queries are answered.
+
+    Args:
+        universe (iterable[str], optional): Tickers ``refresh`` loads by default.
+    """
+
+    def __init__(self, universe=()):
+        self.universe = list(dict.fromkeys(t.strip().upper() for t in universe if t.strip()))
+        self.tickers = []
+        self._rows = {}
+        self._lock = threading.RLock()
+        self._capacity = 0
+        self._numeric = {}
+        self._text = {}
+        self._versions = np.empty(0)
+        self._loaded_at = np.empty(0)
+        self._grow(max(len(self.universe), 16))
+
+    def __len__(self):
+        return len(self.tickers)
+
+    def _grow(self, capacity):
+        def extend(array, fill, dtype):
+            grown = np.full(capacity, fill, dtype=dtype)
+            grown[:len(array)] = array
+            return grown
+        for field in NUMERIC_FIELDS:
+            self._numeric[field] = extend(self._numeric.get(field, ()), np.nan, float)
+        for field in TEXT_FIELDS:
+            self._text[field] = extend(self._text.get(field, ()), None, object)
+        self._versions = extend(self._versions, np.nan, float)
+        self._loaded_at = extend(self._loaded_at, np.nan, float)
+        self._capacity = capacity
+
+    def update(self, ticker, info, version=None):
+        """
+        Write one ticker's ``stock_info`` dict into its row.
+
+        Args:
+            ticker (str): Ticker symbol.
+            info (dict): Yahoo ``Ticker.info``-style mapping.
+            version (float, optional): Cache version the row was read from.
+        """
+        ticker = ticker.strip().upper()
+        with self._lock:
+            row = self._rows.get(ticker)
+            if row is None:
+                row = len(self.tickers)
+                if row >= self._capacity:
+                    self._grow(self._capacity * 2)
+                self._rows[ticker] = row
+                self.tickers.append(ticker)
+            for field in NUMERIC_FIELDS:
+                self._numeric[field][row] = _number(info.get(field))
+            for field in TEXT_FIELDS:
+                self._text[field][row] = info.get(field)
+            self._versions[row] = np.nan if version is None else version
+            self._loaded_at[row] = time.monotonic()
+
+    def refresh(self, tickers=None, fetch_missing=False, max_age=None, workers=DEFAULT_FETCH_WORKERS):
+        """
+        Bring rows up to date from the shared data-fetcher cache.
+
+        Rows whose cache entry is unchanged since they were written are
+        skipped. With ``fetch_missing`` the tickers that are not cached and
+        have no row (or a row older than ``max_age`` seconds) are fetched
+        through ``fetch_stock_info`` on a thread pool, which also caches them
+        for the rest of the app.
+
+        Args:
+            tickers (iterable[str], optional): Defaults to the universe.
+            fetch_missing (bool): Go upstream for uncached tickers.
+            max_age (float, optional): Age in seconds after which an uncached row is re-fetched.
+            workers (int): Concurrent upstream fetches.
+
+        Returns:
+            dict: Counts of "updated", "unchanged", "fetched" and "missing" tickers.
+        """
+        tickers = self.universe if tickers is None else [t.strip().upper() for t in tickers]
+        counts = {"updated": 0, "unchanged": 0, "fetched": 0, "missing": 0}
+        uncached = []
+        now = time.monotonic()
+        for ticker in tickers:
+            entry = peek_cached("info", ticker)
+            row = self._rows.get(ticker)
+            if entry is None or not entry[1]:
+                if row is None or (max_age is not None and now - self._loaded_at[row] > max_age):
+                    uncached.append(ticker)
+                else:
+                    counts["unchanged"] += 1
+            elif row is not None and self._versions[row] == entry[0]:
+                counts["unchanged"] += 1
+            else:
+                self.update(ticker, entry[1], version=entry[0])
+                counts["updated"] += 1
+
+        if uncached and fetch_missing:
+            with ThreadPoolExecutor(max_workers=max(1, min(workers, len(uncached)))) as pool:
+                for ticker, info in zip(uncached, pool.map(_safe_fetch, uncached)):
+                    if info:
+                        entry = peek_cached("info", ticker)
+                        self.update(ticker, info, version=entry[0] if entry else None)
+                        counts["fetched"] += 1
+                    else:
+                        counts["missing"] += 1
+        else:
+            counts["missing"] += len(uncached)
+        return counts
+
+    def frame(self, fields=None):
+        """Return the table (or just ``fields``) as a DataFrame indexed by ticker."""
+        fields = [resolve_field(f) for f in fields] if fields else list(TEXT_FIELDS + NUMERIC_FIELDS)
+        with self._lock:
+            count = len(self.tickers)
+            columns = {field: self._column(field)[:count].copy() for field in fields}
+            return pd.DataFrame(columns, index=pd.Index(list(self.tickers), name="ticker"))
+
+    def _column(self, field):
+        return self._numeric[field] if field in self._numeric else self._text[field]
+
+    def _mask(self, node, count):
+        kind = node[0]
+        if kind == "and":
+            return self._mask(node[1], count) & self._mask(node[2], count)
+        if kind == "or":
+            return self._mask(node[1], count) | self._mask(node[2], count)
+        if kind == "not":
+            return ~self._mask(node[1], count)
+        if kind == "between":
+            values = self._numeric[node[1]][:count]
+            return (values >= node[2]) & (values <= node[3])
+
+        _, field, op, (operand_kind, operand) = node
+        if operand_kind == "text":
+            wanted = operand.casefold()
+            matches = np.fromiter((isinstance(v, str) and v.casefold() == wanted
+                                   for v in self._text[field][:count]), dtype=bool, count=count)
+            return ~matches if op == "!=" else matches
+        right = self._numeric[operand][:count] if operand_kind == "field" else operand
+        return _COMPARE[op](self._numeric[field][:count], right)
+
+    def query(self, text):
+        """
+        Run a screener query (see ``parse_query``) against the table.
+
+        Rows with no value for a compared or ordering field never match.
+
+        Returns:
+            pd.DataFrame: Matching tickers in rank order with a 1-based "rank",
+            the name and every field the query mentions.
+        """
+        condition, order = parse_query(text)
+        with self._lock:
+            count = len(self.tickers)
+            mask = np.ones(count, dtype=bool) if condition is None else self._mask(condition, count)
+            selected = np.flatnonzero(mask)
+            limit = None
+            if order is not None:
+                field, descending, limit = order
+                if field is not None:
+                    keys = self._numeric[field][selected]
+                    selected = selected[~np.isnan(keys)]
+                    keys = keys[~np.isnan(keys)]
+                    # Stable sort keeps table order among ties
+                    ranked = np.argsort(-keys if descending else keys, kind="stable")
+                    selected = selected[ranked]
+            if limit is not None:
+                selected = selected[:limit]
+
+            fields = ["shortName"] + _fields_in(condition)
+            if order is not None and order[0] is not None:
+                fields.append(order[0])
+            columns = {"rank": np.arange(1, len(selected) + 1)}
+            for field in dict.fromkeys(fields):
+                columns[field] = self._column(field)[selected]
+            index = pd.Index([self.tickers[row] for row in selected], name="ticker")
+        return pd.DataFrame(columns, index=index)
+
+    def shortlist(self, text):
+        """Return the tickers matching a query, best ranked first."""
+        return list(self.query(text).index)
+
+
+def _safe_fetch(ticker):
+    try:
+        return fetch_stock_info(ticker)
+    except Exception as e:
+        print(f"Warning: Could not fetch info for {ticker}: {e}")
+        return None
+
+
+def screen(universe, query, fetch_missing=True):
+    """
+    One-shot screen: load ``universe`` (from cache, fetching what is missing) and run ``query``.
+
+    Returns:
+        pd.DataFrame: See ``Screener.query``.
+    """
+    screener = Screener(universe)
+    screener.refresh(fetch_missing=fetch_missing)
+    return screener.query(query)
@@ -1,26 +1,175 @@
 """Sentiment analysis utilities."""
-from transformers import pipeline
+import hashlib
+import os
+import threading
+from config.settings import get_settings
+from core import tracing
+from core.lazy_imports import lazy_callable
+from services.cache import DiskCache, cache_dir
 from services.data_fetcher import fetch_stock_news
 
-# Initialize sentiment analysis pipeline (use HuggingFace model or any other sentiment analysis model)
-def analyze_sentiment(news_articles):
-    sentiment_analyzer = pipeline("sentiment-analysis", model="yiyanghkust/finbert-tone")
-    sentiments = []
-    
-    # Analyzing the sentiment of the article title
-    for article in news_articles:
-        sentiment = sentiment_analyzer(article['title'])[0]  
-        sentiments.append(sentiment['label'])
-    
+# transformers takes seconds to import; only pay for it when the model is first loaded
+pipeline = lazy_callable("transformers", "pipeline")
+
+_settings = get_settings()
+SENTIMENT_MODEL = _settings.sentiment.model
+DEFAULT_BATCH_SIZE = _settings.sentiment.batch_size
+# FinBERT's maximum sequence length; longer title + content inputs are cut
+DEFAULT_MAX_LENGTH = _settings.sentiment.max_length
+
+# Scores are deterministic per text, so cached entries only expire to bound the file
+SENTIMENT_CACHE_MAX_AGE = _settings.sentiment.cache_max_age
+SENTIMENT_CACHE_MAX_ENTRIES = _settings.sentiment.cache_max_entries
+
+_sentiment_analyzer = None
+_sentiment_cache = None
+_sentiment_lock = threading.Lock()
+
+
+def get_sentiment_analyzer():
+    """Return the shared FinBERT pipeline, loading it on first use."""
+    global _sentiment_analyzer
+    if _sentiment_analyzer is None:
+        with _sentiment_lock:
+            if _sentiment_analyzer is None:
+                _sentiment_analyzer = pipeline("sentiment-analysis", model=SENTIMENT_MODEL)
+    return _sentiment_analyzer
+
+
+def get_sentiment_cache():
+    """Return the shared on-disk cache of per-article sentiment scores."""
+    global _sentiment_cache
+    if _sentiment_cache is None:
+        with _sentiment_lock:
+            if _sentiment_cache is None:
+                _sentiment_cache = DiskCache(
+                    os.path.join(cache_dir(), "sentiment.sqlite"),
+                    max_age=SENTIMENT_CACHE_MAX_AGE,
+                    max_entries=SENTIMENT_CACHE_MAX_ENTRIES,
+                )
+    return _sentiment_cache
+
+
+def sentiment_cache_stats():
+    """Return cache counters; ``inferences_saved`` is the number of articles served from the cache."""
+    stats = get_sentiment_cache().stats()
+    stats["inferences_saved"] = stats["hits"]
+    return stats
+
+
+def _cache_key(text, truncation, max_length):
+    # The same text scores differently under another model or truncation length
+    material = f"{SENTIMENT_MODEL}|{max_length if truncation else 0}|{text}"
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+def article_text(article, include_content=False):
+    """Return the text scored for an article: its title, optionally followed by its content."""
+    text = article.get('title') or ''
+    if include_content and article.get('content'):
+        text = f"{text}. {article['content']}"
+    return text
+
+
+@tracing.traced("sentiment.score")
+def score_articles(news_articles, batch_size=DEFAULT_BATCH_SIZE, truncation=True,
+                   max_length=DEFAULT_MAX_LENGTH, include_content=False, use_cache=True):
+    """
+    Score news articles with FinBERT in batched inference calls.
+
+    Scores are looked up in the on-disk sentiment cache by a hash of the
+    scored text, so only articles that have not been seen before are run
+    through the model.
+
+    Args:
+        news_articles (list[dict]): Articles with a 'title' and optional 'content'.
+        batch_size (int): Number of texts per forward pass.
+        truncation (bool): Truncate inputs longer than ``max_length`` tokens.
+        max_length (int): Maximum tokens per input when truncating.
+        include_content (bool): Score "title. content" instead of the title alone.
+        use_cache (bool): Read and update the on-disk sentiment cache.
+
+    Returns:
+        tuple[list[str], list[float]]: Per-article labels and confidence scores,
+        in the order of ``news_articles``.
+    """
+    texts = [article_text(article, include_content) for article in news_articles]
+    if not texts:
+        return [], []
+
+    with tracing.span("sentiment.cache_lookup", articles=len(texts)) as span:
+        keys = [_cache_key(text, truncation, max_length) for text in texts]
+        cached = get_sentiment_cache().get_many(keys) if use_cache else {}
+        span.set(hits=len(cached))
+
+    # Score each distinct unseen text once, even if several articles share it
+    pending = {key: text for key, text in zip(keys, texts) if key not in cached}
+    if pending:
+        sentiment_analyzer = get_sentiment_analyzer()
+        with tracing.span("sentiment.inference", texts=len(pending), batch_size=batch_size):
+            results = sentiment_analyzer(list(pending.values()), batch_size=batch_size,
+                                         truncation=truncation, max_length=max_length)
+        scored = {
+            key: {"label": result['label'].lower(), "score": float(result['score'])}
+            for key, result in zip(pending, results)
+        }
+        if use_cache:
+            get_sentiment_cache().set_many(scored)
+        cached.update(scored)
+
+    labels = [cached[key]["label"] for key in keys]
+    scores = [cached[key]["score"] for key in keys]
+    return labels, scores
+
+
+def majority_sentiment(labels):
     # Return the most common sentiment from the articles
-    if sentiments:
-        return max(set(sentiments), key=sentiments.count)
+    if labels:
+        return max(set(labels), key=labels.count)
     return "neutral"  # Default to neutral if no sentiment can be determined
 
 
+def analyze_sentiment(news_articles, batch_size=DEFAULT_BATCH_SIZE, include_content=False, use_cache=True):
+    labels, _ = score_articles(news_articles, batch_size=batch_size, include_content=include_content,
+                               use_cache=use_cache)
+    return majority_sentiment(labels)
+
+
+def analyze_sentiment_batch(articles_by_ticker, batch_size=DEFAULT_BATCH_SIZE, include_content=False,
+                            use_cache=True):
+    """
+    Score the news of many tickers in a single batched inference pass.
+
+    Args:
+        articles_by_ticker (dict): Ticker -> list of news articles.
+        batch_size (int): Number of texts per forward pass.
+        include_content (bool): Score "title. content" instead of the title alone.
+        use_cache (bool): Read and update the on-disk sentiment cache.
+
+    Returns:
+        dict: Ticker -> {"sentiment": majority label, "labels": [...], "scores": [...]}.
+    """
+    tickers = list(articles_by_ticker)
+    all_articles = [article for ticker in tickers for article in articles_by_ticker[ticker]]
+    labels, scores = score_articles(all_articles, batch_size=batch_size, include_content=include_content,
+                                    use_cache=use_cache)
+
+    results, offset = {}, 0
+    for ticker in tickers:
+        count = len(articles_by_ticker[ticker])
+        ticker_labels = labels[offset:offset + count]
+        results[ticker] = {
+            "sentiment": majority_sentiment(ticker_labels),
+            "labels": ticker_labels,
+            "scores": scores[offset:offset + count],
+        }
+        offset += count
+    return results
+
+
 # Example of usage (for testing purposes)
 if __name__ == "__main__":
     # Fetching the stock news data
     news_data_list = fetch_stock_news('INFY')
     sentiment = analyze_sentiment(news_data_list)
-    print(f"Overall Sentiment: {sentiment}")
\ No newline at end of file
+    print(f"Overall Sentiment: {sentiment}")
@@ -0,0 +1,325 @@
+"""
+Lightweight tracing of where a request spends its time.
+
+Code wraps its stages in spans::
+
+    with tracing.span("llm.generate", model=model_name) as span:
+        text = model.generate_content(prompt).text
+        span.set(response_chars=len(text))
+
+Spans nest through a context variable, so a fetch inside a recommendation is
+recorded as its child. Finished spans feed per-name latency histograms
+(``render_prometheus``), a ring of recent spans (``recent_spans``) and, when
+configured, a JSON-lines file with one span per line.
+
+Tracing is off unless ``FINANCEGPT_TRACING=1`` is set or ``enable()`` is
+called. While off, ``span()`` returns a shared no-op object, so instrumented
+code costs one function call and a flag check per span.
+"""
+import contextlib
+import contextvars
+import functools
+import itertools
+import json
+import threading
+import time
+from collections import deque
+
+from config.settings import get_settings
+
+# Upper bounds (seconds) of the latency histogram buckets
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+RECENT_SPANS = 1000
+
+_enabled = False
+_current = contextvars.ContextVar("financegpt_span", default=None)
+_ids = itertools.count(1)
+_lock = threading.Lock()
+_exporters = []
+_stats = {}
+_recent = deque(maxlen=RECENT_SPANS)
+
+
+class _NoopSpan:
+    """Stand-in returned while tracing is off; every operation does nothing."""
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_exc):
+        return False
+
+    def __bool__(self):
+        return False
+
+    def set(self, **_attrs):
+        return self
+
+    def end(self, error=None):
+        pass
+
+
+_NOOP = _NoopSpan()
+
+
+class Span:
+    """
+    One timed operation. Use as a context manager (``span``) or end it
+    explicitly (``start_span``); attributes are added with ``set``.
+    """
+    __slots__ = ("name", "trace_id", "span_id", "parent_id", "attrs", "start", "started_at", "duration",
+                 "error", "_token", "_ended")
+
+    def __init__(self, name, attrs, parent):
+        self.name = name
+        self.span_id = next(_ids)
+        self.parent_id = parent.span_id if parent is not None else None
+        self.trace_id = parent.trace_id if parent is not None else self.span_id
+        self.attrs = attrs
+        self.started_at = time.time()
+        self.start = time.perf_counter()
+        self.duration = None
+        self.error = None
+        self._token = None
+        self._ended = False
+
+    def __enter__(self):
+        self._token = _current.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, _tb):
+        if self._token is not None:
+            try:
+                _current.reset(self._token)
+            except ValueError:
+                # Exited from another context (e.g. a generator resumed in a worker thread)
+                pass
+            self._token = None
+        self.end(error=repr(exc) if exc is not None else None)
+        return False
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+        return self
+
+    def end(self, error=None):
+        if self._ended:
+            return
+        self._ended = True
+        self.duration = time.perf_counter() - self.start
+        self.error = error
+        _record(self)
+
+    def to_dict(self):
+        return {
+            "trace_id": f"{self.trace_id:x}",
+            "span_id": f"{self.span_id:x}",
+            "parent_id": f"{self.parent_id:x}" if self.parent_id is not None else None,
+            "name": self.name,
+            "start": self.started_at,
+            "duration": self.duration,
+            "error": self.error,
+            "attrs": self.attrs,
+        }
+
+
+class JsonLinesExporter:
+    """Append every finished span to ``path`` as one JSON object per line."""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def __call__(self, record):
+        line = json.dumps(record, default=str)
+        with self._lock, open(self.path, "a", encoding="utf-8") as file:
+            file.write(line + "\n")
+
+
+def enable(jsonl_path=None):
+    """Turn tracing on, optionally also writing spans to a JSON-lines file."""
+    global _enabled
+    if jsonl_path:
+        add_exporter(JsonLinesExporter(jsonl_path))
+    _enabled = True
+
+
+def disable():
+    """Turn tracing off and drop the exporters; collected stats are kept."""
+    global _enabled
+    _enabled = False
+    with _lock:
+        _exporters.clear()
+
+
+def is_enabled():
+    return _enabled
+
+
+def add_exporter(exporter):
+    """Register a callable that receives each finished span as a dict."""
+    with _lock:
+        _exporters.append(exporter)
+
+
+def span(name, **attrs):
+    """Return a context manager timing the enclosed block as a child of the current span."""
+    if not _enabled:
+        return _NOOP
+    return Span(name, attrs, _current.get())
+
+
+def start_span(name, **attrs):
+    """
+    Start a span that is not made current; call ``end()`` on it when done.
+
+    For work spread over generator yields, where a context-managed span would
+    leak into the consumer's context.
+    """
+    if not _enabled:
+        return _NOOP
+    return Span(name, attrs, _current.get())
+
+
+@contextlib.contextmanager
+def activate(active_span):
+    """Make a span started with ``start_span`` current for the enclosed (non-yielding) block."""
+    if not active_span:
+        yield active_span
+        return
+    token = _current.set(active_span)
+    try:
+        yield active_span
+    finally:
+        _current.reset(token)
+
+
+def iterate_in(active_span, iterator):
+    """
+    Yield from ``iterator`` with ``active_span`` current only while each item is produced.
+
+    Lets a streaming generator parent the spans of the generator it drains
+    without leaking its span into the consumer between items.
+    """
+    if not active_span:
+        yield from iterator
+        return
+    iterator = iter(iterator)
+    while True:
+        with activate(active_span):
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+        yield item
+
+
+def current_span():
+    """Return the innermost active span, or the no-op span when there is none."""
+    return (_current.get() if _enabled else None) or _NOOP
+
+
+def traced(name=None):
+    """Decorator recording every call of the function as a span."""
+    def decorator(func):
+        span_name = name or f"{func.__module__}.{func.__qualname__}"
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return func(*args, **kwargs)
+            with Span(span_name, {}, _current.get()):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def bind(func):
+    """
+    Carry the current span into another thread, e.g. ``pool.submit(tracing.bind(fn), ...)``.
+
+    Bind once per submission: the captured context can only run in one thread at a time.
+    """
+    if not _enabled:
+        return func
+    context = contextvars.copy_context()
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        return context.run(func, *args, **kwargs)
+    return wrapper
+
+
+def payload_size(value):
+    """Rows, items or characters in a fetched payload (None when it has no length)."""
+    try:
+        return len(value)
+    except TypeError:
+        return None
+
+
+def _record(finished):
+    record = finished.to_dict()
+    with _lock:
+        stats = _stats.get(finished.name)
+        if stats is None:
+            stats = _stats[finished.name] = {"count": 0, "errors": 0, "seconds": 0.0,
+                                             "buckets": [0] * len(LATENCY_BUCKETS)}
+        stats["count"] += 1
+        stats["errors"] += finished.error is not None
+        stats["seconds"] += finished.duration
+        for index, bound in enumerate(LATENCY_BUCKETS):
+            if finished.duration <= bound:
+                stats["buckets"][index] += 1
+                break
+        _recent.append(record)
+        exporters = list(_exporters)
+    for exporter in exporters:
+        try:
+            exporter(record)
+        except Exception as e:
+            print(f"Warning: Trace export failed: {e}")
+
+
+def span_stats():
+    """Return per span name: count, errors, total seconds and non-cumulative bucket counts."""
+    with _lock:
+        return {name: {**stats, "buckets": list(stats["buckets"])} for name, stats in _stats.items()}
+
+
+def recent_spans(trace_id=None):
+    """Return recently finished spans as dicts, optionally only those of one trace (hex id)."""
+    with _lock:
+        spans = list(_recent)
+    return [s for s in spans if trace_id is None or s["trace_id"] == trace_id]
+
+
+def reset():
+    """Forget collected stats and recent spans."""
+    with _lock:
+        _stats.clear()
+        _recent.clear()
+
+
+def render_prometheus(prefix="financegpt"):
+    """Return span latency histograms and error counters in the Prometheus text format."""
+    stats = span_stats()
+    name = f"{prefix}_span_seconds"
+    lines = [f"# HELP {name} Duration of traced spans.", f"# TYPE {name} histogram"]
+    for span_name, entry in sorted(stats.items()):
+        cumulative = 0
+        for bound, count in zip(LATENCY_BUCKETS, entry["buckets"]):
+            cumulative += count
+            lines.append(f'{name}_bucket{{span="{span_name}",le="{bound}"}} {cumulative}')
+        lines.append(f'{name}_bucket{{span="{span_name}",le="+Inf"}} {entry["count"]}')
+        lines.append(f'{name}_sum{{span="{span_name}"}} {round(entry["seconds"], 6)}')
+        lines.append(f'{name}_count{{span="{span_name}"}} {entry["count"]}')
+    errors = f"{prefix}_span_errors_total"
+    lines += [f"# HELP {errors} Traced spans that raised.", f"# TYPE {errors} counter"]
+    lines += [f'{errors}{{span="{span_name}"}} {entry["errors"]}' for span_name, entry in sorted(stats.items())]
+    return "\n".join(lines) + "\n"
+
+
+if get_settings().tracing.enabled:
+    enable(get_settings().tracing.file)
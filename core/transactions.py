@@ -0,0 +1,205 @@
+"""Typed financial transactions extracted from emails, and their aggregation."""
+import hashlib
+from dataclasses import asdict, astuple, dataclass, fields
+from datetime import date
+from typing import Optional
+
+import pandas as pd
+
+BSE_TRADE = "BSE Trade"
+INVESTMENT = "Investment"
+SPEND = "Spend"
+CATEGORIES = (BSE_TRADE, INVESTMENT, SPEND)
+
+SECTION_TITLES = {
+    BSE_TRADE: "BSE Trades",
+    INVESTMENT: "Investments",
+    SPEND: "Spends",
+}
+
+
+@dataclass(slots=True)
+class Transaction:
+    """
+    One BSE trade, investment or spend.
+
+    ``source_id`` identifies the email the record was extracted from (see
+    ``snippet_id``), so the same message parsed twice can be recognised.
+    """
+
+    date: date
+    category: str
+    amount: float
+    merchant: str
+    spend_category: Optional[str] = None
+    reference: Optional[str] = None
+    quantity: Optional[int] = None
+    security_code: Optional[str] = None
+    side: Optional[str] = None
+    source: str = "rule"
+    source_id: Optional[str] = None
+
+
+FIELDS = tuple(f.name for f in fields(Transaction))
+
+
+def to_record(transaction):
+    """Return a JSON-serialisable dict of a transaction (ISO date)."""
+    record = asdict(transaction)
+    record["date"] = transaction.date.isoformat()
+    return record
+
+
+def from_record(record):
+    """Inverse of ``to_record``."""
+    return Transaction(**{**record, "date": date.fromisoformat(record["date"])})
+
+
+def snippet_id(snippet):
+    """Return a short stable id of an email snippet, used as ``Transaction.source_id``."""
+    return hashlib.sha1(snippet.encode("utf-8")).hexdigest()[:16]
+
+
+def dedupe(transactions):
+    """
+    Drop repeated transactions, keeping the first occurrence.
+
+    A record is a repeat when an earlier one came from the same email with the
+    same details (the message was parsed twice), or carries the same reference
+    for the same date, category and amount. Records matching on content alone
+    are kept: two ₹99 rides on one day are two spends.
+    """
+    seen = set()
+    unique = []
+    for t in transactions:
+        amount = round(t.amount, 2)
+        keys = []
+        if t.source_id is not None:
+            keys.append(("source", t.source_id, t.date, t.category, amount, t.merchant.lower()))
+        if t.reference is not None:
+            keys.append(("reference", t.reference, t.date, t.category, amount))
+        if any(key in seen for key in keys):
+            continue
+        seen.update(keys)
+        unique.append(t)
+    return unique
+
+
+class TransactionTable:
+    """
+    Columnar view of transactions for vectorised aggregation.
+
+    Built once from a list of ``Transaction`` records (duplicates removed);
+    totals per category, merchant, day or month are computed with grouped
+    sums over the columns instead of re-parsing text.
+    """
+
+    GROUPS = ("category", "merchant", "spend_category", "day", "month")
+
+    def __init__(self, transactions):
+        self.transactions = dedupe(transactions)
+        frame = pd.DataFrame.from_records(
+            [astuple(t) for t in self.transactions], columns=list(FIELDS)
+        )
+        frame["amount"] = frame["amount"].astype(float)
+        frame["day"] = pd.to_datetime(frame["date"])
+        frame["month"] = frame["day"].dt.to_period("M").astype(str)
+        self.frame = frame
+
+    def __len__(self):
+        return len(self.transactions)
+
+    def filter(self, category=None, start=None, end=None, merchant=None, spend_category=None):
+        """
+        Return a new table restricted to the given category (or categories),
+        date range (inclusive), merchant and spend category.
+        """
+        frame = self.frame
+        mask = pd.Series(True, index=frame.index)
+        if category:
+            mask &= frame["category"].isin([category] if isinstance(category, str) else list(category))
+        if spend_category:
+            mask &= frame["spend_category"].str.lower() == spend_category.lower()
+        if merchant:
+            mask &= frame["merchant"].str.lower() == merchant.lower()
+        if start:
+            mask &= frame["day"] >= pd.Timestamp(start)
+        if end:
+            mask &= frame["day"] <= pd.Timestamp(end)
+        return TransactionTable([t for t, keep in zip(self.transactions, mask.to_numpy()) if keep])
+
+    def total(self, category=None):
+        amounts = self.frame["amount"]
+        if category:
+            amounts = amounts[self.frame["category"] == category]
+        return float(amounts.sum())
+
+    def totals_by(self, group, category=None):
+        """
+        Sum amounts per group.
+
+        Args:
+            group (str): One of "category", "merchant", "spend_category", "day" or "month".
+            category (str, optional): Only include this transaction category.
+
+        Returns:
+            dict: Group value -> total amount, largest first.
+        """
+        if group not in self.GROUPS:
+            raise ValueError(f"Unknown group: {group}")
+        frame = self.frame if category is None else self.frame[self.frame["category"] == category]
+        totals = frame.groupby(group, dropna=True)["amount"].sum().sort_values(ascending=False)
+        if group == "day":
+            totals.index = totals.index.date
+        return {key: float(value) for key, value in totals.items()}
+
+
+def format_amount(amount):
+    return f"₹{amount:,.2f}"
+
+
+def describe(transaction):
+    """Return the human readable description used in summaries."""
+    if transaction.category == BSE_TRADE:
+        text = transaction.merchant
+        if transaction.security_code:
+            text += f" (BSE: {transaction.security_code})"
+        if transaction.quantity:
+            action = {"buy": "bought", "sell": "sold"}.get(transaction.side, "traded")
+            text += f", {transaction.quantity} shares {action}"
+        return text
+    if transaction.spend_category:
+        return f"{transaction.merchant} ({transaction.spend_category})"
+    return transaction.merchant
+
+
+def render_summary_text(transactions):
+    """
+    Render transactions in the sectioned text layout the Gemini summary uses.
+
+    Returns:
+        str: "BSE Trades" / "Investments" / "Spends" sections with one
+        "- <date>: <description> - <amount>" line per transaction, followed
+        by the "Total Spends" line.
+    """
+    table = transactions if isinstance(transactions, TransactionTable) else TransactionTable(transactions)
+    lines = []
+    for category, title, items in grouped_for_display(table.transactions):
+        lines.append(title)
+        if not items:
+            lines.append(f"No {title} found.")
+        for t in items:
+            lines.append(f"- {t.date:%B %d, %Y}: {describe(t)} - {format_amount(t.amount)}")
+    lines.append(f"Total Spends: {format_amount(table.total(SPEND))}")
+    return "\n".join(lines)
+
+
+def grouped_for_display(transactions):
+    """Return (category, section title, transactions sorted by date) for every category."""
+    by_category = {category: [] for category in CATEGORIES}
+    for t in transactions:
+        by_category.setdefault(t.category, []).append(t)
+    return [
+        (category, SECTION_TITLES.get(category, category), sorted(items, key=lambda t: t.date))
+        for category, items in by_category.items()
+    ]
@@ -1,34 +1,50 @@
-import yaml
 import re
 
-# Function to load API keys from config/config.yaml
+from config.settings import load_yaml
+
+
 def load_config():
-    with open('config/config.yaml', 'r') as file:
-        return yaml.safe_load(file)
-    
+    """
+    Return the parsed config/config.yaml as a dict (empty when it does not exist).
+
+    The file is read once per process; typed, layered values (including the
+    API keys) are available through ``config.settings.get_settings()``.
+    """
+    return load_yaml()
+
 
 # Helper functions to parse the recommendation
 def get_recommendation(result):
     return result.replace("## Recommendation:", "");
 
 
+# "Recommendation" followed by Buy/Sell/Hold within a few markdown characters,
+# e.g. "## Recommendation: Hold", "**Recommendation:** Buy", "Recommendation\nSell"
+_RECOMMENDATION_TAG = re.compile(r'recommendation\W{0,12}(buy|sell|hold)\b', re.IGNORECASE)
+
+
+def detect_recommendation_tag(text):
+    """
+    Return 'BUY', 'SELL' or 'HOLD' as soon as the tag appears in (possibly partial) model output.
+
+    Meant for streamed responses: call it on the text received so far and it
+    returns None until the recommendation heading has arrived.
+    """
+    match = _RECOMMENDATION_TAG.search(text)
+    return match.group(1).upper() if match else None
+
+
 def extract_recommendation(text):
 
     recommendation = get_recommendation(text)
     """
-    Extracts the recommendation (BUY, SELL, HOLD) from a formatted string using switch-case logic.
-    Looks for '## Recommendation: Hold', '## Recommendation: Buy', or '## Recommendation: Sell' (case-insensitive).
+    Extracts the recommendation (BUY, SELL, HOLD) from a formatted string.
+    Looks for '## Recommendation: Hold', '## Recommendation: Buy', or '## Recommendation: Sell' (case-insensitive),
+    and also works on the first streamed chunk(s) of a response.
     Returns:
     - str: extracted recommendation ('BUY', 'SELL', 'HOLD') or 'NA' if not found
     """
-    if "## Recommendation: Hold" in text:
-        return "HOLD", recommendation
-    elif "## Recommendation: Buy" in text:
-        return "BUY", recommendation
-    elif "## Recommendation: Sell" in text:
-        return "SELL" , recommendation
-    else:
-        return "NA",recommendation
+    return detect_recommendation_tag(text) or "NA", recommendation
 
 if __name__ == "__main__":
     tag = extract_recommendation("## Recommendation: Hold **Explanation:** Market is")
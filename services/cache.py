@@ -0,0 +1,270 @@
+"""Caching primitives shared by the data layer."""
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from config.settings import get_settings
+
+_MISSING = object()
+
+
+class TTLCache:
+    """
+    Thread-safe LRU cache whose entries expire after a per-entry time-to-live.
+
+    Entries are evicted least-recently-used first once ``maxsize`` is reached,
+    and lazily dropped when read after their expiry time.
+    """
+
+    def __init__(self, maxsize=256, default_ttl=300):
+        self.maxsize = maxsize
+        self.default_ttl = default_ttl
+        self._data = OrderedDict()
+        self._lock = threading.RLock()
+        self._loading = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is _MISSING:
+                self.misses += 1
+                return default
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._data[key]
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value, ttl=None):
+        ttl = self.default_ttl if ttl is None else ttl
+        with self._lock:
+            self._data[key] = (time.monotonic() + ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def get_or_set(self, key, loader, ttl=None):
+        """
+        Return the cached value for ``key``, calling ``loader()`` on a miss.
+
+        Concurrent callers missing on the same key wait for a single load
+        instead of each hitting the upstream. ``None`` results are not cached
+        so that transient upstream failures are retried on the next call.
+        """
+        value = self.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+        with self._lock:
+            key_lock = self._loading.setdefault(key, threading.Lock())
+        with key_lock:
+            # Another thread may have filled the entry while we waited
+            with self._lock:
+                entry = self._data.get(key)
+                if entry is not None and entry[0] > time.monotonic():
+                    return entry[1]
+            try:
+                value = loader()
+                if value is not None:
+                    self.set(key, value, ttl)
+            finally:
+                with self._lock:
+                    self._loading.pop(key, None)
+        return value
+
+    def peek(self, key):
+        """
+        Return ``(expires_at, value)`` of a live entry, or None.
+
+        Unlike ``get`` this neither counts a hit/miss nor refreshes the LRU
+        order, so scanning the cache does not disturb it. ``expires_at`` is a
+        new ``time.monotonic()`` deadline on every ``set`` and doubles as a
+        version stamp of the value.
+        """
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or entry[0] <= time.monotonic():
+                return None
+            return entry
+
+    @contextmanager
+    def reserved(self, entries):
+        """
+        Raise ``maxsize`` by ``entries`` for the duration of a ``with`` block.
+
+        Concurrent reservations add up; on exit the size drops back and any
+        excess entries are evicted least-recently-used first.
+        """
+        with self._lock:
+            self.maxsize += entries
+        try:
+            yield self
+        finally:
+            with self._lock:
+                self.maxsize -= entries
+                while len(self._data) > self.maxsize:
+                    self._data.popitem(last=False)
+                    self.evictions += 1
+
+    def invalidate(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def invalidate_where(self, predicate):
+        """Drop every entry whose key satisfies ``predicate``; returns the number dropped."""
+        with self._lock:
+            keys = [key for key in self._data if predicate(key)]
+            for key in keys:
+                del self._data[key]
+            return len(keys)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.hits = self.misses = self.evictions = 0
+
+    def __len__(self):
+        with self._lock:
+            return len(self._data)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+
+def cache_dir():
+    """Directory for on-disk caches (``cache.dir`` setting or ``FINANCEGPT_CACHE_DIR``, default ``<project>/.cache``)."""
+    path = get_settings().cache.path
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+class DiskCache:
+    """
+    Persistent key/value cache backed by a SQLite file.
+
+    Values are stored as JSON. Entries older than ``max_age`` seconds are
+    expired, and once more than ``max_entries`` are stored the least recently
+    used ones are evicted. Hit/miss counters cover the lifetime of the object.
+    """
+
+    # Eviction runs at most once per this many writes
+    PRUNE_EVERY = 256
+
+    def __init__(self, path, max_age=None, max_entries=None):
+        self.path = path
+        self.max_age = max_age
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, created REAL NOT NULL, accessed REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed)")
+        self._writes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get_many(self, keys):
+        """Return a dict with the cached values for the keys that are present and fresh."""
+        keys = list(dict.fromkeys(keys))
+        found = {}
+        now = time.time()
+        min_created = now - self.max_age if self.max_age else float("-inf")
+        with self._lock:
+            # Stay well below SQLite's bound-parameter limit
+            for i in range(0, len(keys), 500):
+                chunk = keys[i:i + 500]
+                placeholders = ",".join("?" * len(chunk))
+                rows = self._conn.execute(
+                    f"SELECT key, value FROM entries WHERE key IN ({placeholders}) AND created >= ?",
+                    (*chunk, min_created),
+                ).fetchall()
+                found.update((key, json.loads(value)) for key, value in rows)
+            if found:
+                self._conn.executemany(
+                    "UPDATE entries SET accessed = ? WHERE key = ?", [(now, key) for key in found]
+                )
+            self.hits += len(found)
+            self.misses += len(keys) - len(found)
+        return found
+
+    def get(self, key, default=None):
+        return self.get_many([key]).get(key, default)
+
+    def set_many(self, items):
+        """Store ``{key: value}`` pairs, replacing existing entries."""
+        now = time.time()
+        rows = [(key, json.dumps(value), now, now) for key, value in dict(items).items()]
+        if not rows:
+            return
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO entries (key, value, created, accessed) VALUES (?, ?, ?, ?)", rows
+            )
+            self._writes += len(rows)
+            if self._writes >= self.PRUNE_EVERY:
+                self._prune()
+
+    def set(self, key, value):
+        self.set_many({key: value})
+
+    def prune(self):
+        """Apply the age and size limits now."""
+        with self._lock:
+            self._prune()
+
+    def _prune(self):
+        self._writes = 0
+        if self.max_age:
+            self._conn.execute("DELETE FROM entries WHERE created < ?", (time.time() - self.max_age,))
+        if self.max_entries:
+            self._conn.execute(
+                "DELETE FROM entries WHERE key IN ("
+                "SELECT key FROM entries ORDER BY accessed DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM entries")
+            self.hits = self.misses = 0
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -1,47 +1,273 @@
-import yfinance as yf 
-from alpha_vantage.fundamentaldata import FundamentalData 
+import pandas as pd
 import requests
-import os
-from dotenv import load_dotenv
+from config.settings import get_settings
+from core import tracing
+from core.lazy_imports import lazy_callable, lazy_import
+from services.cache import TTLCache
+from services.history_store import get_history_store, period_start
+from services.http_client import get_client
+
+# Heavy clients, imported on first use (see core.lazy_imports)
+yf = lazy_import("yfinance")
+FundamentalData = lazy_callable("alpha_vantage.fundamentaldata", "FundamentalData")
+
+# Seconds each kind of upstream data stays fresh in the shared cache (info is
+# the intraday quote, history the daily windows)
+CACHE_TTLS = dict(get_settings().cache.ttls)
+
+# Single cache shared by every caller (Streamlit pages, agents, batch jobs)
+_cache = TTLCache(maxsize=get_settings().cache.memory_maxsize)
+
+
+def _cache_key(kind, ticker, variant=None):
+    key = (kind, ticker.strip().upper())
+    return key if variant is None else key + (variant,)
+
+
+def _cached(kind, ticker, loader, variant=None):
+    with tracing.span(f"fetch.{kind}", ticker=ticker) as span:
+        if not span:
+            return _cache.get_or_set(_cache_key(kind, ticker, variant), loader, ttl=CACHE_TTLS[kind])
+
+        def traced_loader():
+            span.set(cache="miss")
+            return loader()
+        value = _cache.get_or_set(_cache_key(kind, ticker, variant), traced_loader, ttl=CACHE_TTLS[kind])
+        span.set(cache=span.attrs.get("cache", "hit"), size=tracing.payload_size(value))
+        return value
+
+
+def peek_cached(kind, ticker):
+    """
+    Return ``(version, value)`` of a fresh cache entry without going upstream.
+
+    ``version`` changes whenever the entry is rewritten, so callers can skip
+    values they have already consumed. Returns None when nothing is cached.
+    """
+    return _cache.peek(_cache_key(kind, ticker))
+
+
+def cache_stats():
+    """Return hit/miss counters of the shared ticker data cache."""
+    return _cache.stats()
+
+
+def reserve_cache(entries):
+    """
+    Make room for ``entries`` more items in the shared cache within a ``with`` block.
+
+    Batch jobs seed histories for hundreds of tickers up front; without this
+    the LRU would evict the first seeded windows before the workers read them.
+    The cache shrinks back when the block exits, so a long-running process
+    does not keep growing it.
+    """
+    return _cache.reserved(entries)
+
+
+def clear_cache():
+    """Drop every cached ticker entry and reset the counters."""
+    _cache.clear()
+
+
+def invalidate_ticker(ticker, kinds=None):
+    """
+    Drop the cached entries of one ticker so the next fetch goes upstream.
+
+    Dropping "history" also expires the stored tail in the history store, so
+    the latest bars are downloaded again instead of served from disk.
+
+    Args:
+        ticker (str): Ticker symbol (case-insensitive).
+        kinds (iterable, optional): Only these kinds, e.g. ("info", "history");
+            all kinds by default.
+
+    Returns:
+        int: Number of entries dropped.
+    """
+    symbol = ticker.strip().upper()
+    kinds = set(kinds) if kinds else set(CACHE_TTLS)
+    store = get_history_store()
+    if store is not None and "history" in kinds:
+        store.expire_tail(symbol)
+    return _cache.invalidate_where(lambda key: key[1] == symbol and key[0] in kinds)
+
+
+def _fetch_stock_info(ticker):
+    return yf.Ticker(ticker).info
+
+
+def fetch_stock_info(ticker):
+    return _cached("info", ticker, lambda: _fetch_stock_info(ticker))
+
+
+def _load_history(ticker, period):
+    store = get_history_store()
+    if store is None:
+        return yf.Ticker(ticker).history(period=period)
+    return store.get_history(ticker, period=period)
+
+
+def fetch_stock_history(ticker, period="1mo"):
+    """
+    Return daily history for a ticker, served from the local history store.
+
+    Only bars newer than the last stored one are downloaded, so any window
+    already fetched once (1mo, 6mo, 5y, ...) costs at most a small tail request.
+    """
+    history_key = None if period == "1mo" else period
+    return _cached("history", ticker, lambda: _load_history(ticker, period), variant=history_key)
+
+
+def stored_history(ticker):
+    """Return every daily bar the local history store holds for a ticker, or None."""
+    store = get_history_store()
+    if store is None:
+        return None
+    return store.load(ticker)[0]
+
+
+def fetch_bulk_history(tickers, period="1mo"):
+    """
+    Fetch daily history for many tickers with as few ``yf.download`` calls as possible.
+
+    Tickers already in the shared cache are served from it. Of the rest, those
+    with no local history for the window are downloaded in one bulk call for
+    the full period, and those already in the history store in one bulk call
+    for just the bars since their oldest last-stored bar. Results are merged
+    into the store and seeded into the cache, so later
+    ``fetch_stock_history``/``fetch_stock_data`` calls hit it.
+
+    Args:
+        tickers (list[str]): Ticker symbols.
+        period (str): yfinance period string, e.g. "1mo" or "1y".
+
+    Returns:
+        dict: Ticker -> history DataFrame (empty when no data was returned).
+    """
+    variant = None if period == "1mo" else period
+    store = get_history_store()
+    histories, cold, warm = {}, [], {}
+    for ticker in dict.fromkeys(tickers):
+        cached = _cache.get(_cache_key("history", ticker, variant))
+        if cached is not None:
+            histories[ticker] = cached
+            continue
+        stored, meta = store.load(ticker) if store is not None else (None, {})
+        covered = False
+        if stored is not None and meta.get("covered_from"):
+            start = period_start(period, pd.Timestamp.now(tz=stored.index.tz))
+            covered = pd.Timestamp(meta["covered_from"]) <= start
+        if covered:
+            warm[ticker] = stored.index[-1]
+        else:
+            cold.append(ticker)
+
+    downloads = []
+    if cold:
+        downloads.append((cold, {"period": period}, True))
+    if warm:
+        tail_start = min(warm.values()).strftime("%Y-%m-%d")
+        downloads.append((list(warm), {"start": tail_start}, False))
+
+    for group, window, is_cold in downloads:
+        data = yf.download(group, group_by="ticker", actions=True, auto_adjust=True,
+                           threads=True, progress=False, **window)
+        for ticker in group:
+            try:
+                frame = data[ticker] if data.columns.nlevels > 1 else data
+            except KeyError:
+                print(f"Warning: No bulk history returned for {ticker}.")
+                frame = data.iloc[0:0]
+            frame = frame.dropna(how="all")
+            if store is not None and isinstance(frame.index, pd.DatetimeIndex) and not frame.empty:
+                covered_from = period_start(period, pd.Timestamp.now(tz=frame.index.tz)) if is_cold else None
+                merged = store.merge(ticker, frame, covered_from=covered_from)
+                start = period_start(period, pd.Timestamp.now(tz=merged.index.tz))
+                frame = merged[merged.index >= start]
+            histories[ticker] = frame
+            if not frame.empty:
+                _cache.set(_cache_key("history", ticker, variant), frame, ttl=CACHE_TTLS["history"])
+    return histories
 
-# Load environment variables from .env file
-load_dotenv()
-NEWS_API_KEY = os.getenv("NEWS_API_KEY")
 
 # Fetch stock data from Yahoo Finance
 def fetch_stock_data(ticker):
-    # Fetch historical data for 1 month
-    stock = yf.Ticker(ticker)
-    stock_history = stock.history(period="1mo")  
-    stock_info = stock.info
+    stock_history = fetch_stock_history(ticker)
+    stock_info = fetch_stock_info(ticker)
 
     # Check if necessary data is available
     if 'currentPrice' not in stock_info:
         print(f"Warning: Missing 'currentPrice' for {ticker}.")
-    
+
     return stock_history, stock_info
 
-def fetch_stock_news(ticker):
-    # Replace with your actual NewsAPI key
-    url = f"https://newsapi.org/v2/everything?q={ticker}&apiKey={NEWS_API_KEY}"
-    response = requests.get(url)
-    news_data = response.json()
-   
+
+NEWS_API_URL = get_settings().provider("newsapi").base_url
+
+
+def _fetch_stock_news(ticker):
+    params = {"q": ticker, "apiKey": get_settings().provider("newsapi").api_key}
+    try:
+        response = get_client("newsapi").get(NEWS_API_URL, params=params)
+        news_data = response.json()
+    except (requests.RequestException, ValueError) as e:
+        print(f"Error fetching stock news for {ticker}: {e}")
+        return None
+
     # Check if the 'articles' key exists
     if 'articles' in news_data:
         return news_data['articles']
     else:
-        print(f"No stock news articles avaliable for : {url}")
-        return []  
+        print(f"No stock news articles avaliable for : {ticker}")
+        return None
 
 
-# Fetch financial data from Alpha Vantage
-def fetch_financial_data(ticker):
-    api_key = 'API_KEY'
-    fd = FundamentalData(api_key)
+def fetch_stock_news(ticker):
+    news = _cached("news", ticker, lambda: _fetch_stock_news(ticker))
+    return news if news is not None else []
+
+
+def _fetch_financial_data(ticker):
+    fd = FundamentalData(get_settings().provider("alphavantage").api_key)
     try:
         company_overview, _ = fd.get_company_overview(ticker)
         return company_overview
     except Exception as e:
         print(f"Error fetching financial data: {e}")
         return None
+
+
+# Fetch financial data from Alpha Vantage
+def fetch_financial_data(ticker):
+    return _cached("fundamentals", ticker, lambda: _fetch_financial_data(ticker))
+
+
+# Upstream loader per cache kind, used to refresh entries ahead of expiry
+_LOADERS = {
+    "info": _fetch_stock_info,
+    "history": lambda ticker: _load_history(ticker, "1mo"),
+    "fundamentals": _fetch_financial_data,
+    "news": _fetch_stock_news,
+}
+
+
+def refresh(kind, ticker, ttl=None):
+    """
+    Re-fetch one kind of data for a ticker and overwrite its cache entry.
+
+    Unlike the ``fetch_*`` functions this always goes upstream, so a
+    background refresher can keep entries warm before they expire. A failed
+    load (``None``) leaves the existing entry untouched.
+
+    Args:
+        kind (str): "info", "history" (the default 1mo window), "fundamentals" or "news".
+        ticker (str): Ticker symbol.
+        ttl (float, optional): Seconds the new entry stays fresh; defaults to ``CACHE_TTLS[kind]``.
+
+    Returns:
+        The fetched value, or None.
+    """
+    value = _LOADERS[kind](ticker)
+    if value is not None:
+        _cache.set(_cache_key(kind, ticker), value, ttl=CACHE_TTLS[kind] if ttl is None else ttl)
+    return value
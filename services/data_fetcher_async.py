@@ -0,0 +1,238 @@
+"""
+Asyncio version of the ticker data fetchers.
+
+``AsyncDataFetcher`` returns the same shapes as ``services.data_fetcher`` but
+lets one event loop fetch hundreds of tickers: NewsAPI and the Alpha Vantage
+company overview are called with aiohttp, yfinance (which has no async API)
+runs in worker threads, and every upstream is bounded by its own semaphore.
+Results go through the same shared cache as the synchronous fetchers.
+"""
+import asyncio
+import random
+
+import aiohttp
+
+from config.settings import get_settings
+from services import data_fetcher
+from services.http_client import PROVIDER_SETTINGS, RETRY_STATUSES
+
+ALPHAVANTAGE_URL = get_settings().provider("alphavantage").base_url
+
+# Requests in flight at once per upstream
+CONCURRENCY_LIMITS = {name: get_settings().provider(name).concurrency
+                      for name in ("yfinance", "newsapi", "alphavantage")}
+# Tickers processed at once by ``fetch_many``
+DEFAULT_TICKER_CONCURRENCY = get_settings().batch.ticker_concurrency
+
+
+class AsyncDataFetcher:
+    """
+    Async fetcher sharing one aiohttp session; use as ``async with AsyncDataFetcher() as fetcher``.
+
+    Args:
+        limits (dict, optional): Per-upstream concurrency overrides of ``CONCURRENCY_LIMITS``.
+        news_url (str): NewsAPI endpoint (overridable for tests).
+        alphavantage_url (str): Alpha Vantage endpoint (overridable for tests).
+    """
+
+    def __init__(self, limits=None, news_url=None, alphavantage_url=ALPHAVANTAGE_URL):
+        limits = {**CONCURRENCY_LIMITS, **(limits or {})}
+        self._semaphores = {name: asyncio.Semaphore(limit) for name, limit in limits.items()}
+        self.news_url = news_url or data_fetcher.NEWS_API_URL
+        self.alphavantage_url = alphavantage_url
+        self._session = None
+        self._inflight = {}
+
+    async def __aenter__(self):
+        settings = PROVIDER_SETTINGS["default"]
+        timeout = aiohttp.ClientTimeout(sock_connect=settings["connect_timeout"], sock_read=settings["read_timeout"])
+        connector = aiohttp.TCPConnector(limit=settings["pool_size"])
+        self._session = aiohttp.ClientSession(timeout=timeout, connector=connector)
+        return self
+
+    async def __aexit__(self, *_exc):
+        await self.close()
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def _get_json(self, provider, url, params):
+        """GET a JSON document, retrying transient failures like ``HttpClient`` does."""
+        settings = {**PROVIDER_SETTINGS["default"], **PROVIDER_SETTINGS.get(provider, {})}
+        for attempt in range(settings["max_retries"] + 1):
+            last_attempt = attempt == settings["max_retries"]
+            try:
+                async with self._semaphores[provider]:
+                    async with self._session.get(url, params=params) as response:
+                        if response.status in RETRY_STATUSES and not last_attempt:
+                            retry_after = response.headers.get("Retry-After", "")
+                            delay = float(retry_after) if retry_after.isdigit() else None
+                        else:
+                            response.raise_for_status()
+                            return await response.json(content_type=None)
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError):
+                if last_attempt:
+                    raise
+                delay = None
+            if delay is None:
+                delay = random.uniform(0, min(settings["max_backoff"], settings["backoff"] * 2 ** attempt))
+            await asyncio.sleep(min(delay, settings["max_backoff"]))
+
+    async def _cached(self, kind, ticker, loader, variant=None):
+        """Serve from the shared cache, sharing one in-flight load per key within the loop."""
+        key = data_fetcher._cache_key(kind, ticker, variant)
+        value = data_fetcher._cache.get(key)
+        if value is not None:
+            return value
+        task = self._inflight.get(key)
+        if task is None:
+            task = self._inflight[key] = asyncio.ensure_future(loader())
+            task.add_done_callback(lambda _t: self._inflight.pop(key, None))
+        # Shield so one cancelled caller does not cancel the load for the others
+        value = await asyncio.shield(task)
+        if value is not None:
+            data_fetcher._cache.set(key, value, ttl=data_fetcher.CACHE_TTLS[kind])
+        return value
+
+    async def _in_thread(self, func, *args):
+        async with self._semaphores["yfinance"]:
+            return await asyncio.to_thread(func, *args)
+
+    async def fetch_stock_history(self, ticker, period="1mo"):
+        variant = None if period == "1mo" else period
+        return await self._cached("history", ticker,
+                                  lambda: self._in_thread(data_fetcher._load_history, ticker, period), variant)
+
+    async def fetch_stock_info(self, ticker):
+        return await self._cached("info", ticker,
+                                  lambda: self._in_thread(lambda: data_fetcher.yf.Ticker(ticker).info))
+
+    async def fetch_stock_data(self, ticker):
+        """Return ``(history, info)`` like ``data_fetcher.fetch_stock_data``."""
+        stock_history, stock_info = await asyncio.gather(self.fetch_stock_history(ticker),
+                                                         self.fetch_stock_info(ticker))
+        if 'currentPrice' not in stock_info:
+            print(f"Warning: Missing 'currentPrice' for {ticker}.")
+        return stock_history, stock_info
+
+    async def _fetch_stock_news(self, ticker):
+        params = {"q": ticker, "apiKey": get_settings().provider("newsapi").api_key or ""}
+        try:
+            news_data = await self._get_json("newsapi", self.news_url, params)
+        except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+            print(f"Error fetching stock news for {ticker}: {e}")
+            return None
+        if 'articles' in news_data:
+            return news_data['articles']
+        print(f"No stock news articles avaliable for : {ticker}")
+        return None
+
+    async def fetch_stock_news(self, ticker):
+        """Return the NewsAPI articles for a ticker, or [] like ``data_fetcher.fetch_stock_news``."""
+        news = await self._cached("news", ticker, lambda: self._fetch_stock_news(ticker))
+        return news if news is not None else []
+
+    async def _fetch_financial_data(self, ticker):
+        api_key = get_settings().provider("alphavantage").api_key
+        params = {"function": "OVERVIEW", "symbol": ticker, "apikey": api_key or ""}
+        try:
+            overview = await self._get_json("alphavantage", self.alphavantage_url, params)
+        except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+            print(f"Error fetching financial data: {e}")
+            return None
+        # Alpha Vantage answers errors and rate limits with 200 and a message
+        if not overview or "Symbol" not in overview:
+            message = overview.get("Note") or overview.get("Information") or overview.get("Error Message")
+            print(f"Error fetching financial data: {message or 'empty response'}")
+            return None
+        return overview
+
+    async def fetch_financial_data(self, ticker):
+        """Return the Alpha Vantage company overview dict, or None like ``data_fetcher.fetch_financial_data``."""
+        return await self._cached("fundamentals", ticker, lambda: self._fetch_financial_data(ticker))
+
+    async def fetch_ticker(self, ticker):
+        """
+        Fetch everything for one ticker concurrently.
+
+        Returns:
+            dict: "stock" (``(history, info)``), "financial" and "news"; a source
+            that raised is reported as None.
+        """
+        names = ("stock", "financial", "news")
+        results = await asyncio.gather(self.fetch_stock_data(ticker), self.fetch_financial_data(ticker),
+                                       self.fetch_stock_news(ticker), return_exceptions=True)
+        fetched = {}
+        for name, result in zip(names, results):
+            if isinstance(result, asyncio.CancelledError):
+                raise result
+            if isinstance(result, Exception):
+                print(f"Error fetching {name} data for {ticker}: {result}")
+                result = None
+            fetched[name] = result
+        return fetched
+
+    async def fetch_many(self, tickers, concurrency=DEFAULT_TICKER_CONCURRENCY, timeout=None):
+        """
+        Fetch every source for many tickers from one event loop.
+
+        Args:
+            tickers (list[str]): Ticker symbols; duplicates are fetched once.
+            concurrency (int): Tickers in progress at once.
+            timeout (float, optional): Seconds for the whole batch. Tickers not
+                finished by then are cancelled and reported as None.
+
+        Returns:
+            dict: Ticker -> ``fetch_ticker`` result (None if cancelled).
+        """
+        limit = asyncio.Semaphore(concurrency)
+
+        async def one(ticker):
+            async with limit:
+                return await self.fetch_ticker(ticker)
+
+        tickers = list(dict.fromkeys(tickers))
+        tasks = {ticker: asyncio.ensure_future(one(ticker)) for ticker in tickers}
+        _, pending = await asyncio.wait(tasks.values(), timeout=timeout)
+        for task in pending:
+            task.cancel()
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+            print(f"Warning: {len(pending)} of {len(tickers)} tickers cancelled after {timeout}s.")
+        return {
+            ticker: None if task.cancelled() or task.exception() is not None else task.result()
+            for ticker, task in tasks.items()
+        }
+
+
+async def _with_fetcher(method, *args, **kwargs):
+    async with AsyncDataFetcher() as fetcher:
+        return await getattr(fetcher, method)(*args, **kwargs)
+
+
+def _run(coroutine):
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coroutine)
+    coroutine.close()
+    raise RuntimeError("Called a synchronous wrapper from a running event loop; await AsyncDataFetcher instead.")
+
+
+def fetch_many(tickers, concurrency=DEFAULT_TICKER_CONCURRENCY, timeout=None):
+    """Synchronous wrapper around ``AsyncDataFetcher.fetch_many``."""
+    return _run(_with_fetcher("fetch_many", tickers, concurrency=concurrency, timeout=timeout))
+
+
+def fetch_stock_data(ticker):
+    return _run(_with_fetcher("fetch_stock_data", ticker))
+
+
+def fetch_stock_news(ticker):
+    return _run(_with_fetcher("fetch_stock_news", ticker))
+
+
+def fetch_financial_data(ticker):
+    return _run(_with_fetcher("fetch_financial_data", ticker))
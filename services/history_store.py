@@ -0,0 +1,222 @@
+"""Local Parquet store of daily OHLCV history that is extended incrementally."""
+import json
+import os
+import threading
+import time
+
+import pandas as pd
+
+from config.settings import get_settings
+from core.lazy_imports import lazy_import
+from services.cache import cache_dir
+
+yf = lazy_import("yfinance")
+
+# yfinance period strings and how far back each reaches
+PERIOD_OFFSETS = {
+    "5d": pd.DateOffset(days=5),
+    "1mo": pd.DateOffset(months=1),
+    "3mo": pd.DateOffset(months=3),
+    "6mo": pd.DateOffset(months=6),
+    "1y": pd.DateOffset(years=1),
+    "2y": pd.DateOffset(years=2),
+    "5y": pd.DateOffset(years=5),
+    "10y": pd.DateOffset(years=10),
+}
+
+# Minimum seconds between two tail refreshes of the same ticker
+TAIL_REFRESH_SECONDS = get_settings().history.tail_refresh_seconds
+
+# Corporate actions after which yfinance re-bases every earlier adjusted bar
+ACTION_COLUMNS = ("Dividends", "Stock Splits")
+
+
+def period_start(period, now):
+    """Return the first timestamp covered by a yfinance period string ending at ``now``."""
+    if period == "max":
+        return pd.Timestamp("1900-01-01", tz=now.tz)
+    if period == "ytd":
+        return now.normalize().replace(month=1, day=1)
+    if period not in PERIOD_OFFSETS:
+        raise ValueError(f"Unsupported period: {period}")
+    return now.normalize() - PERIOD_OFFSETS[period]
+
+
+def has_new_actions(stored, frame):
+    """
+    Return True when ``frame`` holds a dividend or split that ``stored`` does not.
+
+    Bars are split- and dividend-adjusted relative to the latest action, so
+    once a new one appears the stored bars are on a different basis from
+    freshly downloaded ones and must not be mixed with them.
+    """
+    if stored.index.tz is not None and frame.index.tz is not None:
+        frame = frame.tz_convert(stored.index.tz)
+    for column in ACTION_COLUMNS:
+        if column not in frame.columns:
+            continue
+        actions = frame[column].fillna(0)
+        actions = actions[actions != 0]
+        if actions.empty:
+            continue
+        if column not in stored.columns:
+            return True
+        known = stored[column].reindex(actions.index).fillna(0)
+        if (known != actions).any():
+            return True
+    return False
+
+
+class HistoryStore:
+    """
+    Per-ticker Parquet files of daily bars.
+
+    The first request for a window downloads it once; afterwards only the bars
+    since the last stored one are fetched and appended, and any window already
+    covered (1mo, 6mo, 5y, ...) is sliced from the local data. A tail carrying
+    a new dividend or split triggers a download of the whole stored range
+    instead, so every bar stays on the same adjustment basis.
+    """
+
+    def __init__(self, root=None, tail_refresh_seconds=TAIL_REFRESH_SECONDS):
+        self.root = root or os.path.join(cache_dir(), "history")
+        os.makedirs(self.root, exist_ok=True)
+        self.tail_refresh_seconds = tail_refresh_seconds
+        self._locks = {}
+        self._locks_guard = threading.Lock()
+
+    def _lock(self, ticker):
+        with self._locks_guard:
+            return self._locks.setdefault(ticker, threading.Lock())
+
+    def _paths(self, ticker):
+        name = "".join(c if c.isalnum() or c in "-_." else "_" for c in ticker.upper())
+        return os.path.join(self.root, f"{name}.parquet"), os.path.join(self.root, f"{name}.json")
+
+    def load(self, ticker):
+        """Return the stored frame and its metadata, or (None, {}) if nothing is stored."""
+        data_path, meta_path = self._paths(ticker)
+        if not os.path.exists(data_path) or not os.path.exists(meta_path):
+            return None, {}
+        with open(meta_path, "r", encoding="utf-8") as file:
+            meta = json.load(file)
+        return pd.read_parquet(data_path), meta
+
+    def _save(self, ticker, frame, meta):
+        data_path, meta_path = self._paths(ticker)
+        # Write to temporary files first so readers never see a partial file
+        frame.to_parquet(data_path + ".tmp")
+        os.replace(data_path + ".tmp", data_path)
+        with open(meta_path + ".tmp", "w", encoding="utf-8") as file:
+            json.dump(meta, file)
+        os.replace(meta_path + ".tmp", meta_path)
+
+    @staticmethod
+    def _merge(stored, new):
+        if stored is None or stored.empty:
+            return new.sort_index()
+        if new is None or new.empty:
+            return stored
+        if stored.index.tz is not None and new.index.tz is not None:
+            new = new.tz_convert(stored.index.tz)
+        merged = pd.concat([stored, new])
+        # A re-fetched bar (e.g. today's partial bar) replaces the stored one
+        return merged[~merged.index.duplicated(keep="last")].sort_index()
+
+    def merge(self, ticker, frame, covered_from=None):
+        """
+        Add downloaded bars to the store.
+
+        Args:
+            ticker (str): Ticker symbol.
+            frame (pd.DataFrame): Bars with a DatetimeIndex.
+            covered_from (pd.Timestamp, optional): Start of the window the frame
+                fully covers; lets later requests for that window skip a download.
+
+        Returns:
+            pd.DataFrame: The full stored history after the merge.
+        """
+        with self._lock(ticker):
+            return self._merge_locked(ticker, frame, covered_from)
+
+    def _merge_locked(self, ticker, frame, covered_from=None):
+        stored, meta = self.load(ticker)
+        if frame is None or frame.empty or not isinstance(frame.index, pd.DatetimeIndex):
+            return stored
+        if (stored is not None and not stored.empty and frame.index[0] > stored.index[0]
+                and has_new_actions(stored, frame)):
+            # The stored bars were adjusted before this action; replace them all
+            start = pd.Timestamp(meta.get("covered_from") or stored.index[0]).strftime("%Y-%m-%d")
+            refetched = yf.Ticker(ticker).history(start=start)
+            if isinstance(refetched.index, pd.DatetimeIndex) and not refetched.empty:
+                stored, frame = None, refetched
+        merged = self._merge(stored, frame)
+        if covered_from is not None:
+            covered_from = pd.Timestamp(covered_from)
+            previous = meta.get("covered_from")
+            if previous is None or pd.Timestamp(previous) > covered_from:
+                meta["covered_from"] = covered_from.isoformat()
+        meta.setdefault("covered_from", merged.index[0].isoformat())
+        meta["updated"] = time.time()
+        self._save(ticker, merged, meta)
+        return merged
+
+    def get_history(self, ticker, period="1mo"):
+        """
+        Return daily history for ``period``, downloading only what is missing locally.
+
+        Frames without a DatetimeIndex cannot be stored incrementally and are
+        returned as downloaded.
+        """
+        with self._lock(ticker):
+            stored, meta = self.load(ticker)
+            tz = stored.index.tz if stored is not None else None
+            start = period_start(period, pd.Timestamp.now(tz=tz))
+
+            covered_from = meta.get("covered_from")
+            if stored is None or covered_from is None or pd.Timestamp(covered_from) > start:
+                # Cold fetch of the whole window, once
+                downloaded = yf.Ticker(ticker).history(period=period)
+                if not isinstance(downloaded.index, pd.DatetimeIndex) or downloaded.empty:
+                    return downloaded
+                start = period_start(period, pd.Timestamp.now(tz=downloaded.index.tz))
+                stored = self._merge_locked(ticker, downloaded, covered_from=start)
+            elif time.time() - meta.get("updated", 0) >= self.tail_refresh_seconds:
+                # Re-fetch from the last stored bar, which may have been partial
+                last_bar = stored.index[-1].strftime("%Y-%m-%d")
+                tail = yf.Ticker(ticker).history(start=last_bar)
+                stored = self._merge_locked(ticker, tail)
+
+            if stored.index.tz is not None and start.tz is None:
+                start = start.tz_localize(stored.index.tz)
+            return stored[stored.index >= start]
+
+    def expire_tail(self, ticker):
+        """Make the next ``get_history`` of a ticker re-fetch its tail, regardless of ``tail_refresh_seconds``."""
+        with self._lock(ticker):
+            stored, meta = self.load(ticker)
+            if stored is None:
+                return
+            meta["updated"] = 0
+            self._save(ticker, stored, meta)
+
+    def last_bar(self, ticker):
+        """Return the timestamp of the newest stored bar, or None."""
+        stored, _ = self.load(ticker)
+        return None if stored is None or stored.empty else stored.index[-1]
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_history_store():
+    """Return the shared store, or None when disabled with ``FINANCEGPT_HISTORY_STORE=0``."""
+    global _store
+    if not get_settings().history.store_enabled:
+        return None
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = HistoryStore()
+    return _store
@@ -0,0 +1,147 @@
+"""Shared HTTP clients with connection pooling, retries and per-provider rate limits."""
+import random
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from config.settings import get_settings
+
+# Tunables per upstream provider (see ``providers`` in config.settings). "rate"
+# is the sustained requests per second allowed by the token bucket and "burst"
+# its capacity.
+PROVIDER_SETTINGS = {name: provider.http_options() for name, provider in get_settings().providers.items()}
+
+# Responses worth retrying: rate limited or transient server errors
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class TokenBucket:
+    """Thread-safe token bucket; ``acquire`` blocks until a token is available."""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+class HttpClient:
+    """
+    Keep-alive HTTP session for one provider.
+
+    Requests are throttled by a token bucket and retried with exponential
+    backoff and full jitter on connection errors, timeouts and retryable
+    status codes. Counters and latency are tracked per client.
+    """
+
+    def __init__(self, provider, **overrides):
+        settings = {**PROVIDER_SETTINGS["default"], **PROVIDER_SETTINGS.get(provider, {}), **overrides}
+        self.provider = provider
+        self.timeout = (settings["connect_timeout"], settings["read_timeout"])
+        self.max_retries = settings["max_retries"]
+        self.backoff = settings["backoff"]
+        self.max_backoff = settings["max_backoff"]
+        self.bucket = TokenBucket(settings["rate"], settings["burst"])
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=settings["pool_size"], pool_maxsize=settings["pool_size"])
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+        self._lock = threading.Lock()
+        self._stats = {"requests": 0, "failures": 0, "retries": 0, "latency_total": 0.0, "latency_max": 0.0}
+
+    def _record(self, latency=None, failed=False, retried=False):
+        with self._lock:
+            if latency is not None:
+                self._stats["requests"] += 1
+                self._stats["latency_total"] += latency
+                self._stats["latency_max"] = max(self._stats["latency_max"], latency)
+            if failed:
+                self._stats["failures"] += 1
+            if retried:
+                self._stats["retries"] += 1
+
+    def _backoff_delay(self, attempt, response=None):
+        retry_after = response.headers.get("Retry-After") if response is not None else None
+        if retry_after and retry_after.isdigit():
+            return min(float(retry_after), self.max_backoff)
+        return random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
+
+    def request(self, method, url, **kwargs):
+        """
+        Send a request, retrying transient failures.
+
+        Returns:
+            requests.Response: The final response (which may still be an error
+            status once retries are exhausted).
+
+        Raises:
+            requests.RequestException: When the last attempt fails to connect
+            or times out.
+        """
+        kwargs.setdefault("timeout", self.timeout)
+        for attempt in range(self.max_retries + 1):
+            self.bucket.acquire()
+            start = time.perf_counter()
+            try:
+                response = self.session.request(method, url, **kwargs)
+            except (requests.ConnectionError, requests.Timeout):
+                self._record(time.perf_counter() - start, failed=True)
+                if attempt == self.max_retries:
+                    raise
+                self._record(retried=True)
+                time.sleep(self._backoff_delay(attempt))
+                continue
+
+            failed = response.status_code >= 400
+            self._record(time.perf_counter() - start, failed=failed)
+            if response.status_code in RETRY_STATUSES and attempt < self.max_retries:
+                self._record(retried=True)
+                time.sleep(self._backoff_delay(attempt, response))
+                continue
+            return response
+
+    def get(self, url, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+        stats["latency_avg"] = stats["latency_total"] / stats["requests"] if stats["requests"] else 0.0
+        return stats
+
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def get_client(provider):
+    """Return the process-wide client for a provider, creating it on first use."""
+    client = _clients.get(provider)
+    if client is None:
+        with _clients_lock:
+            client = _clients.get(provider)
+            if client is None:
+                client = _clients[provider] = HttpClient(provider)
+    return client
+
+
+def http_stats():
+    """Return request counters and latency for every provider used so far."""
+    return {provider: client.stats() for provider, client in list(_clients.items())}
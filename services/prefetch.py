@@ -0,0 +1,233 @@
+"""
+Background refresh of watchlist tickers into the shared data cache.
+
+``PrefetchScheduler`` keeps quotes, price history, fundamentals and news of
+a watchlist warm so page loads and recommendations are served from the
+cache instead of waiting on yfinance, Alpha Vantage and NewsAPI. Quotes are
+refreshed frequently only while the ticker's exchange is open.
+"""
+import heapq
+import itertools
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, time as day_time
+from zoneinfo import ZoneInfo
+
+from config.settings import get_settings
+from services import data_fetcher
+
+_settings = get_settings()
+# Seconds between refreshes per cache kind
+REFRESH_INTERVALS = dict(_settings.prefetch.intervals)
+# Quote refresh interval while the exchange is closed
+OFF_HOURS_INFO_INTERVAL = _settings.prefetch.off_hours_info_interval
+# Each interval is stretched or shrunk by up to this fraction
+DEFAULT_JITTER = _settings.prefetch.jitter
+DEFAULT_MAX_CONCURRENT = _settings.prefetch.max_concurrent
+# First refreshes are spread over this many seconds instead of firing at once
+STARTUP_SPREAD = _settings.prefetch.startup_spread
+
+# Regular trading sessions; exchange holidays are not modelled
+MARKETS = {
+    "india": (ZoneInfo("Asia/Kolkata"), day_time(9, 15), day_time(15, 30)),
+    "us": (ZoneInfo("America/New_York"), day_time(9, 30), day_time(16, 0)),
+}
+
+
+def market_for(ticker):
+    """Return the market key for a ticker: NSE/BSE suffixes are India, everything else US."""
+    return "india" if ticker.upper().endswith((".NS", ".BO")) else "us"
+
+
+def is_market_open(ticker, now=None):
+    """Whether the ticker's exchange is in its regular weekday session at ``now`` (aware datetime)."""
+    tz, opens, closes = MARKETS[market_for(ticker)]
+    local = (now or datetime.now(tz)).astimezone(tz)
+    return local.weekday() < 5 and opens <= local.time() < closes
+
+
+class PrefetchScheduler:
+    """
+    Jittered, concurrency-limited refresh loop for a watchlist.
+
+    A single scheduler thread keeps a heap of (due time, kind, ticker) jobs and
+    hands due jobs to a small thread pool; a job is never run twice at once.
+    Every ``add`` of a ticker starts a new generation, and jobs queued by an
+    earlier one are dropped, so removing and re-adding a ticker does not
+    double its schedule.
+    Each refresh writes into the ``data_fetcher`` cache with a TTL that
+    outlasts the next scheduled refresh, so watched entries do not go cold
+    between runs.
+
+    Args:
+        tickers (list[str]): Watchlist.
+        intervals (dict, optional): Overrides of ``REFRESH_INTERVALS``.
+        max_concurrent (int): Refreshes in flight at once.
+        jitter (float): Relative random spread applied to every interval.
+        market_hours (bool): Slow quote refreshes down to
+            ``OFF_HOURS_INFO_INTERVAL`` while the exchange is closed.
+    """
+
+    def __init__(self, tickers, intervals=None, max_concurrent=DEFAULT_MAX_CONCURRENT, jitter=DEFAULT_JITTER,
+                 market_hours=True, startup_spread=STARTUP_SPREAD):
+        self.intervals = {**REFRESH_INTERVALS, **(intervals or {})}
+        self.max_concurrent = max_concurrent
+        self.jitter = jitter
+        self.market_hours = market_hours
+        self.startup_spread = startup_spread
+        # Watched ticker -> generation of its queued jobs
+        self._tickers = {}
+        self._heap = []
+        self._sequence = itertools.count()
+        self._generations = itertools.count()
+        self._running = set()
+        self._condition = threading.Condition()
+        self._stopping = threading.Event()
+        self._thread = None
+        self._pool = None
+        self._stats = {"refreshes": 0, "failures": 0}
+        for ticker in tickers:
+            self.add(ticker)
+
+    def _interval(self, kind, ticker):
+        interval = self.intervals[kind]
+        if kind == "info" and self.market_hours and not is_market_open(ticker):
+            interval = max(interval, OFF_HOURS_INFO_INTERVAL)
+        return interval
+
+    def _push(self, due, kind, ticker, generation):
+        heapq.heappush(self._heap, (due, next(self._sequence), kind, ticker, generation))
+
+    def add(self, ticker):
+        """Start watching a ticker; its first refreshes are spread over ``startup_spread`` seconds."""
+        ticker = ticker.strip().upper()
+        with self._condition:
+            if ticker in self._tickers:
+                return
+            generation = self._tickers[ticker] = next(self._generations)
+            now = time.monotonic()
+            for kind in self.intervals:
+                self._push(now + random.uniform(0, self.startup_spread), kind, ticker, generation)
+            self._condition.notify()
+
+    def remove(self, ticker):
+        """Stop watching a ticker; its queued jobs are dropped when they come due."""
+        with self._condition:
+            self._tickers.pop(ticker.strip().upper(), None)
+
+    @property
+    def tickers(self):
+        with self._condition:
+            return sorted(self._tickers)
+
+    def start(self):
+        if self._thread is not None:
+            return self
+        self._stopping.clear()
+        self._running.clear()
+        self._pool = ThreadPoolExecutor(max_workers=self.max_concurrent, thread_name_prefix="prefetch")
+        self._thread = threading.Thread(target=self._loop, name="prefetch-scheduler", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self, timeout=10):
+        """Stop scheduling, drop queued refreshes and wait for running ones to finish."""
+        if self._thread is None:
+            return
+        self._stopping.set()
+        with self._condition:
+            self._condition.notify_all()
+        self._thread.join(timeout)
+        self._pool.shutdown(wait=True, cancel_futures=True)
+        self._thread = self._pool = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *_exc):
+        self.stop()
+
+    def _loop(self):
+        while not self._stopping.is_set():
+            with self._condition:
+                now = time.monotonic()
+                if not self._heap or len(self._running) >= self.max_concurrent:
+                    self._condition.wait(timeout=1.0)
+                    continue
+                due, _, kind, ticker, generation = self._heap[0]
+                if due > now:
+                    self._condition.wait(timeout=due - now)
+                    continue
+                heapq.heappop(self._heap)
+                if self._tickers.get(ticker) != generation:
+                    continue
+                if (kind, ticker) in self._running:
+                    # Still refreshing from the previous round; try again shortly
+                    self._push(now + 1.0, kind, ticker, generation)
+                    continue
+                self._running.add((kind, ticker))
+            self._pool.submit(self._refresh, kind, ticker, generation)
+
+    def _refresh(self, kind, ticker, generation):
+        interval = self._interval(kind, ticker)
+        delay = interval * (1 + random.uniform(-self.jitter, self.jitter))
+        failed = False
+        try:
+            if not self._stopping.is_set():
+                # Stay fresh until after the next refresh is due
+                failed = data_fetcher.refresh(kind, ticker, ttl=interval * (1 + 2 * self.jitter) + 5) is None
+        except Exception as e:
+            print(f"Warning: Prefetch of {kind} for {ticker} failed: {e}")
+            failed = True
+        with self._condition:
+            self._running.discard((kind, ticker))
+            self._stats["refreshes"] += 1
+            self._stats["failures"] += failed
+            if self._tickers.get(ticker) == generation:
+                self._push(time.monotonic() + delay, kind, ticker, generation)
+            self._condition.notify()
+
+    def stats(self):
+        with self._condition:
+            return {**self._stats, "tickers": len(self._tickers), "queued": len(self._heap),
+                    "running": len(self._running)}
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def start_watchlist_prefetch(tickers=None):
+    """
+    Start the process-wide scheduler once, for ``tickers`` or the ``prefetch.watchlist``
+    setting (e.g. the comma-separated ``FINANCEGPT_WATCHLIST`` environment variable).
+    Returns None when the watchlist is empty.
+    """
+    global _scheduler
+    if tickers is None:
+        tickers = list(get_settings().prefetch.watchlist)
+    if not tickers:
+        return None
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = PrefetchScheduler(tickers).start()
+        else:
+            for ticker in tickers:
+                _scheduler.add(ticker)
+    return _scheduler
+
+
+def prefetch_stats():
+    """Counters of the process-wide scheduler, or an empty dict when it is not running."""
+    scheduler = _scheduler
+    return scheduler.stats() if scheduler is not None else {}
+
+
+def stop_watchlist_prefetch():
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is not None:
+            _scheduler.stop()
+            _scheduler = None
@@ -1,7 +1,10 @@
 import os
 import sys
+import tempfile
 import types
 
+import pytest
+
 
 def _ensure_module(name: str):
     if name not in sys.modules:
@@ -16,6 +19,21 @@ def pytest_sessionstart(session):
     if project_root not in sys.path:
         sys.path.insert(0, project_root)
 
+    # Keep on-disk caches out of the working tree and isolated per session
+    os.environ['FINANCEGPT_CACHE_DIR'] = tempfile.mkdtemp(prefix='financegpt-cache-')
+
+    # Tests never reach real upstream APIs; local fake servers are still allowed
+    import requests
+    from urllib.parse import urlsplit
+    class NetworkDisabled(requests.RequestException):
+        pass
+    _real_request = requests.Session.request
+    def _local_only_request(self, method, url, *args, **kwargs):
+        if urlsplit(url).hostname not in ('localhost', '127.0.0.1'):
+            raise NetworkDisabled(f"network access disabled in tests: {url}")
+        return _real_request(self, method, url, *args, **kwargs)
+    requests.Session.request = _local_only_request
+
     # Provide lightweight stubs to avoid ImportError during imports
     _ensure_module('streamlit')
 
@@ -24,6 +42,8 @@ def pytest_sessionstart(session):
     def load_dotenv(*args, **kwargs):
         return None
     dotenv.load_dotenv = load_dotenv
+    # A developer's .env must not leak into the settings under test
+    dotenv.dotenv_values = lambda *args, **kwargs: {}
 
     # google.generativeai stub
     genai = _ensure_module('google.generativeai')
@@ -33,7 +53,9 @@ def pytest_sessionstart(session):
     class _DummyModel:
         def __init__(self, *_args, **_kwargs):
             pass
-        def generate_content(self, prompt):
+        def generate_content(self, prompt, stream=False):
+            if stream:
+                return [_DummyResult("## Recommendation"), _DummyResult("\nHold")]
             return _DummyResult("## Recommendation\nHold")
     def configure(**_kwargs):
         return None
@@ -50,6 +72,23 @@ def pytest_sessionstart(session):
             return pd.DataFrame({"Close": [1, 2, 3]})
     yfinance.Ticker = _DummyTicker
 
+    def _download(tickers, period=None, start=None, group_by=None, **_kwargs):
+        # Deterministic daily bars per ticker, so bulk-history consumers run end to end
+        import numpy as np
+        import pandas as pd
+        tickers = [tickers] if isinstance(tickers, str) else list(tickers)
+        today = pd.Timestamp.now().normalize()
+        first = pd.Timestamp(start) if start else today - pd.DateOffset(months=6 if period == "6mo" else 1)
+        index = pd.bdate_range(first, today)
+        frames = {}
+        for i, ticker in enumerate(tickers):
+            close = 100.0 + i + 5 * np.sin(np.arange(len(index)) / 5.0)
+            frames[ticker] = pd.DataFrame({"Open": close, "High": close * 1.01, "Low": close * 0.99,
+                                           "Close": close, "Volume": 1_000.0,
+                                           "Dividends": 0.0, "Stock Splits": 0.0}, index=index)
+        return pd.concat(frames, axis=1)
+    yfinance.download = _download
+
     # alpha_vantage.fundamentaldata stub
     alpha_vantage = _ensure_module('alpha_vantage')
     fd_pkg = types.ModuleType('alpha_vantage.fundamentaldata')
@@ -64,9 +103,30 @@ def pytest_sessionstart(session):
     # transformers.pipeline stub
     transformers = _ensure_module('transformers')
     def pipeline(_task, **_kwargs):
-        def _analyze(text):
-            return [{"label": "neutral", "score": 0.5}]
-        return lambda x: _analyze(x)
+        def _analyze(text, **_call_kwargs):
+            texts = text if isinstance(text, list) else [text]
+            return [{"label": "neutral", "score": 0.5} for _ in texts]
+        return _analyze
     transformers.pipeline = pipeline
 
 
+
+@pytest.fixture(autouse=True)
+def _clear_data_cache():
+    # The ticker cache is process-wide; start every test cold
+    import shutil
+    import services.data_fetcher as data_fetcher
+    import services.history_store as history_store
+    import core.indicators as indicators
+    import core.llm_client as llm_client
+
+    def reset():
+        data_fetcher.clear_cache()
+        indicators.clear_cache()
+        # Bars stored by one test must not leak into the next
+        shutil.rmtree(os.path.join(os.environ["FINANCEGPT_CACHE_DIR"], "history"), ignore_errors=True)
+        history_store._store = None
+    reset()
+    llm_client.clear_cache()
+    yield
+    reset()
@@ -1,5 +1,7 @@
 import types
 
+import pandas as pd
+
 import core.agent_handler as ah
 
 
@@ -33,3 +35,82 @@ def test_generate_recommendation_missing_price(monkeypatch):
     assert 'Missing' in res[0]
 
 
+
+
+def test_generate_recommendation_degrades_slow_and_failed_sources(monkeypatch):
+    import time
+    import pandas as pd
+
+    def fake_fetch_stock_data(_ticker):
+        return pd.DataFrame({"Close": [1, 2, 3]}), {"currentPrice": 123}
+
+    def slow_news(_ticker):
+        time.sleep(0.5)
+        return [{"title": "Late"}]
+
+    def broken_financials(_ticker):
+        raise RuntimeError('boom')
+
+    prompts = []
+    class RecordingModel:
+        def __init__(self, *_a, **_k):
+            pass
+        def generate_content(self, prompt):
+            prompts.append(prompt)
+            return types.SimpleNamespace(text="## Recommendation: Hold")
+
+    monkeypatch.setattr(ah, 'fetch_stock_data', fake_fetch_stock_data)
+    monkeypatch.setattr(ah, 'fetch_financial_data', broken_financials)
+    monkeypatch.setattr(ah, 'fetch_stock_news', slow_news)
+    monkeypatch.setattr(ah.genai, 'GenerativeModel', RecordingModel)
+
+    # Warm the technicals (first Parquet write imports pyarrow) so only the news source is slow
+    ah.fetch_technicals('INFY')
+    metrics = {}
+    start = time.perf_counter()
+    rec = ah.generate_recommendation('INFY', timeouts={"news": 0.05}, metrics=metrics)
+    assert time.perf_counter() - start < 0.4
+    assert rec == "## Recommendation: Hold"
+    assert "No news data available." in prompts[0]
+    assert "No financial data available." in prompts[0]
+    # Technicals come from the (stubbed) bulk download of the ticker and its benchmark
+    assert "RSI14" in prompts[0] and "Beta60" in prompts[0]
+    assert set(metrics["fetch_seconds"]) == {"stock", "financial", "news", "technicals"}
+    assert set(metrics["prompt_tokens"]) == {"history_raw", "history_compact", "prompt"}
+
+
+def test_gather_sources_sequential_mode(monkeypatch):
+    monkeypatch.setattr(ah, 'fetch_stock_data', lambda t: ("hist", {"currentPrice": 1}))
+    monkeypatch.setattr(ah, 'fetch_financial_data', lambda t: {"Name": t})
+    monkeypatch.setattr(ah, 'fetch_stock_news', lambda t: [])
+    results, durations = ah._gather_sources('INFY', concurrent=False)
+    assert results["financial"] == {"Name": "INFY"}
+    assert all(d >= 0 for d in durations.values())
+
+
+def test_stream_recommendation_tag_is_known_from_first_chunks(monkeypatch):
+    from core.utils import detect_recommendation_tag, extract_recommendation
+    import pandas as pd
+    monkeypatch.setattr(ah, 'fetch_stock_data', lambda t: (pd.DataFrame({"Close": [1, 2, 3]}), {"currentPrice": 5}))
+    monkeypatch.setattr(ah, 'fetch_financial_data', lambda t: None)
+    monkeypatch.setattr(ah, 'fetch_stock_news', lambda t: [])
+
+    chunks = list(ah.stream_recommendation('INFY'))
+    assert detect_recommendation_tag(chunks[0]) is None
+    assert detect_recommendation_tag("".join(chunks[:2])) == "HOLD"
+    assert extract_recommendation("".join(chunks))[0] == "HOLD"
+
+
+def test_stream_recommendation_reports_missing_data(monkeypatch):
+    import pandas as pd
+    monkeypatch.setattr(ah, 'fetch_stock_data', lambda t: (pd.DataFrame({"Close": [1]}), {}))
+    assert list(ah.stream_recommendation('INFY')) == [
+        "Error: Missing 'currentPrice': The stock data for INFY does not contain the 'currentPrice'."
+    ]
+
+
+def test_fetch_technicals_returns_the_indicator_window():
+    technicals = ah.fetch_technicals('INFY.NS')
+    assert {"rsi", "macd", "vwap", "beta"} <= set(technicals.columns)
+    assert technicals["rsi"].notna().iloc[-1] and technicals["beta"].notna().iloc[-1]
+    assert technicals.index[0] >= technicals.index[-1] - pd.DateOffset(months=6, days=7)
@@ -0,0 +1,105 @@
+import asyncio
+import json
+import threading
+import time
+
+import pandas as pd
+import pytest
+import requests
+import uvicorn
+
+import app.api as api
+import app.loadgen as loadgen
+import services.data_fetcher as df
+
+
+@pytest.fixture(scope="module")
+def server():
+    config = uvicorn.Config(api.app, host="127.0.0.1", port=0, log_level="warning", lifespan="on")
+    server = uvicorn.Server(config)
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    deadline = time.time() + 10
+    while not server.started and time.time() < deadline:
+        time.sleep(0.01)
+    port = server.servers[0].sockets[0].getsockname()[1]
+    yield f"http://127.0.0.1:{port}"
+    server.should_exit = True
+    thread.join(timeout=5)
+
+
+@pytest.fixture(autouse=True)
+def _stub_upstreams(monkeypatch):
+    class Ticker:
+        def __init__(self, ticker, *_a, **_k):
+            self.info = {"currentPrice": 101.5, "longName": f"{ticker} Ltd", "irrelevant": 1}
+        def history(self, period="1mo"):
+            return pd.DataFrame({"Close": [100.0, 101.5]}, index=pd.date_range(end=pd.Timestamp.now().normalize(), periods=2))
+    monkeypatch.setattr(df.yf, "Ticker", Ticker)
+    # Keep these bars out of the on-disk history shared with other tests
+    monkeypatch.setenv("FINANCEGPT_HISTORY_STORE", "0")
+    monkeypatch.setattr(api.agent_handler, "build_recommendation_prompt",
+                        lambda ticker, **_k: ("Error: Missing 'currentPrice'", "no price") if ticker == "BAD"
+                        else f"prompt for {ticker}")
+    monkeypatch.setattr("core.batch.fetch_bulk_history", lambda tickers, **_kwargs: {})
+
+
+def test_stock_snapshot(server):
+    body = requests.get(f"{server}/stock/infy").json()
+    assert body["ticker"] == "INFY"
+    assert body["info"] == {"longName": "INFY Ltd", "currentPrice": 101.5}
+    assert [bar["Close"] for bar in body["history"]] == [100.0, 101.5]
+
+
+def test_recommendation_single_batch_and_stream(server):
+    single = requests.get(f"{server}/recommendation/INFY").json()
+    assert single["tag"] == "HOLD" and single["error"] is None
+
+    batch = requests.post(f"{server}/recommendation", json={"tickers": ["tcs", "BAD", "TCS"]}).json()
+    assert [r["ticker"] for r in batch["results"]] == ["TCS", "BAD"]
+    assert batch["results"][1]["error"].startswith("Error")
+
+    with requests.get(f"{server}/recommendation/INFY", params={"stream": "1"}, stream=True) as response:
+        assert response.headers["content-type"].startswith("application/x-ndjson")
+        events = [json.loads(line) for line in response.iter_lines() if line]
+    # Served from the response cache filled by the first request
+    assert "".join(e["chunk"] for e in events if "chunk" in e) == "## Recommendation\nHold"
+    assert events[-1] == {"ticker": "INFY", "tag": "HOLD", "done": True}
+
+    with requests.post(f"{server}/recommendation", json={"tickers": ["A", "B"], "stream": True},
+                       stream=True) as response:
+        assert sorted(json.loads(line)["ticker"] for line in response.iter_lines() if line) == ["A", "B"]
+
+
+def test_sentiment_and_email_summary(server, monkeypatch):
+    body = requests.post(f"{server}/sentiment", json={"articles": [{"title": "Profits soar"}]}).json()
+    assert body["results"]["articles"]["sentiment"] == "neutral"
+
+    import core.gmail_agent as ga
+    synced = []
+    monkeypatch.setattr(ga, "sync_mailbox", lambda: synced.append(True))
+    planned = requests.post(f"{server}/email-summary", json={"query": "how much on food in May?"}).json()
+    assert planned["total_spends"] == 550.0 and planned["answer"].startswith("Spends on Food")
+    # The mailbox is synced before a planned answer is given, and the answer is complete
+    assert synced == [True] and planned["unparsed"] == 0
+
+    snippets = ["A debit of ₹550.00 for your Swiggy order (ID: SWG9876) was made on 2025-05-03."]
+    with requests.post(f"{server}/email-summary", json={"query": "spends", "snippets": snippets, "stream": True},
+                       stream=True) as response:
+        events = [json.loads(line) for line in response.iter_lines() if line]
+    assert events[0]["transactions"][0]["merchant"] == "Swiggy"
+    assert events[-1]["done"] and events[-1]["total_spends"] == 550.0
+
+    assert requests.post(f"{server}/email-summary", json={"snippets": []}).status_code == 400
+    assert requests.post(f"{server}/sentiment", data="not json").status_code == 400
+
+
+def test_metrics_and_loadgen(server):
+    report = asyncio.run(loadgen.run_load(server, "health", [], concurrency=4, requests=40))
+    assert report["requests"] == 40 and report["statuses"] == {"200": 40}
+    assert report["latency"]["p50"] <= report["latency"]["max"]
+
+    text = requests.get(f"{server}/metrics").text
+    assert 'financegpt_api_requests_total{route="/health",status="200"}' in text
+    assert 'financegpt_cache_hits{cache="data"}' in text
+    assert "# TYPE financegpt_upstream_requests_total counter" in text
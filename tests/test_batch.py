@@ -0,0 +1,91 @@
+import json
+import threading
+import time
+
+import core.batch as batch
+
+
+def _stub_agent(monkeypatch, fail=()):
+    active = {"now": 0, "peak": 0}
+    lock = threading.Lock()
+
+    def fake_prompt(ticker, metrics=None):
+        if ticker in fail:
+            return "Error: Missing 'currentPrice'", "no price"
+        return f"prompt for {ticker}"
+
+    def fake_generate(prompt):
+        with lock:
+            active["now"] += 1
+            active["peak"] = max(active["peak"], active["now"])
+        time.sleep(0.02)
+        with lock:
+            active["now"] -= 1
+        return "## Recommendation: Buy"
+
+    monkeypatch.setattr(batch.agent_handler, 'build_recommendation_prompt', fake_prompt)
+    monkeypatch.setattr(batch.agent_handler, 'generate_from_prompt', fake_generate)
+    monkeypatch.setattr(batch, "fetch_bulk_history", lambda tickers, **_kwargs: {})
+    return active
+
+
+def test_run_batch_streams_jsonl_and_limits_llm_concurrency(monkeypatch, tmp_path):
+    active = _stub_agent(monkeypatch, fail={"BAD"})
+    out = tmp_path / "results.jsonl"
+    tickers = [f"T{i}" for i in range(10)] + ["BAD", "t0"]
+
+    results = list(batch.run_batch(tickers, str(out), workers=8, llm_concurrency=2))
+
+    assert len(results) == 11
+    assert active["peak"] <= 2
+    records = [json.loads(line) for line in out.read_text().splitlines()]
+    assert {r["ticker"] for r in records} == {r["ticker"] for r in results}
+    assert next(r for r in records if r["ticker"] == "T3")["tag"] == "BUY"
+    assert next(r for r in records if r["ticker"] == "BAD")["error"]
+
+
+def test_run_batch_resumes_interrupted_run(monkeypatch, tmp_path):
+    _stub_agent(monkeypatch)
+    out = tmp_path / "results.jsonl"
+    out.write_text(
+        json.dumps({"ticker": "A", "tag": "BUY", "error": None}) + "\n"
+        + json.dumps({"ticker": "B", "tag": None, "error": "Timeout"}) + "\n"
+        + '{"ticker": "C", "ta'
+    )
+
+    results = list(batch.run_batch(["A", "B", "C"], str(out)))
+
+    assert sorted(r["ticker"] for r in results) == ["B", "C"]
+    # The half-written line is dropped, so every line parses and C is recorded
+    records = [json.loads(line) for line in out.read_text().splitlines()]
+    assert [r["ticker"] for r in records].count("C") == 1
+    assert batch.load_completed(str(out)) == {"A", "B", "C"}
+
+    # A complete last record that only lacks its newline is kept
+    out.write_text(json.dumps({"ticker": "A", "tag": "BUY", "error": None}))
+    list(batch.run_batch(["A", "D"], str(out)))
+    assert [json.loads(line)["ticker"] for line in out.read_text().splitlines()] == ["A", "D"]
+
+
+def test_run_batch_sizes_the_shared_cache_while_it_runs(monkeypatch):
+    import services.data_fetcher as df
+    _stub_agent(monkeypatch)
+    sizes = []
+    monkeypatch.setattr(batch, "fetch_bulk_history", lambda tickers, **_kwargs: sizes.append(df._cache.maxsize))
+    base = df._cache.maxsize
+    tickers = [f"T{i}" for i in range(300)]
+    list(batch.run_batch(tickers, resume=False))
+    assert sizes[0] >= base + batch.CACHE_ENTRIES_PER_TICKER * len(tickers)
+    assert df._cache.maxsize == base
+
+
+def test_concurrent_runs_share_one_llm_limit(monkeypatch):
+    active = _stub_agent(monkeypatch)
+    monkeypatch.setattr(batch, "_llm_slots", threading.BoundedSemaphore(2))
+    runs = [threading.Thread(target=lambda n=n: list(batch.run_batch([f"R{n}-{i}" for i in range(6)], resume=False)))
+            for n in range(3)]
+    for run in runs:
+        run.start()
+    for run in runs:
+        run.join()
+    assert active["peak"] <= 2
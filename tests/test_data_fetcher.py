@@ -21,7 +21,7 @@ def test_fetch_stock_news_handles_missing_articles(monkeypatch):
     class DummyResponse:
         def json(self):
             return {}
-    monkeypatch.setattr(df.requests, 'get', lambda url: DummyResponse())
+    monkeypatch.setattr(df.get_client('newsapi'), 'get', lambda url, **_kw: DummyResponse())
     news = df.fetch_stock_news('INFY')
     assert news == []
 
@@ -37,3 +37,104 @@ def test_fetch_financial_data_handles_exception(monkeypatch):
     assert df.fetch_financial_data('INFY') is None
 
 
+
+def test_fetch_stock_data_is_cached_per_ticker(monkeypatch):
+    calls = []
+    class CountingTicker:
+        def __init__(self, ticker, *_a, **_k):
+            calls.append(ticker)
+            self.info = {"currentPrice": 1}
+        def history(self, period="1mo"):
+            import pandas as pd
+            return pd.DataFrame({"Close": [1, 2, 3]})
+
+    monkeypatch.setattr(df.yf, 'Ticker', CountingTicker)
+    df.fetch_stock_data('INFY')
+    df.fetch_stock_data('infy')
+    df.fetch_stock_info('INFY')
+    # one upstream call for the history, one for the info
+    assert len(calls) == 2
+    stats = df.cache_stats()
+    assert stats['hits'] == 3
+    assert stats['misses'] == 2
+
+
+def test_failed_financial_data_is_not_cached(monkeypatch):
+    results = iter([RuntimeError('boom'), ({"Name": "Dummy"}, None)])
+    class FlakyFD:
+        def __init__(self, *_a, **_k):
+            pass
+        def get_company_overview(self, *_a, **_k):
+            result = next(results)
+            if isinstance(result, Exception):
+                raise result
+            return result
+    monkeypatch.setattr(df, 'FundamentalData', FlakyFD)
+    assert df.fetch_financial_data('INFY') is None
+    assert df.fetch_financial_data('INFY') == {"Name": "Dummy"}
+    assert df.fetch_financial_data('INFY') == {"Name": "Dummy"}
+
+
+def test_ttl_cache_expires_and_evicts_lru(monkeypatch):
+    from services.cache import TTLCache
+    now = [100.0]
+    monkeypatch.setattr('services.cache.time.monotonic', lambda: now[0])
+    cache = TTLCache(maxsize=2, default_ttl=10)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    assert cache.get('a') == 1  # 'b' is now least recently used
+    cache.set('c', 3)
+    assert cache.get('b') is None
+    assert cache.stats()['evictions'] == 1
+    now[0] += 11
+    assert cache.get('a') is None
+
+
+def test_fetch_bulk_history_downloads_once_and_seeds_cache(monkeypatch):
+    import pandas as pd
+    calls = []
+    def fake_download(tickers, **_kwargs):
+        calls.append(list(tickers))
+        columns = pd.MultiIndex.from_product([tickers, ["Close"]])
+        return pd.DataFrame([[1.0] * len(tickers), [2.0] * len(tickers)], columns=columns)
+
+    class NoTicker:
+        def __init__(self, *_a, **_k):
+            raise AssertionError("history should come from the bulk download")
+
+    monkeypatch.setattr(df.yf, 'download', fake_download, raising=False)
+    histories = df.fetch_bulk_history(['INFY', 'TCS'])
+    assert calls == [['INFY', 'TCS']]
+    assert list(histories['TCS']['Close']) == [1.0, 2.0]
+
+    monkeypatch.setattr(df.yf, 'Ticker', NoTicker)
+    assert list(df.fetch_stock_history('INFY')['Close']) == [1.0, 2.0]
+    df.fetch_bulk_history(['INFY', 'TCS'])
+    assert len(calls) == 1
+
+
+def test_fetch_bulk_history_only_downloads_tails_for_stored_tickers(monkeypatch, tmp_path):
+    import pandas as pd
+    import services.history_store as hs
+    store = hs.HistoryStore(root=str(tmp_path))
+    monkeypatch.setattr(df, 'get_history_store', lambda: store)
+    today = pd.Timestamp.now(tz="Asia/Kolkata").normalize()
+    index = pd.date_range(end=today, periods=60, freq="D")
+    full = pd.DataFrame({"Close": range(60)}, index=index, dtype=float)
+    store.merge('INFY.NS', full.iloc[:-2], covered_from=index[0])
+
+    calls = []
+    def fake_download(tickers, **kwargs):
+        calls.append((list(tickers), kwargs.get("period"), kwargs.get("start")))
+        first = pd.Timestamp(kwargs["start"], tz="Asia/Kolkata") if kwargs.get("start") else index[-31]
+        part = full[full.index >= first]
+        columns = pd.MultiIndex.from_product([tickers, ["Close"]])
+        return pd.DataFrame({(t, "Close"): part["Close"] for t in tickers}, columns=columns)
+
+    monkeypatch.setattr(df.yf, 'download', fake_download, raising=False)
+    histories = df.fetch_bulk_history(['INFY.NS', 'TCS.NS'])
+
+    assert (['TCS.NS'], '1mo', None) in calls
+    assert (['INFY.NS'], None, index[-3].strftime("%Y-%m-%d")) in calls
+    assert histories['INFY.NS'].index[-1] == index[-1]
+    assert store.last_bar('TCS.NS') == index[-1]
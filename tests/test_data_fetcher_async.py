@@ -0,0 +1,110 @@
+import asyncio
+import threading
+
+import pandas as pd
+import pytest
+from aiohttp import web
+
+import services.data_fetcher as df
+import services.data_fetcher_async as dfa
+
+
+class FakeUpstream:
+    """Local NewsAPI / Alpha Vantage stand-in that tracks concurrent requests."""
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.active = 0
+        self.peak = 0
+        self.requests = []
+
+    async def handle(self, request):
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        self.requests.append((request.path, dict(request.query)))
+        try:
+            await asyncio.sleep(self.delay)
+            if request.path == "/news":
+                return web.json_response({"articles": [{"title": f"{request.query['q']} beats estimates"}]})
+            symbol = request.query["symbol"]
+            if symbol == "LIMIT":
+                return web.json_response({"Note": "API call frequency exceeded"})
+            return web.json_response({"Symbol": symbol, "PERatio": "21.5"})
+        finally:
+            self.active -= 1
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_get("/news", self.handle)
+        app.router.add_get("/query", self.handle)
+        self.runner = web.AppRunner(app)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, "127.0.0.1", 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        return f"http://127.0.0.1:{port}"
+
+
+@pytest.fixture(autouse=True)
+def _quiet_yfinance(monkeypatch):
+    threads = set()
+    class Ticker:
+        def __init__(self, ticker, *_a, **_k):
+            threads.add(threading.current_thread().name)
+            self.info = {"currentPrice": 10.0, "symbol": ticker}
+        def history(self, period="1mo"):
+            return pd.DataFrame({"Close": [1.0, 2.0]})
+    monkeypatch.setattr(df.yf, "Ticker", Ticker)
+    return threads
+
+
+def _run(upstream, body):
+    async def main():
+        base = await upstream.start()
+        try:
+            async with dfa.AsyncDataFetcher(limits={"newsapi": 3}, news_url=f"{base}/news",
+                                            alphavantage_url=f"{base}/query") as fetcher:
+                return await body(fetcher)
+        finally:
+            await upstream.runner.cleanup()
+    return asyncio.run(main())
+
+
+def test_same_shapes_as_the_sync_fetchers(_quiet_yfinance):
+    upstream = FakeUpstream()
+    async def body(fetcher):
+        return await fetcher.fetch_ticker("INFY"), await fetcher.fetch_financial_data("LIMIT")
+    result, limited = _run(upstream, body)
+    history, info = result["stock"]
+    assert list(history["Close"]) == [1.0, 2.0] and info["currentPrice"] == 10.0
+    assert result["financial"] == {"Symbol": "INFY", "PERatio": "21.5"}
+    assert result["news"] == [{"title": "INFY beats estimates"}]
+    assert limited is None
+    # yfinance ran off the event loop thread, and results landed in the shared cache
+    assert all(name != "MainThread" for name in _quiet_yfinance)
+    assert df.fetch_stock_news("infy") == [{"title": "INFY beats estimates"}]
+
+
+def test_fetch_many_respects_limits_and_dedupes():
+    upstream = FakeUpstream(delay=0.02)
+    tickers = [f"T{i}" for i in range(12)] + ["T0"]
+    results = _run(upstream, lambda fetcher: fetcher.fetch_many(tickers, concurrency=6))
+    assert list(results) == [f"T{i}" for i in range(12)]
+    news_requests = [q for path, q in upstream.requests if path == "/news"]
+    assert len(news_requests) == 12
+    assert upstream.peak <= 3 + dfa.CONCURRENCY_LIMITS["alphavantage"]
+
+
+def test_fetch_many_cancels_on_timeout():
+    upstream = FakeUpstream(delay=1)
+    results = _run(upstream, lambda fetcher: fetcher.fetch_many(["SLOW1", "SLOW2"], timeout=0.2))
+    assert results == {"SLOW1": None, "SLOW2": None}
+
+
+def test_sync_wrapper_refuses_a_running_loop():
+    async def inside():
+        with pytest.raises(RuntimeError):
+            dfa.fetch_stock_data("INFY")
+    asyncio.run(inside())
+    history, info = dfa.fetch_stock_data("INFY")
+    assert info["currentPrice"] == 10.0
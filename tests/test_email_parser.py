@@ -0,0 +1,102 @@
+import json
+from datetime import date
+
+import core.email_parser as ep
+import core.gmail_agent as ga
+from core.transactions import BSE_TRADE, INVESTMENT, SPEND, snippet_id
+
+
+def test_sample_mailbox_is_fully_parsed_by_rules():
+    parsed, leftovers = ep.partition_snippets(ga.get_gmail_data())
+    assert leftovers == []
+    assert [t.category for t in parsed].count(SPEND) == 4
+    trade = next(t for t in parsed if t.security_code == "500570")
+    assert (trade.category, trade.quantity, trade.side, trade.amount) == (BSE_TRADE, 5, "buy", 3000.0)
+    sip = next(t for t in parsed if "ICICI" in t.merchant)
+    assert (sip.category, sip.date) == (INVESTMENT, date(2025, 5, 7))
+    taxi = next(t for t in parsed if t.merchant == "Google Pay")
+    assert taxi.spend_category == "Travel"
+
+
+def test_date_and_amount_formats():
+    assert ep.parse_date("on 05 May 2025") == date(2025, 5, 5)
+    assert ep.parse_date("on 28/05/2025 at 10:00") == date(2025, 5, 28)
+    assert ep.parse_date("Sept 3, 2025") == date(2025, 9, 3)
+    assert ep.parse_amount("Rs. 1,23,456.50 debited") == 123456.5
+    assert ep.parse_amount("INR 99") == 99.0
+
+
+def test_unknown_templates_are_left_for_the_llm():
+    snippets = [
+        "Your OTP for login is 123456. Do not share it.",
+        "A debit of ₹120.00 was made on 2025-05-03.",  # no recognisable merchant
+        "Your Zomato order of ₹420.00 was delivered on 2025-05-09.",
+    ]
+    parsed, leftovers = ep.partition_snippets(snippets)
+    assert leftovers == snippets[:2]
+    assert parsed[0].merchant == "Zomato" and parsed[0].spend_category == "Food"
+
+
+def test_summary_skips_llm_when_everything_parses(monkeypatch):
+    def no_llm(*_a, **_k):
+        raise AssertionError("LLM should not be called")
+    monkeypatch.setattr(ga, 'generate_text', no_llm)
+    summary = ga.summarize_financial_data("spends this month", ga.get_gmail_data())
+    assert "Total Spends: ₹5,800.00" in summary
+    assert "- May 03, 2025: Swiggy (Food) - ₹550.00" in summary
+
+
+def test_only_leftovers_reach_the_llm(monkeypatch):
+    prompts = []
+    def fake_llm(_model, prompt, use_cache=True):
+        prompts.append(prompt)
+        return '```json\n[{"date": "2025-05-03", "type": "Spend", "amount": "120.00", "merchant": "Unknown"}]\n```'
+    monkeypatch.setattr(ga, 'generate_text', fake_llm)
+    odd = "A debit of ₹120.00 was made on 2025-05-03."
+    summary = ga.summarize_financial_data("spends", ga.get_gmail_data()[:2] + [odd])
+    assert len(prompts) == 1 and odd in prompts[0] and "Reliance" not in prompts[0]
+    assert "- May 03, 2025: Unknown - ₹120.00" in summary
+    assert summary.endswith("Total Spends: ₹120.00")
+
+
+def test_summary_streams_parsed_transactions_before_the_llm_answers(monkeypatch):
+    def fake_llm(_model, _prompt, use_cache=True):
+        return '[{"date": "2025-05-03", "type": "Spend", "amount": "120.00", "merchant": "Unknown"}]'
+    monkeypatch.setattr(ga, 'generate_text', fake_llm)
+    snippets = ga.get_gmail_data()[:3] + ["A debit of ₹120.00 was made on 2025-05-03."]
+    stages = list(ga.stream_financial_data("spends", snippets))
+    assert len(stages) == 2
+    assert stages[0].endswith("Total Spends: ₹550.00")
+    assert stages[-1] == ga.summarize_financial_data("spends", snippets)
+    assert stages[-1].endswith("Total Spends: ₹670.00")
+
+
+def test_large_mailbox_is_extracted_in_concurrent_batches(monkeypatch):
+    import threading
+    import time
+    active, peak, prompts = [0], [0], []
+    lock = threading.Lock()
+
+    def fake_llm(_model, prompt, use_cache=True):
+        with lock:
+            active[0] += 1
+            peak[0] = max(peak[0], active[0])
+            prompts.append(prompt)
+        time.sleep(0.02)
+        with lock:
+            active[0] -= 1
+        # One spend per email; the model also reports the first email twice
+        emails = list(range(1, prompt.count("Alert ") + 1)) + [1]
+        return json.dumps([{"date": "2025-05-01", "type": "Spend", "amount": 100, "merchant": "Canteen",
+                            "email": number} for number in emails])
+    monkeypatch.setattr(ga, 'generate_text', fake_llm)
+
+    odd = [f"Alert {i}: a debit of ₹100.00 was made on 2025-05-01 at counter {i:04d}." for i in range(200)]
+    assert all(len(batch) <= 20 for batch in ga.batch_snippets(odd, 500))
+    table = ga.extract_transactions("spends", odd, batch_tokens=500, concurrency=3)
+    assert len(prompts) == len(ga.batch_snippets(odd, 500)) > 5
+    assert 1 < peak[0] <= 3
+    # Alike transactions of different emails are all counted; totals are summed locally
+    assert len(table) == len(odd)
+    assert table.total(SPEND) == 100 * len(odd)
+    assert {t.source_id for t in table.transactions} == {snippet_id(s) for s in odd}
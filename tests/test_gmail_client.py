@@ -0,0 +1,170 @@
+import json
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import pytest
+
+import core.gmail_agent as ga
+import services.gmail_client as gc
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures", "gmail")
+
+
+def _fixture(name):
+    with open(os.path.join(FIXTURES, name), encoding="utf-8") as file:
+        return json.load(file)
+
+
+class FakeGmail:
+    """In-process Gmail REST server replaying the recorded fixtures."""
+
+    def __init__(self):
+        mailbox = _fixture("mailbox.json")
+        self.history_id = mailbox["historyId"]
+        self.messages = {m["id"]: m for m in mailbox["messages"]}
+        self.history = []
+        self.oldest_history_id = 0
+        self.calls = []
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *_args):
+                pass
+
+            def do_GET(self):
+                url = urlsplit(self.path)
+                params = {k: v[0] for k, v in parse_qs(url.query).items()}
+                fake.calls.append((url.path, params))
+                status, body = fake.route(url.path, params, self.headers.get("Authorization"))
+                payload = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_port}/gmail/v1/users/me"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def route(self, path, params, auth):
+        if auth != "Bearer test-token":
+            return 401, {"error": "unauthenticated"}
+        path = path.removeprefix("/gmail/v1/users/me/")
+        if path == "profile":
+            return 200, {"emailAddress": "me@example.com", "historyId": self.history_id}
+        if path == "messages":
+            return 200, {"messages": [{"id": i} for i in self.messages]}
+        if path.startswith("messages/"):
+            message = self.messages.get(path.split("/", 1)[1])
+            return (200, message) if message else (404, {"error": "not found"})
+        if path == "history":
+            if int(params["startHistoryId"]) < self.oldest_history_id:
+                return 404, {"error": "history expired"}
+            records = [r for r in self.history if int(r["id"]) > int(params["startHistoryId"])]
+            return 200, {"history": records, "historyId": self.history_id}
+        return 404, {"error": "unknown path"}
+
+    def deliver(self, name):
+        """Apply a recorded batch of mailbox changes."""
+        change = _fixture(name)
+        for message in change["added"]:
+            self.messages[message["id"]] = message
+            self.history.append({"id": message["historyId"], "messagesAdded": [{"message": {"id": message["id"]}}]})
+        for message_id in change["deleted"]:
+            self.messages.pop(message_id, None)
+            self.history.append({"id": change["historyId"], "messagesDeleted": [{"message": {"id": message_id}}]})
+        self.history_id = change["historyId"]
+
+    def fetched(self):
+        return [path for path, _ in self.calls if path.rsplit("/", 2)[-2] == "messages"]
+
+
+@pytest.fixture
+def gmail(tmp_path):
+    fake = FakeGmail()
+    index = gc.MailIndex(str(tmp_path / "index.sqlite"), parse=ga.parse_message)
+    transport = gc.RestGmailTransport("test-token", base_url=fake.url)
+    yield fake, gc.GmailSync(transport, index, keep=ga.is_financial)
+    index.close()
+    fake.server.shutdown()
+
+
+def test_full_then_incremental_sync(gmail):
+    fake, sync = gmail
+    assert sync.sync() == {"mode": "full", "added": 3, "removed": 0}
+    assert sync.index.history_id == "1000"
+    assert len(ga.indexed_transactions(sync.index)) == 2
+    assert sync.index.unparsed_snippets() == [fake.messages["18f0a3"]["snippet"]]
+
+    fake.deliver("history.json")
+    fake.calls.clear()
+    # Only the new messages are downloaded; the newsletter is not financial
+    assert sync.sync() == {"mode": "incremental", "added": 1, "removed": 1}
+    assert sorted(fake.fetched()) == ["/gmail/v1/users/me/messages/18f0b1", "/gmail/v1/users/me/messages/18f0b2"]
+    assert not any(path.endswith("/messages") for path, _ in fake.calls)
+    assert sync.index.history_id == "1010"
+    assert [t.merchant for t in ga.indexed_transactions(sync.index)] == ["Reliance Industries Ltd.", "Google Pay"]
+
+    fake.calls.clear()
+    assert sync.sync() == {"mode": "incremental", "added": 0, "removed": 0}
+    assert fake.fetched() == []
+
+
+def test_expired_history_falls_back_to_full_sync(gmail):
+    fake, sync = gmail
+    sync.sync()
+    fake.deliver("history.json")
+    fake.oldest_history_id = 1005
+    result = sync.sync()
+    # The fake server does not apply the search query; the newsletter is filtered out like in incremental sync
+    assert result == {"mode": "full", "added": 3, "removed": 0}
+    assert "18f0b2" not in sync.index.known_ids(["18f0b2"])
+    assert sync.index.history_id == "1010"
+    assert "18f0a2" not in sync.index.known_ids(["18f0a2"])
+
+
+def test_get_gmail_data_uses_the_index(gmail, monkeypatch):
+    fake, sync = gmail
+    monkeypatch.setattr(ga, "get_gmail_sync", lambda: sync)
+    snippets = ga.get_gmail_data()
+    assert snippets[0].startswith("A debit of ₹550.00") and len(snippets) == 3
+    fake.server.shutdown()
+    # Sync failures fall back to what is already indexed
+    monkeypatch.setattr("services.http_client.time.sleep", lambda _s: None)
+    monkeypatch.setattr(sync.transport, "base_url", "http://127.0.0.1:9/gmail/v1/users/me")
+    assert ga.get_gmail_data() == snippets
+
+    monkeypatch.setattr(ga, "get_gmail_sync", lambda: None)
+    assert ga.get_gmail_data() == ga.SAMPLE_EMAIL_SNIPPETS
+
+
+def test_planned_answers_sync_and_extract_unparsed_mail(gmail, monkeypatch):
+    from datetime import date
+    fake, sync = gmail
+    monkeypatch.setattr(ga, "get_gmail_sync", lambda: sync)
+    prompts = []
+
+    def fake_llm(_model, prompt, use_cache=True):
+        prompts.append(prompt)
+        return '[{"date": "2025-05-18", "type": "Spend", "amount": 1250, "merchant": "Blue Tokai", "email": 1}]'
+    monkeypatch.setattr(ga, "generate_text", fake_llm)
+
+    # The index starts empty; answering syncs it first
+    answer = ga.answer_financial_question("spends in May", today=date(2025, 5, 31))
+    assert len(sync.index) == 3
+    assert len(prompts) == 1 and "BLUE TOKAI" in prompts[0] and "Swiggy" not in prompts[0]
+    assert (answer["total"], answer["unparsed"]) == (1800.0, 0)
+
+    # Nothing unparsed falls in April, so no model call
+    assert ga.answer_financial_question("spends in April", today=date(2025, 5, 31), sync=False)["count"] == 0
+    assert len(prompts) == 1
+
+    def failing(*_a, **_k):
+        raise RuntimeError("quota")
+    monkeypatch.setattr(ga, "generate_text", failing)
+    answer = ga.answer_financial_question("spends in May", today=date(2025, 5, 31), sync=False, use_cache=False)
+    assert answer["unparsed"] == 1
+    assert "incomplete, 1 email in this range could not be read" in answer["text"]
@@ -0,0 +1,112 @@
+import pandas as pd
+
+import services.history_store as hs
+
+
+class FakeYahoo:
+    """Daily bars up to today; records every history() request."""
+
+    def __init__(self):
+        self.requests = []
+        today = pd.Timestamp.now(tz="Asia/Kolkata").normalize()
+        index = pd.date_range(end=today, periods=400, freq="D")
+        self.frame = pd.DataFrame({"Close": range(400)}, index=index, dtype=float)
+
+    def Ticker(self, ticker):
+        fake = self
+        class _Ticker:
+            def history(self, period=None, start=None):
+                fake.requests.append(period or f"start={start}")
+                if period:
+                    first = hs.period_start(period, fake.frame.index[-1])
+                else:
+                    first = pd.Timestamp(start, tz="Asia/Kolkata")
+                return fake.frame[fake.frame.index >= first]
+        return _Ticker()
+
+
+def _store(monkeypatch, tmp_path, **kwargs):
+    fake = FakeYahoo()
+    monkeypatch.setattr(hs, 'yf', fake)
+    return hs.HistoryStore(root=str(tmp_path), **kwargs), fake
+
+
+def test_cold_fetch_once_then_serve_from_disk(monkeypatch, tmp_path):
+    store, fake = _store(monkeypatch, tmp_path)
+    month = store.get_history("INFY.NS", "1mo")
+    assert 28 <= len(month) <= 32
+    assert fake.requests == ["1mo"]
+
+    # Fresh object, same files: no download within the refresh interval
+    store = hs.HistoryStore(root=str(tmp_path))
+    again = store.get_history("INFY.NS", "1mo")
+    pd.testing.assert_frame_equal(month, again, check_freq=False)
+    assert fake.requests == ["1mo"]
+
+
+def test_only_missing_tail_is_fetched(monkeypatch, tmp_path):
+    store, fake = _store(monkeypatch, tmp_path, tail_refresh_seconds=0)
+    full = fake.frame
+    fake.frame = full.iloc[:-3]
+    store.get_history("INFY.NS", "1mo")
+    fake.frame = full
+    month = store.get_history("INFY.NS", "1mo")
+    last_stored = full.index[-4].strftime("%Y-%m-%d")
+    assert fake.requests == ["1mo", f"start={last_stored}"]
+    assert month.index[-1] == full.index[-1]
+    assert not month.index.duplicated().any()
+
+
+def test_invalidating_a_ticker_expires_its_stored_tail(monkeypatch, tmp_path):
+    import services.data_fetcher as df
+    store, fake = _store(monkeypatch, tmp_path)
+    monkeypatch.setattr(df, 'get_history_store', lambda: store)
+    store.get_history("INFY.NS", "1mo")
+    store.get_history("INFY.NS", "1mo")
+    assert fake.requests == ["1mo"]
+
+    df.invalidate_ticker("infy.ns", kinds=("info",))
+    store.get_history("INFY.NS", "1mo")
+    assert fake.requests == ["1mo"]
+    df.invalidate_ticker("infy.ns")
+    store.get_history("INFY.NS", "1mo")
+    assert fake.requests == ["1mo", f"start={fake.frame.index[-1]:%Y-%m-%d}"]
+
+
+def test_longer_window_is_fetched_once_and_shorter_ones_are_sliced(monkeypatch, tmp_path):
+    store, fake = _store(monkeypatch, tmp_path)
+    store.get_history("TCS.NS", "1mo")
+    year = store.get_history("TCS.NS", "1y")
+    store.get_history("TCS.NS", "6mo")
+    store.get_history("TCS.NS", "1y")
+    assert fake.requests == ["1mo", "1y"]
+    assert len(year) > 300
+
+
+def test_non_datetime_frames_are_passed_through(monkeypatch, tmp_path):
+    class RangeTicker:
+        def history(self, period=None, start=None):
+            return pd.DataFrame({"Close": [1, 2, 3]})
+    monkeypatch.setattr(hs.yf, 'Ticker', lambda _t: RangeTicker())
+    store = hs.HistoryStore(root=str(tmp_path))
+    assert list(store.get_history("X", "1mo")["Close"]) == [1, 2, 3]
+    assert store.last_bar("X") is None
+
+
+def test_tail_with_a_split_refetches_the_stored_range(monkeypatch, tmp_path):
+    store, fake = _store(monkeypatch, tmp_path, tail_refresh_seconds=0)
+    full = fake.frame.assign(Close=100.0, Dividends=0.0)
+    full["Stock Splits"] = 0.0
+    fake.frame = full.iloc[:-3]
+    first = store.get_history("INFY.NS", "1mo")
+    # 1:2 split on the newest bar; Yahoo re-bases every earlier close
+    split_day = full.index[-1]
+    full.loc[full.index < split_day, "Close"] = 50.0
+    full.loc[split_day, "Stock Splits"] = 2.0
+    fake.frame = full
+    month = store.get_history("INFY.NS", "1mo")
+    assert fake.requests == ["1mo", f"start={full.index[-4]:%Y-%m-%d}", f"start={first.index[0]:%Y-%m-%d}"]
+    assert set(month["Close"].iloc[:-1]) == {50.0}
+    # Later tails merge normally again
+    month = store.get_history("INFY.NS", "1mo")
+    assert len(fake.requests) == 4
@@ -0,0 +1,70 @@
+import requests
+
+import services.http_client as hc
+
+
+class FakeResponse:
+    def __init__(self, status_code, headers=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+
+
+def _client(monkeypatch, outcomes, **overrides):
+    client = hc.HttpClient("test", rate=1000, burst=1000, **overrides)
+    sleeps = []
+    monkeypatch.setattr(hc.time, 'sleep', sleeps.append)
+    outcomes = iter(outcomes)
+    def fake_request(method, url, **kwargs):
+        assert kwargs["timeout"] == client.timeout
+        outcome = next(outcomes)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+    monkeypatch.setattr(client.session, 'request', fake_request)
+    return client, sleeps
+
+
+def test_retries_rate_limited_and_failed_requests(monkeypatch):
+    client, sleeps = _client(monkeypatch, [
+        requests.ConnectionError("reset"),
+        FakeResponse(429, {"Retry-After": "2"}),
+        FakeResponse(200),
+    ], max_backoff=8)
+    assert client.get("https://example.test").status_code == 200
+    assert sleeps[1] == 2.0
+    assert 0 <= sleeps[0] <= client.backoff
+    stats = client.stats()
+    assert stats["requests"] == 3
+    assert stats["failures"] == 2
+    assert stats["retries"] == 2
+
+
+def test_gives_up_after_max_retries(monkeypatch):
+    client, _ = _client(monkeypatch, [FakeResponse(503)] * 3, max_retries=2)
+    assert client.get("https://example.test").status_code == 503
+    client, _ = _client(monkeypatch, [requests.Timeout("slow")] * 2, max_retries=1)
+    try:
+        client.get("https://example.test")
+        assert False, "expected a timeout"
+    except requests.Timeout:
+        pass
+
+
+def test_token_bucket_throttles_after_burst(monkeypatch):
+    now = [0.0]
+    sleeps = []
+    def fake_sleep(seconds):
+        sleeps.append(seconds)
+        now[0] += seconds
+    monkeypatch.setattr(hc.time, 'monotonic', lambda: now[0])
+    monkeypatch.setattr(hc.time, 'sleep', fake_sleep)
+    bucket = hc.TokenBucket(rate=2, capacity=2)
+    for _ in range(4):
+        bucket.acquire()
+    assert sum(sleeps) == 1.0
+
+
+def test_get_client_is_shared_per_provider():
+    assert hc.get_client("newsapi") is hc.get_client("newsapi")
+    assert hc.get_client("newsapi").bucket.rate == hc.PROVIDER_SETTINGS["newsapi"]["rate"]
+    assert "newsapi" in hc.http_stats()
@@ -0,0 +1,59 @@
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Wall-clock seconds a cold interpreter may spend importing the entry points
+IMPORT_BUDGET_SECONDS = float(os.getenv("FINANCEGPT_IMPORT_BUDGET", "3.0"))
+ENTRY_POINTS = ["core.batch", "core.screener", "core.gmail_agent", "app.api"]
+PAGE_MODULES = ["app.stock_analysis", "app.personal_finance"]
+HEAVY_MODULES = ["transformers", "torch", "google.generativeai", "yfinance", "alpha_vantage"]
+
+_SCRIPT = """
+import importlib.util, json, sys, time
+modules = {modules!r}
+if importlib.util.find_spec("streamlit") is not None:
+    modules += {pages!r}
+start = time.perf_counter()
+for name in modules:
+    __import__(name)
+elapsed = time.perf_counter() - start
+print(json.dumps({{"seconds": elapsed, "heavy": [m for m in {heavy!r} if m in sys.modules]}}))
+"""
+
+
+def _slowest_imports(stderr, count=8):
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        try:
+            rows.append((int(cumulative), name.strip()))
+        except ValueError:
+            continue
+    return ", ".join(f"{name} {us / 1e6:.2f}s" for us, name in sorted(rows, reverse=True)[:count])
+
+
+def test_entry_points_import_within_budget(tmp_path):
+    env = dict(os.environ, FINANCEGPT_CACHE_DIR=str(tmp_path), FINANCEGPT_TRACING="0")
+    env.pop("FINANCEGPT_WATCHLIST", None)
+    script = _SCRIPT.format(modules=ENTRY_POINTS, pages=PAGE_MODULES, heavy=HEAVY_MODULES)
+    # Run without the test stubs, as a fresh process importing the real dependencies would
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", script],
+        cwd=PROJECT_ROOT, env=env, capture_output=True, text=True, timeout=120,
+    )
+    if completed.returncode != 0:
+        pytest.fail(f"importing the entry points failed:\n{completed.stderr[-2000:]}")
+    result = json.loads(completed.stdout.strip().splitlines()[-1])
+
+    assert result["heavy"] == [], f"heavy dependencies imported at startup: {result['heavy']}"
+    assert result["seconds"] < IMPORT_BUDGET_SECONDS, (
+        f"startup imports took {result['seconds']:.2f}s (budget {IMPORT_BUDGET_SECONDS}s); "
+        f"slowest: {_slowest_imports(completed.stderr)}"
+    )
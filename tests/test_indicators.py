@@ -0,0 +1,132 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import core.agent_handler as ah
+from core import indicators as ind
+
+
+def _bars(n=300, seed=0):
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, n)))
+    index = pd.date_range("2024-01-01", periods=n, freq="B")
+    return pd.DataFrame({
+        "Close": close,
+        "High": close * 1.01,
+        "Low": close * 0.99,
+        "Volume": rng.integers(1_000, 5_000, n).astype(float),
+    }, index=index)
+
+
+@pytest.fixture(autouse=True)
+def _fresh_engines():
+    ind.clear_cache()
+    yield
+    ind.clear_cache()
+
+
+def test_indicators_match_pandas_reference():
+    bars = _bars()
+    benchmark = _bars(seed=1)["Close"]
+    result = ind.compute_indicators(bars["Close"], bars["High"], bars["Low"], bars["Volume"], benchmark)
+    close = bars["Close"]
+
+    macd = close.ewm(span=12, adjust=False).mean() - close.ewm(span=26, adjust=False).mean()
+    np.testing.assert_allclose(result["macd"][25:], macd[25:])
+    assert np.isnan(result["macd"][:25]).all()
+
+    delta = close.diff()
+    gain = delta.clip(lower=0).ewm(alpha=1 / 14, adjust=False).mean()
+    loss = (-delta).clip(lower=0).ewm(alpha=1 / 14, adjust=False).mean()
+    np.testing.assert_allclose(result["rsi"][14:], (100 - 100 / (1 + gain / loss))[14:])
+
+    mid, std = close.rolling(20).mean(), close.rolling(20).std(ddof=0)
+    np.testing.assert_allclose(result["bb_upper"], mid + 2 * std)
+
+    typical = (bars["High"] + bars["Low"] + close) / 3
+    vwap = (typical * bars["Volume"]).cumsum() / bars["Volume"].cumsum()
+    np.testing.assert_allclose(result["vwap"], vwap)
+
+    asset, market = close.pct_change(), benchmark.pct_change()
+    beta = asset.rolling(60).cov(market, ddof=0) / market.rolling(60).var(ddof=0)
+    np.testing.assert_allclose(result["beta"], beta, atol=1e-12)
+
+
+def test_matrix_rows_match_single_series():
+    a, b = _bars(seed=2), _bars(seed=3)
+    matrix = ind.compute_indicators(np.vstack([a["Close"], b["Close"]]),
+                                    np.vstack([a["High"], b["High"]]), np.vstack([a["Low"], b["Low"]]))
+    single = ind.compute_indicators(b["Close"], b["High"], b["Low"])
+    for name, values in single.items():
+        np.testing.assert_allclose(matrix[name][1], values)
+    assert matrix["rsi"].shape == (2, len(a))
+
+
+def test_engine_recomputes_only_changed_bars():
+    bars = _bars()
+    columns = dict(close=bars["Close"], high=bars["High"], low=bars["Low"], volume=bars["Volume"])
+    engine = ind.IndicatorEngine()
+    engine.update(**{k: v[:-1] for k, v in columns.items()})
+    appended = engine.update(**columns)
+    assert engine.last_recomputed == 1
+
+    revised = dict(columns, close=bars["Close"].to_numpy() * np.r_[np.ones(len(bars) - 1), 1.05])
+    engine.update(**revised)
+    assert engine.last_recomputed == 1
+    expected = ind.compute_indicators(**revised)
+    for name, values in engine.results().items():
+        np.testing.assert_allclose(values, expected[name])
+    assert set(appended) == set(expected)
+
+    engine.update(**{k: v[:100] for k, v in columns.items()})
+    assert engine.last_recomputed == 100
+
+
+def test_ticker_indicators_depend_only_on_the_given_window():
+    bars = _bars(200)
+    first = ind.ticker_indicators("INFY.NS", bars.iloc[:150])
+    grown = ind.ticker_indicators("INFY.NS", bars.iloc[:151])
+    engine, _ = ind._engines[("INFY.NS", ())]
+    assert engine.last_recomputed == 1
+    np.testing.assert_allclose(grown["rsi"].iloc[:-1], first["rsi"])
+
+    # A slid window gives what a cold engine gives, so prompts do not depend on cache history
+    window = bars.iloc[10:151]
+    moved = ind.ticker_indicators("INFY.NS", window)
+    assert engine is not ind._engines[("INFY.NS", ())][0]
+    cold = ind.compute_indicators(window["Close"], window["High"], window["Low"], window["Volume"])
+    assert list(moved.index) == list(window.index)
+    for name, values in cold.items():
+        np.testing.assert_array_equal(moved[name].to_numpy(), values)
+    assert ind.ticker_indicators("INFY.NS", bars.iloc[0:0]).empty
+
+
+def test_sliding_window_over_the_stored_history_stays_incremental():
+    bars = _bars(200)
+    ind.ticker_indicators("INFY.NS", bars.iloc[:150], since=bars.index[20])
+    engine, _ = ind._engines[("INFY.NS", ())]
+    # Next day: one more bar, and the window start moves on by one
+    slid = ind.ticker_indicators("INFY.NS", bars.iloc[:151], since=bars.index[21])
+    assert ind._engines[("INFY.NS", ())][0] is engine
+    assert engine.last_recomputed == 1
+    assert list(slid.index) == list(bars.index[21:151])
+    history = bars.iloc[:151]
+    cold = ind.compute_indicators(history["Close"], history["High"], history["Low"], history["Volume"])
+    for name, values in cold.items():
+        np.testing.assert_array_equal(slid[name].to_numpy(), values[21:])
+
+
+def test_describe_latest_and_prompt(monkeypatch):
+    indicators = ind.ticker_indicators("TCS.NS", _bars(), _bars(seed=1))
+    text = ind.describe_latest(indicators, last_close=100.0)
+    for label in ("RSI14", "MACD", "Bollinger", "ATR14", "VWAP", "Beta60"):
+        assert label in text
+    assert ind.describe_latest(pd.DataFrame()) == "No technical indicators available."
+    assert ind.benchmark_for("tcs.ns") == "^NSEI" and ind.benchmark_for("AAPL") == "^GSPC"
+
+    monkeypatch.setattr(ah, "fetch_stock_data", lambda _t: (_bars(30), {"currentPrice": 100.0}))
+    monkeypatch.setattr(ah, "fetch_financial_data", lambda _t: None)
+    monkeypatch.setattr(ah, "fetch_stock_news", lambda _t: [])
+    monkeypatch.setattr(ah, "fetch_technicals", lambda _t: indicators)
+    prompt = ah.build_recommendation_prompt("TCS.NS", concurrent=False)
+    assert f"Technical Indicators: {text}" in prompt
@@ -0,0 +1,70 @@
+import types
+
+import core.llm_client as llm
+
+
+class CountingModel:
+    calls = []
+
+    def __init__(self, model_name, *_a, **_k):
+        self.model_name = model_name
+
+    def generate_content(self, prompt):
+        CountingModel.calls.append((self.model_name, prompt))
+        return types.SimpleNamespace(text=f"reply {len(CountingModel.calls)}")
+
+
+def test_identical_prompts_hit_the_cache(monkeypatch):
+    CountingModel.calls = []
+    monkeypatch.setattr(llm.genai, 'GenerativeModel', CountingModel)
+
+    first = llm.generate_text("gemini-2.0-flash", "\n    Analyse   INFY\n    now\n")
+    # Same prompt up to indentation and spacing
+    second = llm.generate_text("gemini-2.0-flash", "Analyse INFY\nnow")
+    other_model = llm.generate_text("gemini-1.5-flash", "Analyse INFY\nnow")
+
+    assert first == second == "reply 1"
+    assert other_model == "reply 2"
+    stats = llm.llm_cache_stats()
+    assert stats["hits"] == 1 and stats["misses"] == 2
+
+
+def test_cache_bypass(monkeypatch):
+    CountingModel.calls = []
+    monkeypatch.setattr(llm.genai, 'GenerativeModel', CountingModel)
+
+    llm.generate_text("m", "p")
+    assert llm.generate_text("m", "p", use_cache=False) == "reply 2"
+    monkeypatch.setenv("FINANCEGPT_LLM_CACHE", "0")
+    assert llm.generate_text("m", "p") == "reply 3"
+
+
+def test_cache_survives_a_new_cache_object(monkeypatch):
+    CountingModel.calls = []
+    monkeypatch.setattr(llm.genai, 'GenerativeModel', CountingModel)
+    llm.generate_text("m", "persist me")
+    monkeypatch.setattr(llm, '_response_cache', None)
+    assert llm.generate_text("m", "persist me") == "reply 1"
+    assert len(CountingModel.calls) == 1
+
+
+class StreamingModel:
+    def __init__(self, *_a, **_k):
+        pass
+
+    def generate_content(self, prompt, stream=False):
+        assert stream
+        return [types.SimpleNamespace(text=part) for part in ("## Recommendation:", " Buy", "\nStrong results")]
+
+
+def test_stream_text_yields_chunks_and_caches_complete_responses(monkeypatch):
+    monkeypatch.setattr(llm.genai, 'GenerativeModel', StreamingModel)
+    chunks = list(llm.stream_text("m", "stream me"))
+    assert chunks == ["## Recommendation:", " Buy", "\nStrong results"]
+    assert llm.generate_text("m", "stream me") == "".join(chunks)
+
+    # An abandoned stream is not cached
+    stream = llm.stream_text("m", "abandon me")
+    next(stream)
+    stream.close()
+    assert list(llm.stream_text("m", "abandon me")) == chunks
@@ -0,0 +1,54 @@
+import pytest
+
+import app.page_cache as page_cache
+import services.data_fetcher as df
+
+
+@pytest.fixture(autouse=True)
+def session(monkeypatch):
+    state = {}
+    monkeypatch.setattr(page_cache.st, "session_state", state, raising=False)
+    return state
+
+
+def test_memo_is_per_key_and_skips_none():
+    calls = []
+    def load(value):
+        calls.append(value)
+        return value
+    page_cache.begin_run()
+    assert page_cache.memo("data", "infy", lambda: load("a")) == "a"
+    assert page_cache.memo("data", "INFY ", lambda: load("b")) == "a"
+    assert page_cache.memo("data", "TCS", lambda: load(None)) is None
+    assert page_cache.memo("data", "TCS", lambda: load("c")) == "c"
+    assert calls == ["a", None, "c"]
+    report = page_cache.run_report()
+    assert (report["hits"], report["entries"]) == (1, 2)
+    assert [label for label, _ in report["timings"]] == ["data:infy (load)", "data:TCS (load)", "data:TCS (load)"]
+
+
+def test_expiry_and_invalidation(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(page_cache.time, "time", lambda: now[0])
+    page_cache.put("data", "INFY", 1)
+    page_cache.put("table", "INFY", 2)
+    page_cache.put("llm", "INFY", 3)
+    page_cache.put("llm", "TCS", 4)
+    now[0] += page_cache.NAMESPACE_TTLS["data"] + 1
+    assert page_cache.get("data", "INFY") is None
+    assert page_cache.get("llm", "INFY") == 3  # LLM answers stay until invalidated
+    assert page_cache.invalidate(key="infy") == 2
+    assert page_cache.get("llm", "TCS") == 4
+    assert page_cache.invalidate() == 1
+
+
+def test_refresh_ticker_drops_shared_cache_entries(monkeypatch):
+    from app.stock_analysis import refresh_ticker
+    df._cache.set(("info", "INFY"), {"currentPrice": 1})
+    df._cache.set(("history", "INFY", "1y"), "frame")
+    df._cache.set(("info", "TCS"), {"currentPrice": 2})
+    page_cache.put("data", "INFY", ("frame", {}))
+    refresh_ticker("infy")
+    assert df._cache.get(("info", "INFY")) is None and df._cache.get(("history", "INFY", "1y")) is None
+    assert df._cache.get(("info", "TCS")) == {"currentPrice": 2}
+    assert page_cache.get("data", "INFY") is None
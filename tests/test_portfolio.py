@@ -0,0 +1,126 @@
+from datetime import date
+
+import pandas as pd
+import pytest
+
+import core.portfolio as pf
+from core.transactions import BSE_TRADE, SPEND, Transaction
+
+
+def _trade(day, quantity, amount, code="500325", side=None):
+    return Transaction(date=day, category=BSE_TRADE, amount=amount, merchant=f"Scrip {code}",
+                       quantity=quantity, security_code=code, side=side)
+
+
+TRADES = [
+    _trade(date(2025, 1, 6), 10, 1000.0),                  # 10 @ 100
+    _trade(date(2025, 1, 11), 10, 1200.0, side="buy"),     # Saturday, 10 @ 120
+    _trade(date(2025, 1, 15), 15, 1950.0, side="sell"),    # 15 @ 130
+    _trade(date(2025, 1, 8), 4, 2000.0, code="500570"),    # 4 @ 500
+    Transaction(date=date(2025, 1, 7), category=SPEND, amount=550.0, merchant="Swiggy"),
+]
+
+
+def _prices():
+    index = pd.bdate_range("2025-01-06", "2025-01-17", tz="Asia/Kolkata")
+    return {
+        "500325.BO": pd.DataFrame({"Close": [100.0 + i for i in range(len(index))]}, index=index),
+        "500570.BO": pd.DataFrame({"Close": [500.0] * 5 + [550.0] * 5}, index=index),
+    }
+
+
+def test_fifo_lots_and_realised_pnl():
+    portfolio = pf.Portfolio(TRADES)
+    assert portfolio.symbols == ["500325.BO", "500570.BO"]
+    assert len(portfolio) == 4
+
+    lots = portfolio.open_lots()
+    reliance = lots[lots["symbol"] == "500325.BO"]
+    assert list(reliance["quantity"]) == [5.0]
+    assert list(reliance["price"]) == [120.0]
+    # 10 closed at +30 from the first lot, 5 at +10 from the second
+    assert portfolio.realised_pnl()["500325.BO"] == pytest.approx(350.0)
+    assert [r.quantity for r in portfolio.realisations] == [10.0, 5.0]
+
+
+def test_holdings_and_equity_curve():
+    portfolio = pf.Portfolio(TRADES)
+    prices = pf.price_matrix(_prices(), portfolio.symbols)
+    holdings = portfolio.holdings(prices.iloc[-1])
+    assert holdings.loc["500325.BO", "cost_basis"] == pytest.approx(600.0)
+    assert holdings.loc["500325.BO", "market_value"] == pytest.approx(5 * 109.0)
+    assert holdings.loc["500570.BO", "unrealised"] == pytest.approx(4 * 50.0)
+
+    curve = portfolio.equity_curve(prices)
+    # The Saturday buy lands on Monday the 13th
+    assert curve.loc["2025-01-10", "market_value"] == pytest.approx(10 * 104.0 + 4 * 500.0)
+    assert curve.loc["2025-01-13", "market_value"] == pytest.approx(20 * 105.0 + 4 * 550.0)
+    last = curve.iloc[-1]
+    assert last["realised"] == pytest.approx(350.0)
+    assert last["total_pnl"] == pytest.approx(last["unrealised"] + 350.0)
+    assert last["net_invested"] == pytest.approx(1000 + 1200 + 2000 - 1950)
+
+
+def test_xirr_and_oversell(capsys):
+    assert pf.xirr([date(2024, 1, 1), date(2024, 12, 31)], [-100.0, 110.0]) == pytest.approx(0.10, abs=1e-6)
+    assert pf.xirr([date(2024, 1, 1)], [-100.0]) is None
+
+    portfolio = pf.Portfolio([_trade(date(2025, 1, 6), 5, 500.0), _trade(date(2025, 1, 7), 8, 880.0, side="sell")])
+    assert "exceeds" in capsys.readouterr().out
+    assert portfolio.realised_pnl()["500325.BO"] == pytest.approx(5 * 10.0)
+    assert portfolio.open_lots().empty
+
+
+def test_analyse_portfolio_fetches_prices_in_one_call(monkeypatch):
+    calls = []
+
+    def fake_bulk(tickers, period="1mo"):
+        calls.append((tuple(tickers), period))
+        return _prices()
+
+    monkeypatch.setattr(pf, "fetch_bulk_history", fake_bulk)
+    report = pf.analyse_portfolio(TRADES, today=date(2025, 1, 17))
+    assert calls == [(("500325.BO", "500570.BO"), "1mo")]
+    totals = report["totals"]
+    assert totals["realised"] == pytest.approx(350.0)
+    assert totals["market_value"] == pytest.approx(5 * 109.0 + 4 * 550.0)
+    assert totals["xirr"] is not None
+    assert pf.analyse_portfolio([TRADES[-1]]) is None
+    assert pf.symbol_for(_trade(date(2025, 1, 1), 1, 1.0, code="reliance")) == "RELIANCE.NS"
+    assert pf.history_period(date(2020, 2, 1), today=date(2025, 1, 1)) == "5y"
+
+
+def test_trades_before_a_bonus_are_restated_on_the_adjusted_basis(monkeypatch):
+    index = pd.bdate_range("2025-01-06", "2025-01-17", tz="Asia/Kolkata")
+    # 1:1 bonus with ex-date Jan 13; Yahoo halves every earlier close
+    history = pd.DataFrame({"Close": [50.0] * len(index), "Stock Splits": 0.0}, index=index)
+    history.loc[index[5], "Stock Splits"] = 2.0
+    monkeypatch.setattr(pf, "fetch_bulk_history", lambda tickers, period="1mo": {"500325.BO": history})
+    trades = [_trade(date(2025, 1, 6), 10, 1000.0),               # 10 @ 100 before the bonus
+              _trade(date(2025, 1, 15), 5, 275.0, side="sell")]  # 5 @ 55 after it
+
+    report = pf.analyse_portfolio(trades, today=date(2025, 1, 17))
+    holding = report["holdings"].loc["500325.BO"]
+    assert (holding["quantity"], holding["avg_cost"]) == (15.0, 50.0)
+    assert holding["unrealised"] == pytest.approx(0.0)
+    assert report["totals"]["realised"] == pytest.approx(5 * 5.0)
+    assert report["equity_curve"].loc["2025-01-10", "market_value"] == pytest.approx(20 * 50.0)
+
+
+def test_a_dividend_between_buy_and_valuation_keeps_the_quoted_price(monkeypatch):
+    index = pd.bdate_range("2025-01-06", "2025-01-17", tz="Asia/Kolkata")
+    # Rs 10 dividend with ex-date Jan 13: the stock trades at 110 before it and 100 after;
+    # Yahoo scales the earlier closes by 1 - 10 / 110
+    quoted = pd.Series([110.0] * 5 + [100.0] * 5, index=index)
+    history = pd.DataFrame({"Close": quoted, "Dividends": 0.0, "Stock Splits": 0.0}, index=index)
+    history.loc[index[:5], "Close"] *= 1 - 10.0 / 110.0
+    history.loc[index[5], "Dividends"] = 10.0
+    monkeypatch.setattr(pf, "fetch_bulk_history", lambda tickers, period="1mo": {"500325.BO": history})
+    trades = [_trade(date(2025, 1, 6), 10, 1100.0)]   # 10 @ 110 before the dividend
+
+    report = pf.analyse_portfolio(trades, today=date(2025, 1, 17))
+    curve = report["equity_curve"]
+    assert curve.loc["2025-01-06", "market_value"] == pytest.approx(1100.0)
+    assert curve.loc["2025-01-17", "market_value"] == pytest.approx(1000.0)
+    assert report["holdings"].loc["500325.BO", "avg_cost"] == pytest.approx(110.0)
+    assert pf.unadjusted_closes(history).to_numpy() == pytest.approx(quoted.to_numpy())
@@ -0,0 +1,110 @@
+import threading
+import time
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
+import services.data_fetcher as df
+from services import prefetch
+from services.prefetch import PrefetchScheduler, is_market_open
+
+FAST = {"info": 0.05, "history": 0.05, "fundamentals": 0.05, "news": 0.05}
+
+
+def _wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+def test_scheduler_warms_cache_for_fetchers(monkeypatch):
+    calls = []
+    for kind in FAST:
+        monkeypatch.setitem(df._LOADERS, kind, lambda t, kind=kind: calls.append((kind, t)) or {"kind": kind})
+
+    class ColdTicker:
+        def __init__(self, *_a, **_k):
+            raise AssertionError("should be served from the warm cache")
+
+    with PrefetchScheduler(["infy.ns"], intervals=FAST, market_hours=False, startup_spread=0) as scheduler:
+        assert _wait_for(lambda: {kind for kind, _ in calls} == set(FAST))
+        # Refreshes keep repeating on their interval
+        assert _wait_for(lambda: len(calls) > 2 * len(FAST))
+        assert scheduler.tickers == ["INFY.NS"]
+    monkeypatch.setattr(df.yf, "Ticker", ColdTicker)
+    assert df.fetch_stock_info("INFY.NS") == {"kind": "info"}
+    assert df.fetch_financial_data("INFY.NS") == {"kind": "fundamentals"}
+
+
+def test_scheduler_limits_concurrency_and_stops_cleanly(monkeypatch):
+    active, peak, lock = [0], [0], threading.Lock()
+
+    def slow_loader(_ticker):
+        with lock:
+            active[0] += 1
+            peak[0] = max(peak[0], active[0])
+        time.sleep(0.02)
+        with lock:
+            active[0] -= 1
+        return {}
+
+    for kind in FAST:
+        monkeypatch.setitem(df._LOADERS, kind, slow_loader)
+    scheduler = PrefetchScheduler([f"T{i}" for i in range(6)], intervals=FAST, max_concurrent=2,
+                                  market_hours=False, startup_spread=0).start()
+    assert _wait_for(lambda: scheduler.stats()["refreshes"] >= 20)
+    scheduler.stop()
+    done = scheduler.stats()["refreshes"]
+    time.sleep(0.2)
+    assert peak[0] <= 2
+    assert active[0] == 0
+    assert scheduler.stats()["refreshes"] == done
+
+
+def test_removing_and_re_adding_a_ticker_does_not_double_its_schedule(monkeypatch):
+    calls = []
+    for kind in FAST:
+        monkeypatch.setitem(df._LOADERS, kind, lambda t, kind=kind: calls.append((kind, t)) or {})
+    slow = {kind: 60 for kind in FAST}
+    scheduler = PrefetchScheduler(["INFY.NS"], intervals=slow, market_hours=False, startup_spread=0)
+    scheduler.remove("INFY.NS")
+    scheduler.add("INFY.NS")
+    with scheduler:
+        assert _wait_for(lambda: len(calls) >= len(FAST))
+        time.sleep(0.2)
+        assert sorted(calls) == sorted((kind, "INFY.NS") for kind in FAST)
+        assert scheduler.stats()["queued"] == len(FAST)
+
+
+def test_failed_refresh_keeps_previous_entry(monkeypatch):
+    df._cache.set(df._cache_key("news", "TCS.NS"), [{"title": "old"}], ttl=60)
+    monkeypatch.setitem(df._LOADERS, "news", lambda _t: None)
+    assert df.refresh("news", "TCS.NS") is None
+    assert df.fetch_stock_news("TCS.NS") == [{"title": "old"}]
+
+
+def test_market_hours_by_exchange():
+    ist = ZoneInfo("Asia/Kolkata")
+    monday_morning = datetime(2025, 6, 2, 10, 0, tzinfo=ist)
+    assert is_market_open("INFY.NS", monday_morning)
+    assert not is_market_open("AAPL", monday_morning)  # 00:30 in New York
+    assert not is_market_open("INFY.NS", datetime(2025, 6, 2, 15, 30, tzinfo=ist))
+    assert not is_market_open("INFY.NS", datetime(2025, 6, 1, 10, 0, tzinfo=ist))  # Sunday
+
+
+def test_watchlist_from_environment(monkeypatch):
+    for kind in FAST:
+        monkeypatch.setitem(df._LOADERS, kind, lambda _t: {})
+    monkeypatch.setenv("FINANCEGPT_WATCHLIST", "INFY.NS, TCS.NS")
+    try:
+        scheduler = prefetch.start_watchlist_prefetch()
+        assert scheduler.tickers == ["INFY.NS", "TCS.NS"]
+        assert prefetch.start_watchlist_prefetch(["RELIANCE.NS"]) is scheduler
+        assert prefetch.prefetch_stats()["tickers"] == 3
+    finally:
+        prefetch.stop_watchlist_prefetch()
+    assert prefetch.prefetch_stats() == {}
+    monkeypatch.delenv("FINANCEGPT_WATCHLIST")
+    assert prefetch.start_watchlist_prefetch() is None
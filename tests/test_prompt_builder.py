@@ -0,0 +1,41 @@
+import numpy as np
+import pandas as pd
+
+import core.prompt_builder as pb
+
+
+def _history(days=22):
+    index = pd.date_range("2025-04-01", periods=days, freq="B")
+    close = np.linspace(100, 121, days)
+    return pd.DataFrame({
+        "Open": close - 1, "High": close + 2, "Low": close - 2, "Close": close,
+        "Volume": np.r_[np.resize([900_000.0, 1_100_000.0], days - 1), 3_000_000.0],
+        "Dividends": 0.0, "Stock Splits": 0.0,
+    }, index=index)
+
+
+def test_history_features():
+    features = pb.history_features(_history())
+    assert features["bars"] == 22
+    assert np.isclose(features["return_period"], 0.21)
+    assert features["sma_trend"] == "bullish"
+    assert features["max_drawdown"] == 0
+    assert features["volume_z"] > 0
+    assert features["period_high"] == 123
+
+
+def test_encode_history_respects_budget_and_beats_raw_table():
+    history = _history()
+    raw_tokens = pb.estimate_tokens(history.astype(str).to_string())
+    for budget in (60, 120, 400):
+        text = pb.encode_history(history, token_budget=budget)
+        assert pb.estimate_tokens(text) <= budget
+    text = pb.encode_history(history, token_budget=120)
+    assert "121.00" in text  # most recent close is kept first
+    assert pb.estimate_tokens(text) < raw_tokens / 3
+
+
+def test_encode_history_handles_short_and_empty_frames():
+    assert pb.encode_history(pd.DataFrame()) == "No price history available."
+    text = pb.encode_history(pd.DataFrame({"Close": [1, 2, 3]}))
+    assert "3 daily bars" in text
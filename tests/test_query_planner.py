@@ -0,0 +1,63 @@
+from datetime import date
+
+import core.gmail_agent as ga
+import core.query_planner as qp
+from core.transactions import INVESTMENT, SPEND
+
+TODAY = date(2025, 5, 31)  # a Saturday
+
+
+def test_relative_and_named_date_ranges():
+    assert qp.parse_date_range("Zomato orders last week", TODAY) == (date(2025, 5, 19), date(2025, 5, 25))
+    assert qp.parse_date_range("SIPs this quarter", TODAY) == (date(2025, 4, 1), TODAY)
+    assert qp.parse_date_range("spends last month", TODAY) == (date(2025, 4, 1), date(2025, 4, 30))
+    assert qp.parse_date_range("how much on food in May?", TODAY) == (date(2025, 5, 1), date(2025, 5, 31))
+    assert qp.parse_date_range("trades in December", TODAY) == (date(2024, 12, 1), date(2024, 12, 31))
+    assert qp.parse_date_range("payments last 7 days", TODAY) == (date(2025, 5, 25), TODAY)
+    assert qp.parse_date_range("may I see everything", TODAY) == (None, None)
+
+
+def test_plans_and_gmail_queries():
+    plan = qp.plan_query("Zomato orders last week", today=TODAY)
+    assert (plan.categories, plan.merchant) == ((SPEND,), "Zomato")
+    assert qp.to_gmail_query(plan) == "Zomato after:2025/05/19 before:2025/05/26"
+
+    plan = qp.plan_query("SIPs this quarter", today=TODAY)
+    assert plan.categories == (INVESTMENT,)
+    assert qp.to_gmail_query(plan).endswith("after:2025/04/01 before:2025/06/01")
+
+    everything = qp.plan_query("financial data for BSE Trades, Investments and spends for this month", today=TODAY)
+    assert everything.categories == () and everything.start == date(2025, 5, 1)
+    assert qp.plan_query("what should I cook tonight?", today=TODAY) is None
+
+
+def test_a_category_keyword_alone_is_left_to_the_llm():
+    assert qp.plan_query("Should I invest in Reliance?", today=TODAY) is None
+    assert qp.plan_query("which stocks look cheap?", today=TODAY) is None
+    assert qp.plan_query("total invested in funds", today=TODAY).categories == (INVESTMENT,)
+
+
+def test_aggregate_questions_are_answered_locally(monkeypatch):
+    def no_llm(*_a, **_k):
+        raise AssertionError("LLM should not be called")
+    monkeypatch.setattr(ga, 'generate_text', no_llm)
+
+    answer = ga.answer_financial_question("how much on food in May?")
+    assert answer["total"] == 550.0 and answer["count"] == 1
+    assert answer["text"].startswith("Spends on Food, May 01 – May 31, 2025: ₹550.00")
+
+    grouped = ga.answer_financial_question("spends by merchant this month")
+    assert grouped["total"] == 5800.0
+    assert list(grouped["breakdown"])[0] == "Flipkart"
+    assert "after:2025/05/01" in ga.build_gmail_search_query("investments this month")
+
+
+def test_unparsed_questions_use_gemini_then_the_fallback(monkeypatch):
+    monkeypatch.setattr(ga, 'generate_text', lambda _m, _p: '"label:receipts newer_than:7d"')
+    assert ga.build_gmail_search_query("what came from my landlord?") == "label:receipts newer_than:7d"
+    assert ga.answer_financial_question("what came from my landlord?") is None
+
+    def failing(*_a, **_k):
+        raise RuntimeError("quota")
+    monkeypatch.setattr(ga, 'generate_text', failing)
+    assert ga.build_gmail_search_query("what came from my landlord?") == ga.FALLBACK_GMAIL_QUERY
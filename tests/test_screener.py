@@ -0,0 +1,100 @@
+import numpy as np
+import pytest
+
+import core.screener as sc
+import services.data_fetcher as df
+from core import batch
+
+INFOS = {
+    "INFY.NS": {"shortName": "Infosys", "sectorDisp": "Technology", "trailingPE": 18.0,
+                "returnOnEquity": 0.31, "revenueGrowth": 0.05, "marketCap": 6.5e12, "dividendYield": 2.8},
+    "TCS.NS": {"shortName": "TCS", "sectorDisp": "Technology", "trailingPE": 25.0,
+               "returnOnEquity": 0.50, "revenueGrowth": 0.07, "marketCap": 1.3e13, "dividendYield": 1.9},
+    "SBIN.NS": {"shortName": "SBI", "sectorDisp": "Financial Services", "trailingPE": 9.0,
+                "returnOnEquity": 0.18, "revenueGrowth": 0.12, "marketCap": 7.0e12, "dividendYield": 1.6},
+    "IDEA.NS": {"shortName": "Vodafone Idea", "sectorDisp": "Communication", "trailingPE": "Infinity",
+                "returnOnEquity": None, "revenueGrowth": 0.02, "marketCap": 5.0e11},
+    "ITC.NS": {"shortName": "ITC", "sectorDisp": "Consumer Defensive", "trailingPE": 15.0,
+               "returnOnEquity": 0.28, "marketCap": 5.5e12, "dividendYield": 3.4},
+}
+
+
+def _cache(infos):
+    for ticker, info in infos.items():
+        df._cache.set(df._cache_key("info", ticker), info)
+
+
+def test_parse_query_units_and_errors():
+    condition, order = sc.parse_query("PE < 20 and ROE > 15%, top 20 by revenueGrowth")
+    assert condition == ("and", ("compare", "trailingPE", "<", ("value", 20.0)),
+                         ("compare", "returnOnEquity", ">", ("value", 0.15)))
+    assert order == ("revenueGrowth", True, 20)
+    assert sc.parse_query("yield >= 2%")[0][3] == ("value", 2.0)
+    assert sc.parse_query("mcap between 1000cr and 2bn")[0] == ("between", "marketCap", 1e10, 2e9)
+    assert sc.parse_query("sort by pb asc limit 5") == (None, ("priceToBook", False, 5))
+
+    for bad in ("foo > 1", "pe >", "sector > 3", "pe == 'x'", "pe < 20 top", "top 5 by sector"):
+        with pytest.raises(ValueError):
+            sc.parse_query(bad)
+
+
+def test_query_filters_sorts_and_ranks():
+    _cache(INFOS)
+    screener = sc.Screener(INFOS)
+    assert screener.refresh() == {"updated": 5, "unchanged": 0, "fetched": 0, "missing": 0}
+
+    result = screener.query("PE < 20 and ROE > 15%, top 20 by revenueGrowth")
+    # ITC has no revenue growth and IDEA's infinite PE never matches
+    assert list(result.index) == ["SBIN.NS", "INFY.NS"]
+    assert list(result["rank"]) == [1, 2]
+    assert list(result.columns) == ["rank", "shortName", "trailingPE", "returnOnEquity", "revenueGrowth"]
+
+    tech_or_yield = screener.shortlist('sector = "technology" or yield > 3%, sort by mcap desc')
+    assert tech_or_yield == ["TCS.NS", "INFY.NS", "ITC.NS"]
+    assert screener.shortlist("not (pe < 20), bottom 1 by pe") == ["TCS.NS"]
+    assert screener.shortlist("roe > pe") == []
+    assert screener.shortlist("limit 2") == ["INFY.NS", "TCS.NS"]
+    assert np.isnan(screener.frame(["pe"]).loc["IDEA.NS", "trailingPE"])
+
+
+def test_refresh_rewrites_only_changed_entries(monkeypatch):
+    _cache({k: v for k, v in INFOS.items() if k != "ITC.NS"})
+    screener = sc.Screener(INFOS)
+    assert screener.refresh()["missing"] == 1
+    assert screener.refresh()["unchanged"] == 4
+
+    _cache({"TCS.NS": dict(INFOS["TCS.NS"], trailingPE=19.0)})
+    fetched = []
+
+    def fake_fetch(ticker):
+        fetched.append(ticker)
+        return INFOS[ticker]
+
+    monkeypatch.setattr(sc, "fetch_stock_info", fake_fetch)
+    assert screener.refresh(fetch_missing=True) == {"updated": 1, "unchanged": 3, "fetched": 1, "missing": 0}
+    assert fetched == ["ITC.NS"]
+    assert "TCS.NS" in screener.shortlist("pe < 20")
+
+    # Rows outlive their cache entries; many rows grow the columns in place
+    df.clear_cache()
+    assert screener.refresh()["unchanged"] == 5
+    for i in range(40):
+        screener.update(f"T{i}.NS", {"trailingPE": i})
+    assert len(screener) == 45
+    assert screener.shortlist("pe < 2, sort by pe") == ["T0.NS", "T1.NS"]
+
+
+def test_batch_screen_sends_only_the_shortlist(monkeypatch, tmp_path):
+    _cache(INFOS)
+    seen = []
+
+    def fake_run_batch(tickers, output_path=None, **_kwargs):
+        seen.extend(tickers)
+        return iter(())
+
+    monkeypatch.setattr(batch, "run_batch", fake_run_batch)
+    batch.main(list(INFOS) + ["--screen", "roe > 20%, top 2 by roe", "--out", str(tmp_path / "out.jsonl")])
+    assert seen == ["TCS.NS", "INFY.NS"]
+
+    with pytest.raises(SystemExit):
+        batch.main(["INFY.NS", "--screen", "pe <"])
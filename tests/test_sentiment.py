@@ -7,3 +7,75 @@ def test_analyze_sentiment_defaults_to_neutral():
     assert sentiment in {"neutral", "positive", "negative"}
 
 
+
+
+def test_pipeline_is_loaded_once_and_scores_in_batches(monkeypatch):
+    loads, calls = [], []
+    def fake_pipeline(_task, **kwargs):
+        loads.append(kwargs)
+        def _analyze(texts, **call_kwargs):
+            calls.append((list(texts), call_kwargs))
+            return [{"label": "Positive" if "up" in t else "Negative", "score": 0.9} for t in texts]
+        return _analyze
+
+    monkeypatch.setattr(sa, 'pipeline', fake_pipeline)
+    monkeypatch.setattr(sa, '_sentiment_analyzer', None)
+    articles = [{"title": "Shares up", "content": "Strong quarter"}, {"title": "Guidance cut"}]
+
+    assert sa.analyze_sentiment(articles, use_cache=False) in {"positive", "negative"}
+    labels, scores = sa.score_articles(articles, batch_size=8, include_content=True, use_cache=False)
+
+    assert len(loads) == 1
+    assert len(calls) == 2
+    assert calls[1][0] == ["Shares up. Strong quarter", "Guidance cut"]
+    assert calls[1][1]["batch_size"] == 8 and calls[1][1]["truncation"] is True
+    assert labels == ["positive", "negative"]
+    assert scores == [0.9, 0.9]
+
+
+def test_analyze_sentiment_batch_returns_per_ticker_arrays():
+    result = sa.analyze_sentiment_batch({
+        "INFY": [{"title": "a"}, {"title": "b"}],
+        "TCS": [],
+    })
+    assert result["INFY"]["labels"] == ["neutral", "neutral"]
+    assert result["INFY"]["scores"] == [0.5, 0.5]
+    assert result["TCS"] == {"sentiment": "neutral", "labels": [], "scores": []}
+
+
+def test_scores_are_cached_on_disk_across_instances(monkeypatch, tmp_path):
+    calls = []
+    def counting_analyzer(texts, **_kwargs):
+        calls.append(list(texts))
+        return [{"label": "Positive", "score": 0.8} for _ in texts]
+
+    monkeypatch.setattr(sa, '_sentiment_analyzer', counting_analyzer)
+    monkeypatch.setenv('FINANCEGPT_CACHE_DIR', str(tmp_path))
+    monkeypatch.setattr(sa, '_sentiment_cache', None)
+    articles = [{"title": "Record profit"}, {"title": "Record profit"}, {"title": "New CEO"}]
+
+    assert sa.score_articles(articles) == (["positive"] * 3, [0.8] * 3)
+    assert calls == [["Record profit", "New CEO"]]
+
+    # A fresh process-level cache object reads the same file
+    monkeypatch.setattr(sa, '_sentiment_cache', None)
+    sa.score_articles(articles + [{"title": "Buyback"}])
+    assert calls[-1] == ["Buyback"]
+    assert sa.sentiment_cache_stats()["inferences_saved"] == 2
+
+
+def test_disk_cache_expires_and_evicts(tmp_path, monkeypatch):
+    from services.cache import DiskCache
+    now = [1000.0]
+    monkeypatch.setattr('services.cache.time.time', lambda: now[0])
+    cache = DiskCache(str(tmp_path / "c.sqlite"), max_age=60, max_entries=2)
+    cache.set_many({"a": 1, "b": 2})
+    now[0] += 1
+    cache.get("a")
+    cache.set("c", 3)
+    cache.prune()
+    assert set(cache.get_many(["a", "b", "c"])) == {"a", "c"}
+    now[0] += 120
+    assert cache.get("a") is None
+    cache.prune()
+    assert len(cache) == 0
@@ -0,0 +1,60 @@
+import pytest
+
+import services.data_fetcher as df
+from config import settings as cfg
+
+
+def test_layers_apply_in_order_and_coerce_strings():
+    yaml_layer = {"cache": {"ttls": {"info": 30}}, "providers": {"default": {"read_timeout": 20}}}
+    env_file_layer = cfg._variables_layer({"NEWS_API_KEY": "from-dotenv", "FINANCEGPT__CACHE__TTLS__INFO": "15"})
+    environment = cfg._variables_layer({"FINANCEGPT__PROVIDERS__NEWSAPI__RATE": "0.5",
+                                        "FINANCEGPT_LLM_CACHE": "off", "FINANCEGPT_WATCHLIST": "INFY.NS, TCS.NS"})
+    settings = cfg.build_settings(yaml_layer, env_file_layer, environment)
+
+    assert settings.cache.ttls == {"info": 15, "history": 900, "fundamentals": 86400, "news": 600}
+    newsapi = settings.provider("newsapi")
+    assert (newsapi.api_key, newsapi.rate, newsapi.burst, newsapi.read_timeout) == ("from-dotenv", 0.5, 5, 20)
+    # Providers inherit "default"; unknown ones get it outright
+    assert settings.provider("gmail").read_timeout == 20
+    assert settings.provider("nope") is settings.providers["default"]
+    assert settings.llm.cache_enabled is False
+    assert settings.prefetch.watchlist == ["INFY.NS", "TCS.NS"]
+
+    with pytest.raises(ValueError, match="batch.workers"):
+        cfg.build_settings(cfg._variables_layer({"FINANCEGPT__BATCH__WORKERS": "many"}))
+
+
+def test_get_settings_is_memoised_until_the_environment_changes(tmp_path, monkeypatch):
+    config = tmp_path / "config.yaml"
+    config.write_text("llm:\n  summary_model: gemini-test\nbatch:\n  workers: 7\n")
+    monkeypatch.setenv("FINANCEGPT_CONFIG", str(config))
+    first = cfg.get_settings()
+    assert (first.llm.summary_model, first.batch.workers) == ("gemini-test", 7)
+    assert cfg.get_settings() is first
+
+    # The file is not re-read, but environment overrides still apply
+    config.write_text("batch:\n  workers: 9\n")
+    monkeypatch.setenv("FINANCEGPT__BATCH__WORKERS", "11")
+    assert cfg.get_settings().batch.workers == 11
+    monkeypatch.delenv("FINANCEGPT__BATCH__WORKERS")
+    assert cfg.get_settings().batch.workers == 7
+    assert cfg.load_yaml()["llm"] == {"summary_model": "gemini-test"}
+
+    cfg.reload_settings()
+    assert cfg.get_settings().batch.workers == 9
+
+
+def test_fundamentals_use_the_configured_alpha_vantage_key(monkeypatch):
+    keys = []
+
+    class RecordingFD:
+        def __init__(self, api_key):
+            keys.append(api_key)
+
+        def get_company_overview(self, ticker):
+            return {"Symbol": ticker}, None
+
+    monkeypatch.setattr(df, "FundamentalData", RecordingFD)
+    monkeypatch.setenv("ALPHAVANTAGE_API_KEY", "av-key")
+    assert df._fetch_financial_data("IBM") == {"Symbol": "IBM"}
+    assert keys == ["av-key"]
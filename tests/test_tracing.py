@@ -0,0 +1,107 @@
+import json
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import core.agent_handler as ah
+import services.data_fetcher as df
+from core import tracing
+
+
+@pytest.fixture
+def traces(tmp_path):
+    path = tmp_path / "spans.jsonl"
+    tracing.reset()
+    tracing.enable(str(path))
+    try:
+        yield path
+    finally:
+        tracing.disable()
+        tracing.reset()
+
+
+def _by_name(spans):
+    return {s["name"]: s for s in spans}
+
+
+def test_disabled_tracing_is_a_no_op():
+    assert not tracing.is_enabled()
+    with tracing.span("anything", size=3) as span:
+        span.set(more=1)
+    assert not span
+    assert tracing.span("other") is span
+    assert tracing.bind(len) is len
+    assert "anything" not in tracing.span_stats()
+
+
+def _worker():
+    with tracing.span("worker"):
+        pass
+
+
+def test_nested_spans_cross_threads_and_export(traces):
+    with tracing.span("outer", ticker="INFY") as outer:
+        with tracing.span("inner"):
+            pass
+        with ThreadPoolExecutor(max_workers=1) as pool:
+            pool.submit(tracing.bind(_worker)).result()
+        outer.set(items=2)
+    with pytest.raises(RuntimeError):
+        with tracing.span("failing"):
+            raise RuntimeError("boom")
+
+    spans = _by_name(tracing.recent_spans())
+    outer_id = spans["outer"]["span_id"]
+    assert spans["inner"]["parent_id"] == outer_id
+    assert spans["worker"]["parent_id"] == outer_id
+    assert spans["outer"]["attrs"] == {"ticker": "INFY", "items": 2}
+    assert "boom" in spans["failing"]["error"]
+
+    lines = [json.loads(line) for line in traces.read_text().splitlines()]
+    assert [line["name"] for line in lines] == ["inner", "worker", "outer", "failing"]
+
+    text = tracing.render_prometheus()
+    assert 'financegpt_span_seconds_count{span="outer"} 1' in text
+    assert 'financegpt_span_seconds_bucket{span="inner",le="+Inf"} 1' in text
+    assert 'financegpt_span_errors_total{span="failing"} 1' in text
+
+
+def test_recommendation_trace_covers_fetch_prompt_and_llm(traces, monkeypatch):
+    monkeypatch.setenv("FINANCEGPT_HISTORY_STORE", "0")
+
+    class PricedTicker:
+        def __init__(self, *_a, **_k):
+            self.info = {"currentPrice": 123}
+
+        def history(self, period="1mo"):
+            import pandas as pd
+            return pd.DataFrame({"Close": [1, 2, 3]})
+
+    monkeypatch.setattr(df.yf, "Ticker", PricedTicker)
+    ah.generate_recommendation("INFY", use_cache=False)
+
+    spans = _by_name(tracing.recent_spans())
+    root = spans["recommendation"]
+    assert root["parent_id"] is None
+    trace = _by_name(tracing.recent_spans(root["trace_id"]))
+    assert {"recommendation.fetch", "recommendation.prompt", "llm.generate", "fetch.info", "fetch.news"} <= set(trace)
+    assert trace["fetch.info"]["attrs"]["cache"] == "miss"
+    assert trace["fetch.info"]["parent_id"] == trace["recommendation.fetch"]["span_id"]
+    assert trace["llm.generate"]["attrs"]["prompt_tokens"] > 0
+    assert trace["recommendation.prompt"]["attrs"]["prompt_tokens"] > 0
+
+
+def test_streamed_recommendation_is_one_trace(traces, monkeypatch):
+    monkeypatch.setattr(ah, "fetch_stock_data", lambda _t: (None, {"currentPrice": 1}))
+    monkeypatch.setattr(ah, "fetch_financial_data", lambda _t: None)
+    monkeypatch.setattr(ah, "fetch_stock_news", lambda _t: [])
+
+    chunks = list(ah.stream_recommendation("TCS", use_cache=False))
+    assert "".join(chunks).endswith("Hold")
+
+    spans = _by_name(tracing.recent_spans())
+    root = spans["recommendation"]
+    assert root["attrs"]["stream"] is True
+    assert spans["llm.stream"]["parent_id"] == root["span_id"]
+    assert spans["llm.stream"]["attrs"]["chunks"] == 2
+    assert "first_chunk_seconds" in spans["llm.stream"]["attrs"]
@@ -0,0 +1,60 @@
+from datetime import date
+
+import core.email_parser as ep
+import core.gmail_agent as ga
+from core.transactions import BSE_TRADE, SPEND, Transaction, TransactionTable, dedupe
+
+
+def _spend(day, amount, merchant, spend_category=None, reference=None, source_id=None):
+    return Transaction(date=date(2025, 5, day), category=SPEND, amount=amount, merchant=merchant,
+                       spend_category=spend_category, reference=reference, source_id=source_id)
+
+
+def test_duplicates_are_counted_once():
+    rows = [
+        _spend(3, 550.0, "Swiggy", "Food", source_id="m1"),
+        _spend(3, 550.0, "Swiggy", "Food", source_id="m1"),          # same message parsed twice
+        _spend(3, 550.0, "Swiggy", "Food", "ORD1", source_id="m2"),  # another email, same content
+        _spend(3, 550.0, "swiggy", "Food", "ORD1", source_id="m3"),  # same order forwarded
+    ]
+    assert [t.source_id for t in dedupe(rows)] == ["m1", "m2"]
+    referenced = [_spend(5, 99.0, "Uber", reference="A1"), _spend(5, 99.0, "Uber", reference="A2")]
+    assert len(dedupe(referenced)) == 2
+
+
+def test_distinct_unreferenced_spends_are_all_counted():
+    rides = [_spend(5, 99.0, "Uber", "Travel", source_id="m1"), _spend(5, 99.0, "Uber", "Travel", source_id="m2"),
+             _spend(5, 99.0, "Uber", "Travel")]
+    table = TransactionTable(rides)
+    assert len(table) == 3 and table.total(SPEND) == 297.0
+    # The rule parser identifies each email by its snippet
+    snippets = [f"Your Uber ride of ₹99.00 on 2025-05-05 at {hour}:00 was paid." for hour in (9, 18)]
+    parsed, _ = ep.partition_snippets(snippets + snippets[:1])
+    assert len(TransactionTable(parsed)) == 2
+
+
+def test_table_aggregates():
+    table = TransactionTable([
+        _spend(3, 550.0, "Swiggy", "Food"),
+        _spend(20, 250.0, "Zomato", "Food"),
+        Transaction(date=date(2025, 6, 1), category=SPEND, amount=1000.0, merchant="Amazon",
+                    spend_category="Shopping"),
+        Transaction(date=date(2025, 5, 2), category=BSE_TRADE, amount=3000.0, merchant="Tata Motors"),
+    ])
+    assert table.total(SPEND) == 1800.0
+    assert table.totals_by("spend_category", category=SPEND) == {"Shopping": 1000.0, "Food": 800.0}
+    assert table.totals_by("month", category=SPEND) == {"2025-06": 1000.0, "2025-05": 800.0}
+    may = table.filter(category=SPEND, start=date(2025, 5, 1), end=date(2025, 5, 31))
+    assert len(may) == 2 and may.total() == 800.0
+    assert table.filter(merchant="swiggy").total() == 550.0
+
+
+def test_llm_transactions_are_validated():
+    text = (
+        '[{"date": "2025-05-09", "type": "Spends", "amount": "1,200", "merchant": "Cafe"},'
+        ' {"date": "not a date", "type": "Spend", "amount": 1, "merchant": "X"},'
+        ' {"date": "2025-05-09", "type": "Refund", "amount": 5, "merchant": "Y"}]'
+    )
+    parsed = ga.parse_llm_transactions(text)
+    assert [(t.category, t.amount, t.source) for t in parsed] == [(SPEND, 1200.0, "llm")]
+    assert ga.parse_llm_transactions("Sorry, nothing found.") == []